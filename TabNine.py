@@ -6,20 +6,25 @@ _is_ST3 = int(sublime.version()) >= 3114
 
 if _is_ST3:
     # Clear module cache to force reloading all modules of this package.
+    # Only our own modules are evicted; the stdlib stays imported, and so does
+    # lib.process_handle, which hands the running binary to the new modules.
     # See https://github.com/emmetio/sublime-text-plugin/issues/35
     prefix = __package__ + "."  # don't clear the base package
+    keep = [__name__, prefix + "lib.process_handle"]
     for module_name in [
         module_name
         for module_name in sys.modules
-        if (module_name.startswith(prefix) and module_name != __name__)
-        or ("json" == module_name)
+        if module_name.startswith(prefix) and module_name not in keep
     ]:
         del sys.modules[module_name]
     prefix = None
+    keep = None
 
 
 from .lib.requests import get_capabilities, set_state, open_config  # noqa E402
 from .lib.settings import is_native_auto_complete  # noqa E402
+from .lib.view_helpers import forget_position_facts  # noqa E402
+from .lib import debounce, gating, memory, profiler, stats  # noqa E402
 
 capabilities = get_capabilities()
 is_v2 = False
@@ -42,6 +47,7 @@ else:
 class DisableViewCommand(sublime_plugin.TextCommand):
     def run(self, edit):
         self.view.settings().set("tabnine-disabled", True)
+        forget_position_facts()
         set_state({"State": {"state_type": "disable-view"}})
 
     def is_visible(self, *args):
@@ -51,6 +57,7 @@ class DisableViewCommand(sublime_plugin.TextCommand):
 class EnableViewCommand(sublime_plugin.TextCommand):
     def run(self, edit):
         self.view.settings().set("tabnine-disabled", False)
+        forget_position_facts()
         set_state({"State": {"state_type": "enable-view"}})
 
     def is_visible(self, *args):
@@ -73,3 +80,50 @@ class EnableNativeAutoCompleteCommand(sublime_plugin.TextCommand):
 class OpenconfigCommand(sublime_plugin.TextCommand):
     def run(self, edit):
         open_config()
+
+
+class ShowCallbackTimingsCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        view = self.window.new_file()
+        view.set_name("Tabnine Callback Timings")
+        view.set_scratch(True)
+        report = stats.report() + "\n" + debounce.report()
+        view.run_command("append", {"characters": report})
+
+
+class ShowMemoryReportCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        view = self.window.new_file()
+        view.set_name("Tabnine Memory Report")
+        view.set_scratch(True)
+        view.run_command("append", {"characters": memory.report()})
+
+
+class ShowCompletionGatingReportCommand(sublime_plugin.WindowCommand):
+    def run(self):
+        view = self.window.new_file()
+        view.set_name("Tabnine Completion Gating")
+        view.set_scratch(True)
+        view.run_command("append", {"characters": gating.report()})
+
+
+class ProfileNextSecondsCommand(sublime_plugin.WindowCommand):
+    def run(self, seconds=None):
+        if seconds is not None:
+            profiler.start(seconds)
+            return
+
+        def on_done(text):
+            try:
+                seconds = float(text)
+            except ValueError:
+                sublime.status_message("Tabnine: not a number of seconds")
+                return
+            profiler.start(seconds)
+
+        self.window.show_input_panel(
+            "Profile Tabnine for seconds:", "30", on_done, None, None
+        )
+
+    def is_enabled(self, *args):
+        return profiler.session is None
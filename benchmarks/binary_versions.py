@@ -0,0 +1,150 @@
+"""Compare latency of installed TabNine binary versions on the same workload.
+
+    python -m benchmarks.binary_versions [--versions V...] [--binary PATH...]
+        [--recording FILE...] [--source FILE] [--requests N]
+
+Every selected version under binaries/ (all of them by default) and every
+`--binary` is started the way the plugin starts it. Requests are sent to the
+versions in turn, so background noise hits all of them alike. The workload is
+the Autocomplete requests from `--recording` files (see benchmarks/replay.py)
+or a synthetic one typing through `--source`.
+
+Reports cold start (spawn to first response), latency percentiles, mean
+result count and peak RSS (Linux) per version.
+"""
+import argparse
+import os
+import time
+
+from . import harness, replay, summary
+
+AUTOCOMPLETE_CHAR_LIMIT = 100000
+DEFAULT_SOURCE = os.path.join(harness.REPO_ROOT, "lib", "tab_nine_process.py")
+
+
+def synthetic_workload(source, count):
+    """Autocomplete requests at `count` evenly spread positions of `source`."""
+    with open(source) as source_file:
+        text = source_file.read()
+    step = max(1, len(text) // count)
+    for location in range(step, len(text), step)[:count]:
+        begin = max(0, location - AUTOCOMPLETE_CHAR_LIMIT)
+        end = min(len(text), location + AUTOCOMPLETE_CHAR_LIMIT)
+        yield {
+            "Autocomplete": {
+                "before": text[begin:location],
+                "after": text[location:end],
+                "filename": source,
+                "region_includes_beginning": begin == 0,
+                "region_includes_end": end == len(text),
+                "max_num_results": 5,
+            }
+        }
+
+
+def recorded_workload(paths):
+    for entry in replay.read_recordings(paths):
+        if "Autocomplete" in entry["request"]:
+            yield entry["request"]
+
+
+class Candidate:
+    def __init__(self, label, path):
+        self.label = label
+        process = harness.load_module("lib.tab_nine_process")
+        self.process = process.TabNineProcess(binary_path=path)
+        self.cold_start = None
+        self.latencies = []
+        self.result_counts = []
+        self.failures = 0
+
+    def start(self):
+        started = time.monotonic()
+        self.process.request({"Features": {}})
+        self.cold_start = (time.monotonic() - started) * 1000
+
+    def request(self, request):
+        started = time.monotonic()
+        response = self.process.request(request)
+        self.latencies.append((time.monotonic() - started) * 1000)
+        count = replay.result_count(response)
+        if count is None:
+            self.failures += 1
+        else:
+            self.result_counts.append(count)
+
+    def peak_rss_mb(self):
+        governor = harness.load_module("lib.process_governor")
+        proc = self.process.tabnine_proc
+        peak = governor.read_peak_rss(proc.pid) if proc is not None else None
+        return float("nan") if peak is None else peak / 1024.0 / 1024.0
+
+
+def find_candidates(binary_dir, versions, binaries):
+    process = harness.load_module("lib.tab_nine_process")
+    candidates = []
+    if os.path.isdir(binary_dir):
+        for version, path in process.get_installed_versions(binary_dir):
+            if not versions or version in versions:
+                candidates.append(Candidate(version, path))
+    for path in binaries or []:
+        candidates.append(Candidate(path, path))
+    return candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--binaries-dir", default=os.path.join(harness.REPO_ROOT, "binaries")
+    )
+    parser.add_argument("--versions", nargs="*", help="versions to compare")
+    parser.add_argument("--binary", action="append", help="extra binary to compare")
+    parser.add_argument("--recording", nargs="*", help="recorded workload files")
+    parser.add_argument("--source", default=DEFAULT_SOURCE)
+    parser.add_argument("--requests", type=int, default=200)
+    options = parser.parse_args()
+
+    candidates = find_candidates(options.binaries_dir, options.versions, options.binary)
+    if len(candidates) < 1:
+        parser.error("no binaries found, use --binaries-dir or --binary")
+    if options.recording:
+        workload = list(recorded_workload(options.recording))
+    else:
+        workload = list(synthetic_workload(options.source, options.requests))
+
+    try:
+        for candidate in candidates:
+            candidate.start()
+        for index, request in enumerate(workload):
+            # Rotate who goes first so no version always sees a warm cache.
+            offset = index % len(candidates)
+            for candidate in candidates[offset:] + candidates[:offset]:
+                candidate.request(request)
+
+        print("{} requests per version".format(len(workload)))
+        print(
+            "{:<24} {:>9} {:>9} {:>9} {:>9} {:>8} {:>9}".format(
+                "", "cold ms", "p50 ms", "p99 ms", "failed", "results", "peak MB"
+            )
+        )
+        for candidate in candidates:
+            stats = summary.describe(candidate.latencies)
+            counts = candidate.result_counts
+            print(
+                "{:<24} {:>9.1f} {:>9.2f} {:>9.2f} {:>9} {:>8.2f} {:>9.1f}".format(
+                    candidate.label[-24:],
+                    candidate.cold_start,
+                    stats["p50"],
+                    stats["p99"],
+                    candidate.failures,
+                    sum(counts) / len(counts) if counts else 0,
+                    candidate.peak_rss_mb(),
+                )
+            )
+    finally:
+        for candidate in candidates:
+            candidate.process.stop()
+
+
+if __name__ == "__main__":
+    main()
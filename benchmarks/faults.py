@@ -0,0 +1,145 @@
+"""Inject faults into the TabNine process and measure how the plugin recovers.
+
+    python -m benchmarks.faults [--scenarios NAME...] [--requests N]
+        [--interval-ms MS] [--timeout-ms MS]
+
+Each scenario runs a fresh TabNineProcess of this tree against
+tools/stub_tabnine.py, sending an Autocomplete request every `--interval-ms`.
+The stub scenarios (crash, hang, partial-line, garbage, slow-start) make the
+stub misbehave once; broken-pipe breaks the plugin's side of the pipe instead.
+`--timeout-ms` becomes the plugin's request_timeout_ms.
+
+Reported per scenario: requests lost (answered with None), time to the first
+response (from sending the first request, what slow-start delays), time to
+recovery (from sending the first failed request to the next successful
+response) and the number of restarts. The faults hit after FAULT_AFTER
+requests, so `--requests` has to be larger.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from . import harness, replay
+
+FAULT_AFTER = 10
+SCENARIOS = {
+    "crash": ["--fault", "crash", "--fault-after", str(FAULT_AFTER)],
+    "hang": ["--fault", "hang", "--fault-after", str(FAULT_AFTER)],
+    "partial-line": ["--fault", "partial", "--fault-after", str(FAULT_AFTER)],
+    "garbage": ["--fault", "garbage", "--fault-after", str(FAULT_AFTER)],
+    # --fault-after is in tenths of a second for slow starts.
+    "slow-start": ["--fault", "slow-start", "--fault-after", "15"],
+    "broken-pipe": [],
+}
+
+
+class BrokenPipeWriter:
+    """Wraps the binary's stdin and fails one write after `after` good ones."""
+
+    def __init__(self, stream, after):
+        self.stream = stream
+        self.remaining = after
+
+    def write(self, data):
+        self.remaining -= 1
+        if self.remaining == 0:
+            raise BrokenPipeError("injected broken pipe")
+        return self.stream.write(data)
+
+    def flush(self):
+        return self.stream.flush()
+
+    def close(self):
+        return self.stream.close()
+
+
+def make_process(scenario):
+    process = harness.load_module("lib.tab_nine_process")
+    injected = []
+
+    class FaultyProcess(process.TabNineProcess):
+        def run_tabnine(self, *args, **kwargs):
+            proc = process.TabNineProcess.run_tabnine(self, *args, **kwargs)
+            if scenario == "broken-pipe" and not injected:
+                injected.append(True)
+                proc.stdin = BrokenPipeWriter(proc.stdin, FAULT_AFTER + 1)
+            return proc
+
+    return FaultyProcess()
+
+
+def configure(scenario, timeout_ms, marker):
+    settings = harness.load_module("lib.settings")
+    settings.watch()
+    tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+    tabnine_settings.set("custom_binary_path", replay.STUB)
+    tabnine_settings.set("request_timeout_ms", timeout_ms)
+    extra_args = list(SCENARIOS[scenario])
+    if extra_args:
+        extra_args += ["--fault-once", marker]
+    tabnine_settings.set("extra_args", extra_args)
+
+
+def run_scenario(scenario, requests, interval, timeout_ms):
+    directory = tempfile.mkdtemp()
+    configure(scenario, timeout_ms, os.path.join(directory, "fault"))
+    process = make_process(scenario)
+    outcomes = []
+    try:
+        for index in range(requests):
+            sent = time.monotonic()
+            response = process.request(
+                {"Autocomplete": {"before": "value_{}".format(index), "after": ""}}
+            )
+            outcomes.append((sent, time.monotonic(), response is not None))
+            time.sleep(interval)
+    finally:
+        process.stop()
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+    lost = sum(1 for _, _, ok in outcomes if not ok)
+    answered = [done for _, done, ok in outcomes if ok]
+    first = (answered[0] - outcomes[0][0]) * 1000 if answered else None
+    recovery = None
+    failed = [index for index, (_, _, ok) in enumerate(outcomes) if not ok]
+    if failed:
+        first_failure = outcomes[failed[0]][0]
+        recovered = [done for _, done, ok in outcomes[failed[0] :] if ok]
+        if recovered:
+            recovery = (recovered[0] - first_failure) * 1000
+    return lost, first, recovery, process.num_restarts
+
+
+def format_ms(ms):
+    return "-" if ms is None else "{:.1f}".format(ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--interval-ms", type=float, default=20)
+    parser.add_argument("--timeout-ms", type=int, default=1000)
+    options = parser.parse_args()
+    if options.requests <= FAULT_AFTER:
+        parser.error(
+            "--requests must be above {} for the faults to happen".format(FAULT_AFTER)
+        )
+
+    row = "{:<14} {:>6} {:>15} {:>13} {:>9}"
+    print(row.format("", "lost", "first reply ms", "recovery ms", "restarts"))
+    for scenario in options.scenarios:
+        lost, first, recovery, restarts = run_scenario(
+            scenario, options.requests, options.interval_ms / 1000, options.timeout_ms
+        )
+        print(
+            row.format(scenario, lost, format_ms(first), format_ms(recovery), restarts)
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Drive the plugin's listeners outside of Sublime Text.
+
+The plugin is imported as a package from a source tree (the working copy or a
+git revision) on top of the in-memory ``sublime`` shim in ``benchmarks/shim``.
+Requests to the TabNine binary are answered in-process by `FakeTabNine`.
+
+The tests built on it live in benchmarks/tests rather than tests/, which
+UnitTesting runs inside Sublime Text: loading the package here would replace
+the running plugin's ``TabNine`` module.
+"""
+import collections
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+SHIM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shim")
+
+if SHIM_DIR not in sys.path:
+    sys.path.insert(0, SHIM_DIR)
+
+import sublime  # noqa E402
+import sublime_plugin  # noqa E402
+
+from tools import stub_tabnine  # noqa E402
+
+_loaded = {}
+
+
+def export_tree(rev):
+    """Extract git revision `rev` of this repository into a temporary directory."""
+    target = tempfile.mkdtemp(prefix="tabnine-bench-")
+    archive = subprocess.Popen(
+        ["git", "archive", rev], cwd=REPO_ROOT, stdout=subprocess.PIPE
+    )
+    subprocess.check_call(["tar", "-x", "-C", target], stdin=archive.stdout)
+    archive.wait()
+    return target
+
+
+def load_package(root=REPO_ROOT, name="TabNine"):
+    """Import the plugin tree at `root` as package `name`."""
+    key = (root, name)
+    if key not in _loaded:
+        package = types.ModuleType(name)
+        package.__path__ = [root]
+        sys.modules[name] = package
+        _loaded[key] = package
+    return _loaded[key]
+
+
+def load_module(module, root=REPO_ROOT, name="TabNine"):
+    load_package(root, name)
+    return importlib.import_module("{}.{}".format(name, module))
+
+
+def cleanup_tree(root):
+    if root != REPO_ROOT:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+class FakeTabNine:
+    """Answers plugin requests the way the binary would, without a process."""
+
+    def __init__(self, num_results=5):
+        self.num_results = num_results
+        self.requests = collections.Counter()
+        self.cpu_time = 0.0
+
+    def install(self, root=REPO_ROOT, name="TabNine"):
+        process = load_module("lib.tab_nine_process", root, name)
+        process.tabnine_proc.request = self.request
+        return self
+
+    def request(self, req):
+        started = time.process_time()
+        kind = next(iter(req))
+        self.requests[kind] += 1
+        response = stub_tabnine.respond(req, self.num_results)
+        self.cpu_time += time.process_time() - started
+        return response
+
+
+class Editor:
+    """A single window editor that routes commands and events to listeners.
+
+    Async callbacks and timeouts are queued and run by `settle`, which stands
+    for the user pausing long enough for everything to finish.
+    """
+
+    EVENTS = (
+        "on_activated",
+        "on_activated_async",
+        "on_deactivated",
+        "on_close",
+        "on_modified",
+        "on_modified_async",
+        "on_selection_modified",
+        "on_selection_modified_async",
+        "on_query_completions",
+        "on_query_context",
+        "on_text_command",
+        "on_post_text_command",
+    )
+    # View methods that cross the plugin host boundary in Sublime.
+    API_CALLS = (
+        "command_history",
+        "line",
+        "match_selector",
+        "scope_name",
+        "substr",
+    )
+
+    def __init__(self, listeners, text="", file_name="/tmp/bench.py"):
+        self.listeners = listeners
+        self.callbacks = collections.Counter()
+        self.api_calls = collections.Counter()
+        self.commands = collections.Counter()
+        self.popups_shown = 0
+        self.auto_complete_visible = False
+        self.completions = []
+        self.window = sublime.active_window()
+        self.view = self.window.new_file(text, file_name)
+        self.view.app = self
+        self._count_api_calls(self.view)
+        for listener in listeners:
+            self._count_callbacks(listener)
+        self._notify("on_activated", self.view)
+        self._notify_async("on_activated_async", self.view)
+
+    def _count_callbacks(self, listener):
+        for attr in self.EVENTS:
+            if not hasattr(listener, attr):
+                continue
+            method = getattr(listener, attr)
+
+            def counted(*args, _method=method, _attr=attr, **kwargs):
+                self.callbacks[_attr] += 1
+                return _method(*args, **kwargs)
+
+            setattr(listener, attr, counted)
+
+    def _count_api_calls(self, view):
+        for attr in self.API_CALLS:
+            method = getattr(view, attr)
+
+            def counted(*args, _method=method, _attr=attr, **kwargs):
+                self.api_calls[_attr] += 1
+                return _method(*args, **kwargs)
+
+            setattr(view, attr, counted)
+
+    def _notify(self, event, *args):
+        results = []
+        for listener in self.listeners:
+            callback = getattr(listener, event, None)
+            if callback is not None:
+                results.append(callback(*args))
+        return results
+
+    def _notify_async(self, event, *args):
+        sublime.set_timeout_async(lambda: self._notify(event, *args), 0)
+
+    def _modified(self, view):
+        self._notify("on_modified", view)
+        self._notify_async("on_modified_async", view)
+        self._notify("on_selection_modified", view)
+        self._notify_async("on_selection_modified_async", view)
+
+    def run_command(self, view, name, args):
+        self.commands[name] += 1
+        for replacement in self._notify("on_text_command", view, name, args):
+            if replacement:
+                name, args = replacement
+                self.commands[name] += 1
+                break
+        if name == "auto_complete":
+            self.query_completions(view)
+        elif name == "hide_auto_complete":
+            self.auto_complete_visible = False
+        elif name == "insert":
+            self._insert(view, args["characters"])
+        elif name == "commit_completion":
+            self._commit_completion(view)
+        else:
+            command = sublime_plugin.text_commands.get(name)
+            if command is None:
+                return
+            command(view).run(sublime.Edit(), **args)
+            self._modified(view)
+        self._notify("on_post_text_command", view, name, args)
+
+    def _insert(self, view, characters):
+        selection = view.sel()
+        regions = list(selection)
+        selection.clear()
+        shift = 0
+        for region in regions:
+            point = region.begin() + shift
+            view.insert(sublime.Edit(), point, characters)
+            shift += len(characters)
+            selection.add(sublime.Region(point + len(characters)))
+        self._modified(view)
+
+    def _commit_completion(self, view):
+        self.auto_complete_visible = False
+        if not self.completions:
+            return
+        item = self.completions[0]
+        if isinstance(item, sublime.CompletionItem):
+            contents = item.completion
+        else:
+            contents = item[1]
+        cursor = contents.find("$0")
+        text = contents.replace("$0", "").replace("\\$", "$")
+        location = view.sel()[0].end()
+        begin = view.word(location).begin()
+        view.replace(sublime.Edit(), sublime.Region(begin, location), text)
+        view.sel().clear()
+        view.sel().add(begin + (cursor if cursor >= 0 else len(text)))
+        self._modified(view)
+
+    def query_completions(self, view):
+        location = view.sel()[0].end()
+        word = view.word(location)
+        prefix = view.substr(sublime.Region(word.begin(), location))
+        self.completions = []
+        for result in self._notify("on_query_completions", view, prefix, [location]):
+            if result is None:
+                continue
+            completions = result[0] if isinstance(result, tuple) else result.completions
+            if completions and not self.completions:
+                self.completions = completions
+        if self.completions:
+            self.popups_shown += 1
+        self.auto_complete_visible = bool(self.completions)
+
+    def press_tab(self):
+        view = self.view
+        leader_key = self._notify(
+            "on_query_context",
+            view,
+            "tab_nine_leader_key_available",
+            sublime.OP_EQUAL,
+            True,
+            True,
+        )
+        if self.auto_complete_visible:
+            view.run_command("commit_completion")
+        elif any(leader_key):
+            view.run_command("tab_nine_leader_key")
+        else:
+            view.run_command("insert", {"characters": "    "})
+
+    def type(self, text, settle=True):
+        """Type `text` one key at a time like a user would; a tab accepts."""
+        for char in text:
+            self.key(char)
+            if settle:
+                self.settle()
+
+    def key(self, char):
+        if char == "\t":
+            self.press_tab()
+            return
+        self.view.run_command("insert", {"characters": char})
+        auto_complete = sublime.load_settings("Preferences.sublime-settings").get(
+            "auto_complete", True
+        )
+        if auto_complete and (char.isalnum() or char in "._"):
+            self.query_completions(self.view)
+
+    def settle(self):
+        return sublime.run_pending()
@@ -0,0 +1,126 @@
+"""Report plugin import time per module and check it against a budget.
+
+    python -m benchmarks.import_time [--budget-ms MS] [--repeat N]
+
+Every listener module is imported in a fresh interpreter run with
+``-X importtime`` (Python 3.7+), after the harness itself is loaded, so the
+report lists what importing the plugin adds: our modules and the stdlib
+modules they pull in. The fastest of `--repeat` runs is kept.
+
+It also times a reload the way TabNine.py does it, evicting the package
+modules from sys.modules and importing them again.
+"""
+import argparse
+import importlib
+import subprocess
+import sys
+import time
+
+from . import harness
+
+MODULES = [
+    "completions.completions_v1",
+    "completions.completions_v2",
+    "completions.completions_v3",
+]
+DEFAULT_BUDGET_MS = 50
+MARKER = "-- plugin import --"
+
+_SCRIPT = """
+import importlib, sys
+from benchmarks import harness
+harness.load_package()
+sys.stderr.write({marker!r} + "\\n")
+importlib.import_module("TabNine.{module}")
+"""
+
+
+def measure_import(module):
+    """Return {module name: (self ms, cumulative ms)} for one fresh import."""
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            _SCRIPT.format(marker=MARKER, module=module),
+        ],
+        cwd=harness.REPO_ROOT,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    timings = {}
+    lines = output.splitlines()
+    for line in lines[lines.index(MARKER) + 1 :]:
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        timings[name.strip()] = (int(self_us) / 1000.0, int(cumulative_us) / 1000.0)
+    return timings
+
+
+def best_of(module, repeat):
+    best = {}
+    for _ in range(repeat):
+        for name, timing in measure_import(module).items():
+            if name not in best or timing[0] < best[name][0]:
+                best[name] = timing
+    return best
+
+
+def measure_reload(repeat, evict_stdlib=()):
+    """Milliseconds to evict and re-import all listener modules, best of `repeat`."""
+    harness.load_package()
+    prefix = "TabNine."
+    for module in MODULES:
+        importlib.import_module(prefix + module)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for name in list(sys.modules):
+            if name.startswith(prefix) or name in evict_stdlib:
+                del sys.modules[name]
+        for module in MODULES:
+            importlib.import_module(prefix + module)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--repeat", type=int, default=5)
+    options = parser.parse_args()
+
+    over_budget = []
+    for module in MODULES:
+        timings = best_of(module, options.repeat)
+        total = sum(self_ms for self_ms, _ in timings.values())
+        print("{}: {:.2f} ms".format(module, total))
+        ranked = sorted(timings.items(), key=lambda item: -item[1][0])
+        for name, (self_ms, cumulative_ms) in ranked:
+            print("    {:<50} {:>8.2f} {:>8.2f}".format(name, self_ms, cumulative_ms))
+        if total > options.budget_ms:
+            over_budget.append(module)
+
+    print(
+        "reload: {:.2f} ms (evicting json too: {:.2f} ms)".format(
+            measure_reload(options.repeat),
+            measure_reload(options.repeat, evict_stdlib=("json",)),
+        )
+    )
+
+    if over_budget:
+        print(
+            "over the {} ms budget: {}".format(
+                options.budget_ms, ", ".join(over_budget)
+            )
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
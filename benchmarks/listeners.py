@@ -0,0 +1,129 @@
+"""Per-keystroke CPU time and allocations of each listener version.
+
+    python -m benchmarks.listeners [--versions v1 v2 v3] [--scripts NAME...]
+
+Each typing script is replayed key by key through a listener version on the
+headless sublime shim; a tab in a script accepts the current suggestion.
+After every key the editor settles (async callbacks and timeouts run), so
+the numbers cover all plugin work caused by that key. Time spent answering
+requests in the fake binary is excluded. Allocations are measured in a
+separate pass with tracemalloc as the peak of newly allocated memory while
+handling a key.
+"""
+import argparse
+import time
+import tracemalloc
+
+from . import harness, summary
+
+LISTENERS = {
+    "v1": "completions.completions_v1",
+    "v2": "completions.completions_v2",
+    "v3": "completions.completions_v3",
+}
+
+_TYPED = (
+    "def load_config(path):\n"
+    "    with open(pa\tth) as config_file:\n"
+    "        return json.lo\tad(config_file)\n"
+    "\n"
+    "# read the settings file and cache it\n"
+    'message = "settings loaded from {}".format(path)\n'
+)
+_LARGE_FILE = "".join(
+    "def function_{0}(argument_{0}):\n    return argument_{0} * {0}\n\n".format(i)
+    for i in range(3000)
+)
+
+# name -> (initial buffer, cursor offset in it, keys to type)
+SCRIPTS = {
+    "python": ("import json\n\n", None, _TYPED),
+    "large-file": (_LARGE_FILE, len(_LARGE_FILE) // 2, _TYPED),
+}
+
+
+def reset_shim():
+    sublime = harness.sublime
+    sublime._settings.clear()
+    del sublime._main_queue[:]
+    del sublime._async_queue[:]
+
+
+def start(version, script):
+    reset_shim()
+    text, cursor, keys = SCRIPTS[script]
+    tabnine = harness.FakeTabNine().install()
+    module = harness.load_module(LISTENERS[version])
+    if hasattr(module, "plugin_loaded"):
+        module.plugin_loaded()
+    editor = harness.Editor([module.TabNineListener()], text=text)
+    if cursor is not None:
+        editor.view.sel().clear()
+        editor.view.sel().add(cursor)
+    editor.settle()
+    return editor, tabnine, keys
+
+
+def measure_cpu(version, script):
+    """CPU microseconds spent by the plugin per key."""
+    editor, tabnine, keys = start(version, script)
+    samples = []
+    for key in keys:
+        fake_before = tabnine.cpu_time
+        started = time.process_time()
+        editor.key(key)
+        editor.settle()
+        elapsed = time.process_time() - started - (tabnine.cpu_time - fake_before)
+        samples.append(elapsed * 1e6)
+    requests = sum(tabnine.requests.values())
+    return samples, requests / float(len(keys))
+
+
+def measure_allocations(version, script):
+    """Peak KB allocated while handling each key."""
+    editor, tabnine, keys = start(version, script)
+    samples = []
+    tracemalloc.start()
+    try:
+        for key in keys:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            editor.key(key)
+            editor.settle()
+            samples.append((tracemalloc.get_traced_memory()[1] - before) / 1024.0)
+    finally:
+        tracemalloc.stop()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--versions", nargs="*", default=sorted(LISTENERS))
+    parser.add_argument("--scripts", nargs="*", default=sorted(SCRIPTS))
+    options = parser.parse_args()
+
+    print(
+        "{:<18} {:>6} {:>11} {:>11} {:>11} {:>11} {:>9}".format(
+            "", "keys", "mean us", "p50 us", "p99 us", "peak KB", "req/key"
+        )
+    )
+    for script in options.scripts:
+        for version in options.versions:
+            cpu, requests_per_key = measure_cpu(version, script)
+            allocations = summary.describe(measure_allocations(version, script))
+            stats = summary.describe(cpu)
+            print(
+                "{:<18} {:>6} {:>11.1f} {:>11.1f} {:>11.1f} {:>11.1f} {:>9.2f}".format(
+                    "{} {}".format(script, version),
+                    stats["count"],
+                    stats["mean"],
+                    stats["p50"],
+                    stats["p99"],
+                    allocations["mean"],
+                    requests_per_key,
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
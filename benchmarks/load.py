@@ -0,0 +1,197 @@
+"""Load-test the single shared TabNine process with many concurrent views.
+
+    python -m benchmarks.load [--views 1 2 4 8 16] [--duration S]
+        [--autocomplete-rate R] [--prefetch-rate R] [--set-state-rate R]
+        [--service-ms MS] [--binary PATH] [--unlocked]
+
+Each simulated view is a thread issuing Autocomplete, Prefetch and SetState
+requests through lib/requests with exponential inter-arrival times at the
+given per-view rates (requests per second). All of them share the
+module-global `tabnine_proc`, talking to tools/stub_tabnine.py (which takes
+`--service-ms` per request) unless `--binary` is given.
+
+For each view count the report shows offered and achieved throughput,
+Autocomplete latency, time spent waiting for the pipe lock (queueing), and
+responses that belong to another request (mis-association). `--unlocked`
+bypasses the pipe lock to show what unsynchronized access does.
+"""
+import argparse
+import collections
+import random
+import threading
+import time
+
+from . import harness, replay, summary
+
+
+class TimedLock:
+    """Wraps the process lock and records how long each acquire waited."""
+
+    def __init__(self, lock, enabled=True):
+        self.lock = lock
+        self.enabled = enabled
+        self.local = threading.local()
+
+    def __enter__(self):
+        started = time.monotonic()
+        if self.enabled:
+            self.lock.acquire()
+        self.local.wait = time.monotonic() - started
+        return self
+
+    def __exit__(self, *args):
+        if self.enabled:
+            self.lock.release()
+
+    def acquire(self, *args, **kwargs):
+        return self.lock.acquire(*args, **kwargs)
+
+    def release(self):
+        self.lock.release()
+
+
+class Results:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = collections.defaultdict(list)
+        self.waits = []
+        self.misassociated = 0
+        self.failures = 0
+        self.completed = 0
+
+    def add(self, kind, latency, wait, ok, misassociated):
+        with self.lock:
+            self.latencies[kind].append(latency * 1000)
+            self.waits.append(wait * 1000)
+            self.completed += 1
+            self.failures += 0 if ok else 1
+            self.misassociated += 1 if misassociated else 0
+
+
+def simulate_view(view_id, rates, deadline, requests, timed_lock, results):
+    rng = random.Random(view_id)
+    next_at = {
+        kind: time.monotonic() + rng.expovariate(rate)
+        for kind, rate in rates.items()
+        if rate > 0
+    }
+    sequence = 0
+    file_name = "/tmp/load/view_{}.py".format(view_id)
+    while next_at:
+        kind = min(next_at, key=next_at.get)
+        delay = next_at[kind] - time.monotonic()
+        if next_at[kind] > deadline:
+            break
+        if delay > 0:
+            time.sleep(delay)
+        next_at[kind] = max(next_at[kind], time.monotonic()) + rng.expovariate(
+            rates[kind]
+        )
+
+        sequence += 1
+        token = "view{}_request{}".format(view_id, sequence)
+        started = time.monotonic()
+        if kind == "Autocomplete":
+            response = requests.autocomplete(
+                "value = " + token, "\n", file_name, False, False
+            )
+        elif kind == "Prefetch":
+            response = requests.prefetch(file_name)
+        else:
+            response = requests.set_state({"State": {"state_type": token}})
+        latency = time.monotonic() - started
+
+        misassociated = kind == "Autocomplete" and (
+            not isinstance(response, dict) or response.get("old_prefix") != token
+        )
+        ok = kind != "Autocomplete" or replay.result_count(response) is not None
+        results.add(kind, latency, timed_lock.local.wait, ok, misassociated)
+
+
+def run_step(views, rates, duration, timed_lock):
+    requests = harness.load_module("lib.requests")
+    results = Results()
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(
+            target=simulate_view,
+            args=(view_id, rates, deadline, requests, timed_lock, results),
+        )
+        for view_id in range(views)
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.monotonic() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--views", type=int, nargs="*", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=5)
+    parser.add_argument("--autocomplete-rate", type=float, default=10)
+    parser.add_argument("--prefetch-rate", type=float, default=0.2)
+    parser.add_argument("--set-state-rate", type=float, default=1)
+    parser.add_argument("--service-ms", type=float, default=2)
+    parser.add_argument("--binary", help="binary to load instead of the stub")
+    parser.add_argument("--unlocked", action="store_true")
+    options = parser.parse_args()
+
+    settings = harness.load_module("lib.settings")
+    process = harness.load_module("lib.tab_nine_process")
+    settings.watch()
+    tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+    tabnine_settings.set("custom_binary_path", options.binary or replay.STUB)
+    if not options.binary:
+        tabnine_settings.set("extra_args", ["--delay", str(options.service_ms)])
+    # Measure queueing on the pipe, not answers from the identifier index.
+    tabnine_settings.set("fallback_latency_ms", None)
+    tabnine_proc = process.tabnine_proc
+    timed_lock = TimedLock(tabnine_proc.lock, enabled=not options.unlocked)
+    tabnine_proc.lock = timed_lock
+
+    rates = {
+        "Autocomplete": options.autocomplete_rate,
+        "Prefetch": options.prefetch_rate,
+        "SetState": options.set_state_rate,
+    }
+    print(
+        "{:>6} {:>10} {:>10} {:>9} {:>9} {:>9} {:>9} {:>8} {:>7}".format(
+            "views",
+            "offered/s",
+            "done/s",
+            "p50 ms",
+            "p99 ms",
+            "wait p50",
+            "wait p99",
+            "misassoc",
+            "failed",
+        )
+    )
+    try:
+        for views in options.views:
+            results, elapsed = run_step(views, rates, options.duration, timed_lock)
+            autocomplete = summary.describe(results.latencies["Autocomplete"])
+            waits = summary.describe(results.waits)
+            print(
+                "{:>6} {:>10.1f} {:>10.1f} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}"
+                " {:>8} {:>7}".format(
+                    views,
+                    views * sum(rates.values()),
+                    results.completed / elapsed,
+                    autocomplete["p50"],
+                    autocomplete["p99"],
+                    waits["p50"],
+                    waits["p99"],
+                    results.misassociated,
+                    results.failures,
+                )
+            )
+    finally:
+        tabnine_proc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Replay recorded TabNine traffic and compare latencies.
+
+    python -m benchmarks.replay RECORDING... [--binary PATH | --socket PATH] [--fast]
+        [--set-state]
+
+RECORDING files are written by the plugin when `record_requests_path` is
+set (pass rotated files oldest first). Requests go through the plugin's own
+TabNineProcess, to tools/stub_tabnine.py by default, to another binary with
+`--binary` or to a shared daemon with `--socket`. Requests are paced like the
+original session unless `--fast` sends them back to back.
+
+Only the request types in REPLAYED are sent; the others (Uninstalling,
+Configuration, ...) would have side effects on the target. SetState requests
+report selections and editor state as telemetry and are only sent with
+`--set-state`. Recordings made with
+`record_redact_context` on (the default) have their code masked, so they show
+how the target copes with the pace and size of the traffic, not how it
+completes real code.
+"""
+
+import argparse
+import collections
+import json
+import os
+import time
+
+from . import harness, summary
+
+STUB = os.path.join(harness.REPO_ROOT, "tools", "stub_tabnine.py")
+REPLAYED = ("Autocomplete", "Prefetch")
+
+
+def read_recordings(paths):
+    for path in paths:
+        with open(path) as recording:
+            for line in recording:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def make_process(binary=None, socket_path=None):
+    """A TabNineProcess of this tree talking to `binary` or a daemon."""
+    settings = harness.load_module("lib.settings")
+    process = harness.load_module("lib.tab_nine_process")
+    settings.watch()
+    tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+    tabnine_settings.set("custom_binary_path", binary or STUB)
+    if socket_path:
+        tabnine_settings.set("daemon_socket_path", socket_path)
+    return process.TabNineProcess()
+
+
+def result_count(response):
+    if isinstance(response, dict) and isinstance(response.get("results"), list):
+        return len(response["results"])
+    return None
+
+
+def is_redacted(request):
+    """Whether the recorder masked the code of `request`."""
+    args = request.get("Autocomplete")
+    if not isinstance(args, dict):
+        return False
+    file_name = args.get("filename") or ""
+    return os.path.splitext(file_name)[0] == "redacted"
+
+
+def replay(entries, process, fast=False, kinds=REPLAYED):
+    """Send the recorded requests of the types in `kinds`.
+
+    Returns per-type latency samples and counters, including the requests
+    skipped per type and the number of redacted ones.
+    """
+    replayed = collections.defaultdict(list)
+    recorded = collections.defaultdict(list)
+    mismatches = collections.Counter()
+    failures = collections.Counter()
+    skipped = collections.Counter()
+    redacted = 0
+    behind = []
+    start = first = None
+    for entry in entries:
+        request = entry["request"]
+        kind = next(iter(request))
+        if kind not in kinds:
+            skipped[kind] += 1
+            continue
+        redacted += is_redacted(request)
+        if first is None:
+            start, first = time.monotonic(), entry["t"]
+        elif not fast:
+            delay = start + (entry["t"] - first) - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                behind.append(-delay * 1000)
+        sent = time.monotonic()
+        response = process.request(request)
+        replayed[kind].append((time.monotonic() - sent) * 1000)
+        recorded[kind].append(entry["ms"])
+        if response is None:
+            failures[kind] += 1
+        elif result_count(response) != result_count(entry["response"]):
+            mismatches[kind] += 1
+    return replayed, recorded, mismatches, failures, skipped, redacted, behind
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recordings", nargs="+")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--binary", help="TabNine binary to replay against")
+    target.add_argument("--socket", help="shared daemon socket to replay against")
+    parser.add_argument("--fast", action="store_true", help="do not pace requests")
+    parser.add_argument(
+        "--set-state",
+        action="store_true",
+        help="also replay SetState, which sends telemetry events to the target",
+    )
+    options = parser.parse_args()
+
+    kinds = REPLAYED + ("SetState",) if options.set_state else REPLAYED
+    process = make_process(options.binary, options.socket)
+    try:
+        replayed, recorded, mismatches, failures, skipped, redacted, behind = replay(
+            read_recordings(options.recordings), process, options.fast, kinds
+        )
+    finally:
+        process.stop()
+
+    print(summary.HEADER)
+    for kind in sorted(replayed):
+        print(summary.row(kind + " replayed", replayed[kind]))
+        print(summary.row(kind + " recorded", recorded[kind]))
+        print(
+            "{:<24} {} failed, {} with a different result count".format(
+                "", failures[kind], mismatches[kind]
+            )
+        )
+    if skipped:
+        print(
+            "not replayed: "
+            + ", ".join("{} {}".format(skipped[kind], kind) for kind in sorted(skipped))
+        )
+    if redacted:
+        print(
+            "{} of {} Autocomplete requests have their code masked "
+            "(record_redact_context), so their latencies and result counts do not "
+            "reflect completions of real code".format(
+                redacted, len(replayed["Autocomplete"])
+            )
+        )
+    if behind:
+        print(
+            "fell behind the recorded pace {} times, by up to {:.1f} ms".format(
+                len(behind), max(behind)
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""In-memory stand-in for the ``sublime`` module.
+
+Only the parts of the API the plugin touches are implemented. The benchmark
+harness puts this directory first on ``sys.path`` so that the listeners can be
+driven outside of the editor.
+"""
+import os
+import re
+import tempfile
+
+INHIBIT_WORD_COMPLETIONS = 8
+INHIBIT_EXPLICIT_COMPLETIONS = 16
+DYNAMIC_COMPLETIONS = 32
+INHIBIT_REORDER = 128
+COOPERATE_WITH_AUTO_COMPLETE = 2
+HIDE_ON_MOUSE_MOVE_AWAY = 8
+DRAW_NO_OUTLINE = 256
+COMPLETION_FORMAT_TEXT = 0
+COMPLETION_FORMAT_SNIPPET = 1
+KIND_ID_COLOR_PURPLISH = 11
+OP_EQUAL = 0
+OP_NOT_EQUAL = 1
+
+_VERSION = "4126"
+_PACKAGES_PATH = os.path.join(tempfile.gettempdir(), "tabnine-bench-packages")
+_CACHE_PATH = os.path.join(tempfile.gettempdir(), "tabnine-bench-cache")
+
+
+def version():
+    return _VERSION
+
+
+def platform():
+    return "linux"
+
+
+def arch():
+    return "x64"
+
+
+def packages_path():
+    return _PACKAGES_PATH
+
+
+def cache_path():
+    return _CACHE_PATH
+
+
+class Region:
+    __slots__ = ("a", "b")
+
+    def __init__(self, a, b=None):
+        self.a = a
+        self.b = a if b is None else b
+
+    def begin(self):
+        return min(self.a, self.b)
+
+    def end(self):
+        return max(self.a, self.b)
+
+    def size(self):
+        return abs(self.b - self.a)
+
+    def empty(self):
+        return self.a == self.b
+
+    def contains(self, x):
+        if isinstance(x, Region):
+            return self.begin() <= x.begin() and x.end() <= self.end()
+        return self.begin() <= x <= self.end()
+
+    def __eq__(self, other):
+        return isinstance(other, Region) and (self.a, self.b) == (other.a, other.b)
+
+    def __hash__(self):
+        return hash((self.a, self.b))
+
+    def __repr__(self):
+        return "({}, {})".format(self.a, self.b)
+
+
+class Selection:
+    def __init__(self):
+        self._regions = []
+
+    def __len__(self):
+        return len(self._regions)
+
+    def __getitem__(self, index):
+        return self._regions[index]
+
+    def __iter__(self):
+        return iter(list(self._regions))
+
+    def clear(self):
+        self._regions = []
+
+    def add(self, region):
+        if not isinstance(region, Region):
+            region = Region(region)
+        self._regions.append(region)
+        self._regions.sort(key=Region.begin)
+
+    def subtract(self, region):
+        self._regions = [r for r in self._regions if r != region]
+
+
+class Settings:
+    def __init__(self, values=None):
+        self._values = dict(values or {})
+        self._on_change = {}
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def has(self, key):
+        return key in self._values
+
+    def set(self, key, value):
+        self._values[key] = value
+        self._changed()
+
+    def erase(self, key):
+        self._values.pop(key, None)
+        self._changed()
+
+    def add_on_change(self, tag, callback):
+        self._on_change[tag] = callback
+
+    def clear_on_change(self, tag):
+        self._on_change.pop(tag, None)
+
+    def _changed(self):
+        for callback in list(self._on_change.values()):
+            callback()
+
+
+_settings = {}
+
+
+def load_settings(base_name):
+    if base_name not in _settings:
+        _settings[base_name] = Settings()
+    return _settings[base_name]
+
+
+def save_settings(base_name):
+    pass
+
+
+_main_queue = []
+_async_queue = []
+
+
+def set_timeout(callback, delay=0):
+    _main_queue.append(callback)
+
+
+def set_timeout_async(callback, delay=0):
+    _async_queue.append(callback)
+
+
+def run_pending():
+    """Run queued timeouts until both queues are empty. Returns the count."""
+    count = 0
+    while _main_queue or _async_queue:
+        queue = _async_queue if _async_queue else _main_queue
+        callback = queue.pop(0)
+        callback()
+        count += 1
+    return count
+
+
+def status_message(msg):
+    pass
+
+
+class Window:
+    _next_id = 1
+
+    def __init__(self):
+        self._id = Window._next_id
+        Window._next_id += 1
+        self._views = []
+        self._active = None
+
+    def id(self):
+        return self._id
+
+    def views(self):
+        return list(self._views)
+
+    def active_view(self):
+        return self._active
+
+    def focus_view(self, view):
+        self._active = view
+
+    def status_message(self, msg):
+        pass
+
+    def new_file(self, text="", file_name=None, scope="source.python"):
+        view = View(self, text, file_name, scope)
+        self._views.append(view)
+        self._active = view
+        return view
+
+
+_windows = []
+
+
+def windows():
+    return list(_windows)
+
+
+def active_window():
+    if not _windows:
+        _windows.append(Window())
+    return _windows[0]
+
+
+class Edit:
+    pass
+
+
+def score_selector(scope, selector):
+    """Simplified selector matching: `|` and `,` alternatives, `&` and `-`.
+
+    A term matches when it is a dotted prefix of any scope name in `scope`.
+    """
+
+    def matches(term):
+        wanted = term.strip().split(".")
+        return any(
+            name.split(".")[: len(wanted)] == wanted for name in scope.split()
+        )
+
+    for alternative in re.split(r"[|,]", selector):
+        terms = alternative.replace("&", " ").split(" - ")
+        required = terms[0].split()
+        if not required or not all(matches(term) for term in required):
+            continue
+        if any(matches(term) for term in terms[1:] if term.strip()):
+            continue
+        return 1
+    return 0
+
+
+_WORD_RE = re.compile(r"\w")
+
+
+class View:
+    _next_id = 1
+
+    def __init__(self, window, text="", file_name=None, scope="source.python"):
+        self._id = View._next_id
+        View._next_id += 1
+        self._window = window
+        self._text = text
+        self._file_name = file_name
+        self._name = ""
+        self._scope = scope
+        self._comment_start = "#"
+        self._sel = Selection()
+        self._sel.add(Region(len(text)))
+        self._settings = Settings()
+        self._change_count = 0
+        self._command_history = []
+        self._status = {}
+        self._regions = {}
+        self._popup_visible = False
+        self.app = None
+
+    def id(self):
+        return self._id
+
+    def buffer_id(self):
+        return self._id
+
+    def window(self):
+        return self._window
+
+    def file_name(self):
+        return self._file_name
+
+    def name(self):
+        return self._name
+
+    def set_name(self, name):
+        self._name = name
+
+    def is_scratch(self):
+        return False
+
+    def is_valid(self):
+        return True
+
+    def size(self):
+        return len(self._text)
+
+    def change_count(self):
+        return self._change_count
+
+    def settings(self):
+        return self._settings
+
+    def sel(self):
+        return self._sel
+
+    def substr(self, x):
+        if isinstance(x, Region):
+            return self._text[x.begin() : x.end()]
+        if 0 <= x < len(self._text):
+            return self._text[x]
+        return "\x00"
+
+    def rowcol(self, point):
+        row = self._text.count("\n", 0, point)
+        return row, point - (self._text.rfind("\n", 0, point) + 1)
+
+    def text_point(self, row, col):
+        begin = 0
+        for _ in range(row):
+            begin = self._text.find("\n", begin) + 1
+        return begin + col
+
+    def line(self, x):
+        if isinstance(x, Region):
+            begin, end = x.begin(), x.end()
+        else:
+            begin = end = x
+        begin = self._text.rfind("\n", 0, begin) + 1
+        end = self._text.find("\n", end)
+        if end == -1:
+            end = len(self._text)
+        return Region(begin, end)
+
+    def word(self, x):
+        point = x.begin() if isinstance(x, Region) else x
+        begin = point
+        while begin > 0 and _WORD_RE.match(self._text[begin - 1]):
+            begin -= 1
+        end = point
+        while end < len(self._text) and _WORD_RE.match(self._text[end]):
+            end += 1
+        return Region(begin, end)
+
+    def scope_name(self, point):
+        """Base scope plus comment/string scopes found by a naive line scan."""
+        line = self.line(point)
+        scope = self._scope
+        quote = None
+        for index in range(line.begin(), min(point, line.end())):
+            char = self._text[index]
+            if quote is not None:
+                if char == quote and self._text[index - 1] != "\\":
+                    quote = None
+            elif char in "\"'":
+                quote = char
+            elif self._text.startswith(self._comment_start, index):
+                return scope + " comment.line "
+        if quote is not None:
+            return scope + " string.quoted "
+        return scope + " "
+
+    def match_selector(self, point, selector):
+        return score_selector(self.scope_name(point), selector) > 0
+
+    def set_scope(self, scope, comment_start="#"):
+        self._scope = scope
+        self._comment_start = comment_start
+
+    def command_history(self, index, modifying_only=False):
+        # 0 is the last command, negative indexes go further back.
+        position = len(self._command_history) - 1 + index
+        if 0 <= position < len(self._command_history):
+            return self._command_history[position]
+        return ("", None, 0)
+
+    def set_status(self, key, value):
+        self._status[key] = value
+
+    def erase_status(self, key):
+        self._status.pop(key, None)
+
+    def get_status(self, key):
+        return self._status.get(key, "")
+
+    def add_regions(self, key, regions, scope="", icon="", flags=0):
+        self._regions[key] = list(regions)
+
+    def get_regions(self, key):
+        return list(self._regions.get(key, []))
+
+    def erase_regions(self, key):
+        self._regions.pop(key, None)
+
+    def show_popup(self, content, flags=0, location=-1, **kwargs):
+        self._popup_visible = True
+
+    def hide_popup(self):
+        self._popup_visible = False
+
+    def is_popup_visible(self):
+        return self._popup_visible
+
+    def is_auto_complete_visible(self):
+        return self.app is not None and self.app.auto_complete_visible
+
+    def insert(self, edit, point, text):
+        self._text = self._text[:point] + text + self._text[point:]
+        self._change_count += 1
+        return len(text)
+
+    def erase(self, edit, region):
+        self._text = self._text[: region.begin()] + self._text[region.end() :]
+        self._change_count += 1
+
+    def replace(self, edit, region, text):
+        self._text = self._text[: region.begin()] + text + self._text[region.end() :]
+        self._change_count += 1
+
+    def run_command(self, name, args=None):
+        self._command_history.append((name, args, 1))
+        del self._command_history[:-100]
+        if self.app is not None:
+            self.app.run_command(self, name, args or {})
+
+
+class CompletionItem:
+    def __init__(
+        self,
+        trigger,
+        annotation="",
+        completion="",
+        completion_format=COMPLETION_FORMAT_TEXT,
+        kind=None,
+        details="",
+    ):
+        self.trigger = trigger
+        self.annotation = annotation
+        self.completion = completion
+        self.completion_format = completion_format
+        self.kind = kind
+        self.details = details
+
+
+class CompletionList:
+    def __init__(self, completions=None, flags=0):
+        self.completions = completions
+        self.flags = flags
+
+    def set_completions(self, completions, flags=0):
+        self.completions = completions
+        self.flags = flags
@@ -0,0 +1,46 @@
+"""In-memory stand-in for the ``sublime_plugin`` module."""
+import re
+
+text_commands = {}
+
+
+def _command_name(cls_name):
+    name = cls_name[: -len("Command")] if cls_name.endswith("Command") else cls_name
+    return re.sub(r"(?<!^)(?=[A-Z])", "_", name).lower()
+
+
+class Command:
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        text_commands[_command_name(cls.__name__)] = cls
+
+
+class TextCommand(Command):
+    def __init__(self, view):
+        self.view = view
+
+
+class WindowCommand(Command):
+    def __init__(self, window):
+        self.window = window
+
+
+class ApplicationCommand(Command):
+    pass
+
+
+class EventListener:
+    pass
+
+
+class ViewEventListener:
+    def __init__(self, view):
+        self.view = view
+
+
+def unload_plugin(name):
+    pass
+
+
+def reload_plugin(name):
+    pass
@@ -0,0 +1,33 @@
+"""Small helpers for summarizing latency samples in benchmark reports."""
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of `values`, `fraction` in [0, 1]."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def describe(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else float("nan"),
+        "p50": percentile(values, 0.5),
+        "p90": percentile(values, 0.9),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else float("nan"),
+    }
+
+
+HEADER = "{:<24} {:>7} {:>9} {:>9} {:>9} {:>9}".format(
+    "", "count", "p50 ms", "p90 ms", "p99 ms", "max ms"
+)
+
+
+def row(label, values):
+    stats = describe(values)
+    return "{:<24} {:>7} {:>9.2f} {:>9.2f} {:>9.2f} {:>9.2f}".format(
+        label, stats["count"], stats["p50"], stats["p90"], stats["p99"], stats["max"]
+    )
@@ -0,0 +1,112 @@
+import unittest
+
+from benchmarks import harness, listeners
+from tools import stub_tabnine
+
+
+def response_for(before):
+    return stub_tabnine.respond({"Autocomplete": {"before": before}})
+
+
+class TestCompletionCache(unittest.TestCase):
+    def setUp(self):
+        self.completion_cache = harness.load_module("lib.completion_cache")
+        self.cache = self.completion_cache.CompletionCache()
+
+    def test_answers_same_context_and_typed_identifier(self):
+        before = "import os\nvalue = pa"
+        self.cache.store("test", before, "\n", "a.py", 5, response_for(before))
+
+        self.assertEqual(
+            self.cache.lookup(before, "\n", "a.py", 5), response_for(before)
+        )
+        response = self.cache.lookup(before + "comp", "\n", "a.py", 5)
+        self.assertEqual(response["old_prefix"], "pacomp")
+        self.assertEqual(len(response["results"]), 5)
+        # Nothing is left to complete once a suggestion is typed out.
+        self.assertIsNone(self.cache.lookup(before + "completion_1", "\n", "a.py", 5))
+
+    def test_misses_after_other_edits(self):
+        before = "import os\nvalue = pa"
+        self.cache.store("test", before, "\n", "a.py", 5, response_for(before))
+
+        self.assertIsNone(self.cache.lookup(before + "(", "\n", "a.py", 5))
+        self.assertIsNone(self.cache.lookup(before + "x", "\n", "a.py", 5))
+        self.assertIsNone(self.cache.lookup(before[:-1], "\n", "a.py", 5))
+        self.assertIsNone(self.cache.lookup("import re\nvalue = pa", "\n", "a.py", 5))
+        self.assertIsNone(self.cache.lookup(before, "\nmore", "a.py", 5))
+        self.assertIsNone(self.cache.lookup(before, "\n", "b.py", 5))
+
+    def test_disables_source_with_low_hit_rate(self):
+        for i in range(self.completion_cache.MIN_SAMPLES + 1):
+            before = "value_{} = ".format(i)
+            self.cache.store("test", before, "", "a.py", 5, response_for(before))
+        self.assertEqual(self.cache.hit_rate("test"), 0)
+        self.assertFalse(self.cache.is_enabled("test"))
+
+
+class TestSpeculativeCompletions(unittest.TestCase):
+    def setUp(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+        self.addCleanup(harness.load_module("lib.completion_cache").cache.clear)
+
+    def test_popup_after_commit_is_served_from_cache(self):
+        editor, tabnine, _ = listeners.start("v3", "python")
+        settings = harness.load_module("lib.settings")
+        harness.sublime.load_settings(settings.SETTINGS_PATH).set(
+            "speculative_completions", True
+        )
+        editor.type("value = pa")
+        editor.press_tab()
+        editor.settle()
+        requests = tabnine.requests["Autocomplete"]
+
+        editor.type("c")
+
+        self.assertEqual(tabnine.requests["Autocomplete"], requests)
+        self.assertTrue(editor.completions)
+
+
+class TestIdlePrecompute(unittest.TestCase):
+    def setUp(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+        self.addCleanup(harness.load_module("lib.completion_cache").cache.clear)
+        self.scheduler = harness.load_module("lib.idle_precompute").scheduler
+        self.addCleanup(self.scheduler.sent.clear)
+
+    def pause(self, editor):
+        # The shim runs timeouts at once, so make the pause have happened.
+        self.scheduler.touch(editor.view)
+        self.scheduler.last_activity -= 10
+        editor.settle()
+
+    def test_first_popup_after_pause_is_served_from_cache(self):
+        editor, tabnine, _ = listeners.start("v3", "python")
+        editor.type("value = pa")
+        settings = harness.load_module("lib.settings")
+        tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        tabnine_settings.set("idle_precompute_ms", 1000)
+        tabnine_settings.set("idle_precompute_per_hour", 1)
+        requests = tabnine.requests["Autocomplete"]
+
+        self.pause(editor)
+        self.assertEqual(tabnine.requests["Autocomplete"], requests + 1)
+        requests += 1
+        # The same context is not requested twice.
+        self.pause(editor)
+        self.assertEqual(tabnine.requests["Autocomplete"], requests)
+
+        tabnine_settings.set("idle_precompute_ms", None)
+        editor.type("c")
+        self.assertEqual(tabnine.requests["Autocomplete"], requests)
+        self.assertTrue(editor.completions)
+
+        # Over the hourly budget.
+        tabnine_settings.set("idle_precompute_ms", 1000)
+        stats = harness.load_module("lib.stats")
+        stats.reset()
+        self.pause(editor)
+        self.assertEqual(tabnine.requests["Autocomplete"], requests)
+        self.assertEqual(stats.get_counters(), {"cache.idle.over_budget": 1})
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import harness, listeners
+
+RULE = """<?xml version="1.0" encoding="UTF-8"?>
+<plist version="1.0">
+<dict>
+    <key>scope</key>
+    <string>source.ruby</string>
+    <key>settings</key>
+    <dict>
+        <key>cancelCompletion</key>
+        <string>^\\s*end$</string>
+    </dict>
+</dict>
+</plist>
+"""
+
+
+class TestCompletionRules(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.addCleanup(listeners.reset_shim)
+        self.rules = harness.load_module("lib.completion_rules")
+        self.stats = harness.load_module("lib.stats")
+        self.stats.reset()
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        self.settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        self.window = harness.sublime.active_window()
+
+    def cancelled(self, text, scope="source.python"):
+        view = self.window.new_file(text, "/tmp/a", scope)
+        return self.rules.is_cancelled(view, view.size())
+
+    def test_package_rules(self):
+        self.assertTrue(self.cancelled("    return"))
+        self.assertTrue(self.cancelled("if a and"))
+        self.assertFalse(self.cancelled("    return val"))
+        self.assertTrue(self.cancelled("    else x", "source.js"))
+        self.assertFalse(self.cancelled("    end", "source.ruby"))
+        self.assertEqual(self.stats.get_counters()["rules.suppressed"], 3)
+
+    def test_long_line_is_searched_at_its_end(self):
+        self.settings.set("large_file_char_limit", 10)
+        self.assertTrue(self.cancelled("x = 1; " * 100 + "return"))
+        self.assertTrue(self.cancelled("    else x", "source.js"))
+        self.assertFalse(self.cancelled("x" * 100 + "    else x", "source.js"))
+
+    def test_user_rules(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        os.mkdir(os.path.join(directory, "Ruby"))
+        with open(os.path.join(directory, "Ruby", self.rules.RULES_FILE), "w") as f:
+            f.write(RULE)
+        self.settings.set("completion_rules_paths", [directory])
+
+        self.assertTrue(self.cancelled("    end", "source.ruby"))
+        self.assertTrue(self.cancelled("    return"))
+
+    def test_plist_escapes(self):
+        text = "<key>k</key><string>a &lt;&amp;lt; b &amp;&amp; &quot;c&quot;</string>"
+        self.assertEqual(self.rules.plist_string(text, "k"), 'a <&lt; b && "c"')
+
+    def test_no_request_is_sent(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+        editor, tabnine, _ = listeners.start("v2", "python")
+        editor.type("def f():\n    retur")
+        sent = tabnine.requests["Autocomplete"]
+        editor.type("n")
+        self.assertEqual(tabnine.requests["Autocomplete"], sent)
+        self.assertGreaterEqual(self.stats.get_counters()["rules.suppressed"], 1)
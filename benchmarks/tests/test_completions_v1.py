@@ -0,0 +1,70 @@
+import unittest
+
+from benchmarks import harness, listeners
+
+CHOICES = [
+    {"new_prefix": "value", "detail": "90%"},
+    {"new_prefix": "values", "detail": "80%"},
+    {"new_prefix": "validate", "detail": "70%\nmore"},
+    {"new_prefix": "valid < x", "detail": None},
+]
+
+
+class TestPopupContent(unittest.TestCase):
+    def setUp(self):
+        self.v1 = harness.load_module("completions.completions_v1")
+
+    def render_fresh(self, index, tab_only):
+        content = self.v1.PopupContent(CHOICES, ["see tabnine.com"], True)
+        return content.render(index, tab_only)
+
+    def test_tab_cycling_matches_a_full_rebuild(self):
+        content = self.v1.PopupContent(CHOICES, ["see tabnine.com"], True)
+        steps = [(None, False), (0, False), (1, True), (2, True), (3, True)]
+        steps += [(0, True), (None, False), (1, False)]
+        for index, tab_only in steps:
+            with self.subTest(index=index, tab_only=tab_only):
+                self.assertEqual(
+                    content.render(index, tab_only), self.render_fresh(index, tab_only)
+                )
+
+    def test_only_changed_rows_are_rebuilt(self):
+        content = self.v1.PopupContent(CHOICES, [], True)
+        content.render(0, True)
+        before = list(content._rows)
+        content.render(1, True)
+        changed = [i for i, row in enumerate(content._rows) if row is not before[i]]
+        # The selection moves to row 1 and "Tab" to row 2; with tab_only, row 0
+        # looks the same selected or not.
+        self.assertEqual(changed, [1, 2])
+
+
+class TestV1Popup(unittest.TestCase):
+    def setUp(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+
+    def test_tab_cycling_shows_the_rebuilt_popup(self):
+        editor, _, _ = listeners.start("v1", "python")
+        view = editor.view
+        shown = []
+        show_popup = view.show_popup
+
+        def record(content, *args, **kwargs):
+            shown.append(content)
+            return show_popup(content, *args, **kwargs)
+
+        view.show_popup = record
+        self.addCleanup(vars(view).pop, "show_popup", None)
+        editor.type("value = pa")
+        listener = editor.listeners[0]
+        choices = listener.choices
+        self.assertTrue(choices)
+
+        editor.press_tab()
+        editor.press_tab()
+        v1 = harness.load_module("completions.completions_v1")
+        fresh = v1.PopupContent(choices, listener.user_message, True)
+        # The second Tab selects choice 1, which only offers Tab from then on.
+        self.assertTrue(listener.tab_only)
+        self.assertEqual(shown[-1], fresh.render(1, True))
@@ -0,0 +1,61 @@
+import time
+import unittest
+
+from benchmarks import harness, listeners
+
+
+class TestDebouncer(unittest.TestCase):
+    def setUp(self):
+        self.debounce = harness.load_module("lib.debounce")
+        self.debouncer = self.debounce.Debouncer()
+        window = harness.sublime.active_window()
+        self.view = window.new_file("value = config.pa", "/tmp/a.py")
+
+    def typing(self, interval_ms, latency_ms):
+        self.debouncer.interval_ms = interval_ms
+        self.debouncer.latency_ms = latency_ms
+        self.debouncer.last_request = time.time() - interval_ms / 1000.0
+
+    def test_holds_requests_slower_than_typing(self):
+        self.typing(interval_ms=50, latency_ms=200)
+        self.assertEqual(self.debouncer.delay(self.view, self.view.size()), 100)
+
+        self.typing(interval_ms=50, latency_ms=20)
+        self.assertEqual(self.debouncer.delay(self.view, self.view.size()), 0)
+
+    def test_sends_after_pauses_and_trigger_characters(self):
+        self.typing(interval_ms=50, latency_ms=200)
+        self.debouncer.last_request -= 1
+        self.assertEqual(self.debouncer.delay(self.view, self.view.size()), 0)
+
+        self.typing(interval_ms=50, latency_ms=200)
+        # Right after the "." of "config."
+        self.assertEqual(self.debouncer.delay(self.view, 15), 0)
+
+
+class TestDebouncedListeners(unittest.TestCase):
+    def setUp(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+        self.stats = harness.load_module("lib.stats")
+        self.stats.reset()
+        self.debouncer = harness.load_module("lib.debounce").debouncer
+        self.addCleanup(setattr, self.debouncer, "latency_ms", None)
+
+    def test_burst_sends_only_the_last_request(self):
+        for version in ("v1", "v2", "v3"):
+            with self.subTest(version):
+                editor, tabnine, _ = listeners.start(version, "python")
+                editor.type("value = ")
+                tabnine.requests.clear()
+                self.stats.reset()
+                self.debouncer.interval_ms = 100
+                self.debouncer.latency_ms = 1000
+
+                editor.type("conf", settle=False)
+                editor.settle()
+                self.assertEqual(tabnine.requests["Autocomplete"], 1)
+                counters = self.stats.get_counters()
+                held = counters["debounce.held"]
+                self.assertEqual(counters.get("debounce.saved", 0), held - 1)
+                self.assertGreaterEqual(held, 1)
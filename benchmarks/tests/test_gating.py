@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import harness
+
+
+class TestGating(unittest.TestCase):
+    def setUp(self):
+        self.gating = harness.load_module("lib.gating")
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        self.settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        self.settings.set("gate_min_acceptance_rate", 0.05)
+        self.addCleanup(self.settings.erase, "gate_min_acceptance_rate")
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        path = os.path.join(self.directory, "acceptance.json")
+        self.gating._store = self.gating.AcceptanceStore(path)
+        self.addCleanup(setattr, self.gating, "_store", None)
+        window = harness.sublime.active_window()
+        self.view = window.new_file("# a comment\nvalue = ", "/tmp/a.py")
+
+    def test_scope_keys(self):
+        view = self.view
+        self.assertEqual(self.gating.get_key(view, 5), "py comment")
+        self.assertEqual(self.gating.get_key(view, view.size()), "py source.python")
+
+    def test_suppresses_rarely_accepted_scope_and_explores(self):
+        store = self.gating.get_store()
+        store.add("py comment", requests=100, accepted=1)
+        store.add("py source.python", requests=100, accepted=20)
+
+        self.assertEqual(self.gating.check(self.view, self.view.size()), 0)
+        decisions = [self.gating.check(self.view, 5) for _ in range(10)]
+        self.assertEqual(decisions, [None] * 9 + [0])
+        self.assertEqual(store.get("py comment"), [101, 1, 9])
+
+        self.settings.set("gate_delay_ms", 300)
+        self.addCleanup(self.settings.erase, "gate_delay_ms")
+        self.assertEqual(self.gating.check(self.view, 5), 300)
+        self.assertIsNone(self.gating.check(self.view, 5, can_delay=False))
+        self.assertEqual(store.get("py comment"), [101, 1, 10])
+
+    def test_no_bookkeeping_when_off(self):
+        self.settings.set("gate_min_acceptance_rate", None)
+        self.assertEqual(self.gating.check(self.view, 5), 0)
+        self.gating.record_accepted("py", "comment.line.python")
+        self.assertEqual(self.gating.get_store().items(), [])
+        self.assertFalse(self.gating.get_store().save_pending)
+
+    def test_rates_are_persisted(self):
+        self.gating.get_store().add("py comment", requests=3, accepted=1)
+        self.gating.get_store().save()
+
+        store = self.gating.AcceptanceStore(self.gating.get_store().path)
+        self.assertEqual(store.items(), [("py comment", [3, 1, 0])])
+        self.assertIn("py comment", self.gating.report())
@@ -0,0 +1,166 @@
+import threading
+import time
+import unittest
+
+from benchmarks import harness, listeners
+from tools import stub_tabnine
+
+
+class TestIdentifierIndex(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.addCleanup(listeners.reset_shim)
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        harness.sublime.load_settings(settings.SETTINGS_PATH).set(
+            "fallback_latency_ms", 500
+        )
+        self.identifier_index = harness.load_module("lib.identifier_index")
+        self.index = self.identifier_index.IdentifierIndex()
+        window = harness.sublime.active_window()
+        self.view = window.new_file("config_file = open(config_path)\n", "/tmp/a.py")
+        self.index.index_view(self.view)
+
+    def complete(self, prefix):
+        return self.index.complete(prefix, 5)
+
+    def type(self, text):
+        view = self.view
+        for char in text:
+            point = view.sel()[0].b
+            view.insert(harness.sublime.Edit(), point, char)
+            view.sel().clear()
+            view.sel().add(harness.sublime.Region(point + 1))
+            self.index.update(view)
+            self.index.track_cursor(view)
+
+    def test_completes_most_frequent_first(self):
+        self.assertEqual(self.complete("con"), ["config_file", "config_path"])
+        self.type("config_path")
+        self.assertEqual(self.complete("con"), ["config_path", "config_file"])
+
+    def test_follows_edits_of_the_cursor_line(self):
+        view = self.view
+        view.sel().clear()
+        view.sel().add(harness.sublime.Region(view.size()))
+        self.index.track_cursor(view)
+
+        self.type("settings_file")
+        self.assertEqual(self.complete("set"), ["settings_file"])
+        # Intermediate words of the typed identifier are gone again.
+        self.assertEqual(self.complete("setti"), ["settings_file"])
+
+        view.erase(harness.sublime.Edit(), harness.sublime.Region(32, view.size()))
+        view.sel().clear()
+        view.sel().add(harness.sublime.Region(32))
+        self.index.update(view)
+        self.assertEqual(self.complete("set"), [])
+        self.assertEqual(
+            self.index.word_list.words, ["config_file", "config_path", "open"]
+        )
+
+    def test_removed_view_is_forgotten(self):
+        self.index.remove_view(self.view)
+        self.assertEqual(self.complete("con"), [])
+        self.assertEqual(self.index.word_list.counts, {})
+        self.assertEqual(self.index.word_list.words, [])
+
+    def test_lookup_is_fast_on_a_large_index(self):
+        window = harness.sublime.active_window()
+        text = "".join("name_{0} = value_{0}\n".format(i) for i in range(50000))
+        self.index.index_view(window.new_file(text, "/tmp/large.py"))
+        started = time.perf_counter()
+        for _ in range(100):
+            self.complete("na")
+        self.assertLess((time.perf_counter() - started) / 100, 0.001)
+
+
+class TestFallbackCompletions(unittest.TestCase):
+    def setUp(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+
+    def set_budget(self, budget_ms):
+        settings = harness.load_module("lib.settings")
+        harness.sublime.load_settings(settings.SETTINGS_PATH).set(
+            "fallback_latency_ms", budget_ms
+        )
+
+    def test_off_by_default(self):
+        listeners.start("v3", "python")
+        process = harness.load_module("lib.tab_nine_process")
+        process.tabnine_proc.request = lambda request: None
+        requests = harness.load_module("lib.requests")
+        self.assertIsNone(
+            requests.autocomplete("x = unus", "", "/tmp/bench.py", True, True)
+        )
+
+    def test_answers_from_open_views_without_tabnine(self):
+        editor, _, _ = listeners.start("v3", "python")
+        self.set_budget(500)
+        editor.type("unusual_identifier = 1\n")
+        process = harness.load_module("lib.tab_nine_process")
+        process.tabnine_proc.request = lambda request: None
+
+        editor.type("unus")
+        self.assertTrue(editor.auto_complete_visible)
+        requests = harness.load_module("lib.requests")
+        response = requests.autocomplete("x = unus", "", "/tmp/bench.py", True, True)
+        origin = harness.load_module("lib.completion_origin").CompletionOrigin
+        self.assertEqual(response["old_prefix"], "unus")
+        self.assertEqual(
+            [(r["new_prefix"], r["origin"]) for r in response["results"]],
+            [("unusual_identifier", origin.VANILLA)],
+        )
+
+    def test_late_answer_is_kept_for_the_next_keystroke(self):
+        listeners.start("v3", "python")
+        process = harness.load_module("lib.tab_nine_process")
+        self.set_budget(50)
+        cache = harness.load_module("lib.completion_cache").cache
+        self.addCleanup(cache.clear)
+        requests = harness.load_module("lib.requests")
+        release = threading.Event()
+
+        def slow_request(request):
+            release.wait(5)
+            return stub_tabnine.respond(request)
+
+        process.tabnine_proc.request = slow_request
+        response = requests.autocomplete("x = unus", "", "/tmp/bench.py", True, True)
+        self.assertNotIn(
+            "unuscompletion_0", [r["new_prefix"] for r in response["results"]]
+        )
+        release.set()
+        deadline = time.time() + 5
+        while not cache.entries and time.time() < deadline:
+            time.sleep(0.01)
+
+        process.tabnine_proc.request = lambda request: None
+        response = requests.autocomplete("x = unus", "", "/tmp/bench.py", True, True)
+        self.assertEqual(response["results"][0]["new_prefix"], "unuscompletion_0")
+
+    def test_requests_share_one_worker_and_stale_ones_are_dropped(self):
+        listeners.start("v3", "python")
+        process = harness.load_module("lib.tab_nine_process")
+        self.set_budget(20)
+        requests = harness.load_module("lib.requests")
+        release = threading.Event()
+        sent = []
+
+        def slow_request(request):
+            sent.append(request["Autocomplete"]["before"])
+            release.wait(5)
+            return None
+
+        process.tabnine_proc.request = slow_request
+        threads = threading.active_count()
+        for before in ("x = a", "x = ab", "x = abc"):
+            requests.autocomplete(before, "", "/tmp/bench.py", True, True)
+        self.assertLessEqual(threading.active_count(), threads + 1)
+        release.set()
+        deadline = time.time() + 5
+        while not requests.worker.jobs.empty() and time.time() < deadline:
+            time.sleep(0.01)
+        # The later requests were given up on before TabNine was free.
+        self.assertEqual(sent, ["x = a"])
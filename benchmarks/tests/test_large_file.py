@@ -0,0 +1,54 @@
+import unittest
+
+from benchmarks import harness, listeners
+
+
+class TestLargeFile(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.addCleanup(listeners.reset_shim)
+        self.large_file = harness.load_module("lib.large_file")
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        self.settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        self.window = harness.sublime.active_window()
+
+    def test_detects_size_and_long_lines(self):
+        self.settings.set("large_file_size", 5000)
+        self.settings.set("large_file_line_length", 1000)
+        small = self.window.new_file("value = 1\n" * 10, "/tmp/small.py")
+        large = self.window.new_file("value = 1\n" * 600, "/tmp/large.log")
+        minified = self.window.new_file("var a=1;" * 200, "/tmp/bundle.min.js")
+        for view in (small, large, minified):
+            self.large_file.check_view(view)
+
+        self.assertFalse(self.large_file.is_large_file(small))
+        self.assertTrue(self.large_file.is_large_file(large))
+        self.assertTrue(self.large_file.is_large_file(minified))
+        self.assertFalse(small.get_status(self.large_file.STATUS_KEY))
+        self.assertIn("large file", large.get_status(self.large_file.STATUS_KEY))
+        self.assertEqual(self.large_file.char_limit(small, 100000), 100000)
+        self.assertEqual(self.large_file.char_limit(minified, 100000), 2000)
+
+    def test_large_view_sends_less(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+        tabnine = harness.FakeTabNine().install()
+        sent = []
+
+        def request(req):
+            sent.append(req)
+            return tabnine.request(req)
+
+        process.tabnine_proc.request = request
+        self.settings.set("large_file_line_length", 1000)
+        v2 = harness.load_module("completions.completions_v2")
+        text = "var a=1;" * 5000 + "\n"
+        editor = harness.Editor([v2.TabNineListener()], text=text)
+        editor.settle()
+        editor.type("value = conf")
+
+        self.assertEqual(tabnine.requests["Prefetch"], 0)
+        autocomplete = [r["Autocomplete"] for r in sent if "Autocomplete" in r]
+        self.assertTrue(autocomplete)
+        self.assertTrue(all(len(r["before"]) <= 2000 for r in autocomplete))
@@ -0,0 +1,28 @@
+import unittest
+
+from benchmarks import harness, listeners
+
+
+class TestListenerMemory(unittest.TestCase):
+    def setUp(self):
+        self.memory = harness.load_module("lib.memory")
+        process = harness.load_module("lib.tab_nine_process")
+        # listeners.start() answers requests from a FakeTabNine.
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+
+    def test_listeners_hold_no_copy_of_the_buffer(self):
+        for version in sorted(listeners.LISTENERS):
+            with self.subTest(version=version):
+                editor, _, _ = listeners.start(version, "large-file")
+                for key in "return js":
+                    editor.key(key)
+                    editor.settle()
+                listener = editor.listeners[0]
+                view_id = editor.view.id()
+
+                held = self.memory.deep_size(listener.memory_by_view().get(view_id))
+                self.assertLess(held, 16 * 1024)
+                self.assertIn(view_id, self.memory.get_footprints())
+
+                listener.on_close(editor.view)
+                self.assertEqual(listener.memory_by_view(), {})
@@ -0,0 +1,65 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import harness, listeners
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.addCleanup(listeners.reset_shim)
+        self.metrics = harness.load_module("lib.metrics")
+        self.stats = harness.load_module("lib.stats")
+        self.stats.reset()
+        self.addCleanup(self.stats.reset)
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        self.settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "metrics", "tabnine.jsonl")
+        self.settings.set("metrics_path", self.path)
+
+        self.stats.increment("process.restarts")
+        self.stats.increment("rules.suppressed", 3)
+        self.stats.observe("request.Autocomplete", 3)
+        self.stats.observe("request.Autocomplete", 40)
+
+    def test_jsonl_snapshots_rotate(self):
+        self.settings.set("metrics_max_bytes", 1)
+        self.metrics.export()
+        self.metrics.export()
+
+        self.assertFalse(os.path.exists(self.path))
+        with open(self.path + ".1") as metrics_file:
+            data = json.loads(metrics_file.read())
+        self.assertEqual(data["counters"]["rules.suppressed"], 3)
+        histogram = data["histograms"]["request.Autocomplete"]
+        self.assertEqual(histogram["count"], 2)
+        self.assertEqual(sum(histogram["buckets"]), 2)
+
+    def test_prometheus_text(self):
+        self.settings.set("metrics_format", "prometheus")
+        self.metrics.export()
+
+        with open(self.path) as metrics_file:
+            lines = metrics_file.read().splitlines()
+        self.assertIn("tabnine_process_restarts_total 1", lines)
+        self.assertIn('tabnine_request_Autocomplete_ms_bucket{le="4"} 1', lines)
+        self.assertIn('tabnine_request_Autocomplete_ms_bucket{le="+Inf"} 2', lines)
+        self.assertIn("tabnine_request_Autocomplete_ms_count 2", lines)
+
+    def test_nothing_runs_when_off_or_unloaded(self):
+        self.settings.erase("metrics_path")
+        self.metrics.watch()
+        self.assertEqual(harness.sublime.run_pending(), 0)
+
+        self.settings.set("metrics_path", self.path)
+        self.metrics.unwatch()
+        self.metrics.schedule()
+        self.metrics.unwatch()
+        harness.sublime.run_pending()
+        self.assertFalse(os.path.exists(self.path))
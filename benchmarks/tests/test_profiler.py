@@ -0,0 +1,52 @@
+import contextlib
+import io
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import harness
+
+
+def listener_work():
+    return [str(i) for i in range(1000)]
+
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        settings = harness.load_module("lib.settings")
+        self.profiler = harness.load_module("lib.profiler")
+        self.stall_detector = harness.load_module("lib.stall_detector")
+        settings.watch()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        tabnine_settings.set(
+            "log_file_path", os.path.join(self.directory, "tabnine.log")
+        )
+        self.addCleanup(tabnine_settings.erase, "log_file_path")
+        self.addCleanup(self.stall_detector.stop)
+
+    def test_writes_pstats_and_allocations_next_to_log_file(self):
+        class Listener:
+            @self.stall_detector.instrument
+            def on_modified(self, view):
+                return listener_work()
+
+        view = harness.sublime.View(harness.sublime.Window(), "")
+        self.profiler.start(60)
+        Listener().on_modified(view)
+        with contextlib.redirect_stdout(io.StringIO()):
+            paths = self.profiler.stop()
+
+        self.assertIsNone(self.profiler.session)
+        self.assertEqual(
+            [os.path.dirname(path) for path in paths], [self.directory] * 2
+        )
+        functions = pstats.Stats(paths[0]).stats
+        self.assertIn("listener_work", [name for _, _, name in functions])
+        with open(paths[1]) as report:
+            self.assertIn("test_profiler.py", report.read())
+        # The timeout scheduled by start() must not stop a later session.
+        harness.sublime.run_pending()
@@ -0,0 +1,87 @@
+import unittest
+
+from benchmarks import harness, listeners
+
+
+class TestResultCounts(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.addCleanup(listeners.reset_shim)
+        self.result_count = harness.load_module("lib.result_count")
+        self.counts = self.result_count.ResultCounts()
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        self.settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        self.settings.set("result_latency_budget_ms", 40)
+
+    def requests(self, latency_ms, accepted_indexes=()):
+        for index in accepted_indexes:
+            self.counts.record_accepted("py", index)
+        for _ in range(self.result_count.ADJUST_EVERY):
+            self.counts.observe_latency("py", latency_ms)
+        return self.counts.get("py", 5)
+
+    def test_fixed_when_off(self):
+        self.settings.set("result_latency_budget_ms", None)
+        self.assertEqual(self.counts.get("py", 7), 7)
+        self.assertIsNone(self.counts.get("py", None))
+
+    def test_lowers_over_budget(self):
+        self.assertEqual(self.counts.get("py", 5), 5)
+        self.assertEqual(self.requests(80), 4)
+        self.assertEqual(self.requests(80), 3)
+        self.assertEqual(self.counts.get("js", 5), 5)
+
+    def test_follows_accepted_positions_under_budget(self):
+        self.counts.get("py", 5)
+        # Fast, but nothing was accepted yet.
+        self.assertEqual(self.requests(5), 5)
+        self.assertEqual(self.requests(5, [0] * 17 + [4] * 3), 6)
+        self.assertEqual(self.requests(5, [0] * 20), 5)
+
+
+class TestAdaptiveRequests(unittest.TestCase):
+    def setUp(self):
+        self.process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(self.process.tabnine_proc).pop, "request", None)
+
+    def test_requests_use_the_adapted_count(self):
+        editor, tabnine, _ = listeners.start("v3", "python")
+        settings = harness.load_module("lib.settings")
+        harness.sublime.load_settings(settings.SETTINGS_PATH).set(
+            "result_latency_budget_ms", 40
+        )
+        counts = harness.load_module("lib.result_count").counts
+        self.addCleanup(counts.languages.clear)
+        counts.get("py", 5)
+        counts.languages["py"].count = 3
+        sent = []
+        request = self.process.tabnine_proc.request
+
+        def record(req):
+            sent.append(req)
+            return request(req)
+
+        self.process.tabnine_proc.request = record
+        editor.type("value = pa")
+        autocomplete = [r["Autocomplete"] for r in sent if "Autocomplete" in r]
+        self.assertTrue(autocomplete)
+        self.assertTrue(all(r["max_num_results"] == 3 for r in autocomplete))
+
+    def test_v1_records_the_completion_tabbed_to_once(self):
+        editor, _, _ = listeners.start("v1", "python")
+        settings = harness.load_module("lib.settings")
+        harness.sublime.load_settings(settings.SETTINGS_PATH).set(
+            "result_latency_budget_ms", 40
+        )
+        counts = harness.load_module("lib.result_count").counts
+        self.addCleanup(counts.languages.clear)
+        counts.get("py", 5)
+        editor.type("value = pa")
+        editor.press_tab()
+        editor.press_tab()
+        self.assertEqual(counts.languages["py"].accepted, 0)
+
+        editor.type(" ")
+        self.assertEqual(counts.languages["py"].accepted, 1)
+        self.assertEqual(counts.languages["py"].accepted_last, 0)
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks import harness, listeners
+
+
+class TestSettingsSnapshot(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.settings = harness.load_module("lib.settings")
+        self.addCleanup(self.settings.watch)
+        self.addCleanup(listeners.reset_shim)
+        self.tabnine = harness.sublime.load_settings(self.settings.SETTINGS_PATH)
+        self.preferences = harness.sublime.load_settings(self.settings.PREFERENCES_PATH)
+
+    def test_snapshot_before_plugin_loaded_is_parsed_from_the_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "TabNine.sublime-settings")
+        with open(path, "w") as user_settings:
+            user_settings.write('{\n    "max_num_results": 3,\n}')
+        self.addCleanup(
+            setattr, self.settings, "_settings_dir", self.settings._settings_dir
+        )
+        self.settings._settings_dir = path
+        self.settings._SNAPSHOT = None
+
+        self.assertEqual(self.settings.get_settings().max_num_results, 3)
+        self.tabnine.set("max_num_results", 7)
+        self.assertEqual(self.settings.get_settings().max_num_results, 3)
+
+        self.settings.watch()
+        self.assertEqual(self.settings.get_settings().max_num_results, 7)
+
+    def test_edits_refresh_the_snapshot(self):
+        self.settings.watch()
+        snapshot = self.settings.get_settings()
+        self.assertEqual(snapshot.max_num_results, 5)
+        self.assertIsNone(snapshot.auto_complete_delay)
+
+        self.tabnine.set("max_num_results", 8)
+        self.assertEqual(self.settings.get_settings().max_num_results, 8)
+        self.preferences.set("auto_complete_delay", 1500)
+        self.assertEqual(self.settings.get_settings().auto_complete_delay, 1500)
+        # Snapshots already handed out keep their values.
+        self.assertEqual(snapshot.max_num_results, 5)
+        with self.assertRaises(AttributeError):
+            snapshot.max_num_results = 1
+
+    def test_unwatch_clears_the_callbacks(self):
+        self.settings.watch()
+        self.settings.unwatch()
+        self.assertEqual(self.tabnine._on_change, {})
+        self.assertEqual(self.preferences._on_change, {})
+
+        self.tabnine.set("max_num_results", 8)
+        self.assertEqual(self.settings.get_settings().max_num_results, 5)
@@ -0,0 +1,41 @@
+import contextlib
+import io
+import time
+import unittest
+
+from benchmarks import harness
+
+
+def busy_helper(seconds):
+    time.sleep(seconds)
+
+
+class TestStallDetector(unittest.TestCase):
+    def setUp(self):
+        settings = harness.load_module("lib.settings")
+        self.stats = harness.load_module("lib.stats")
+        self.stall_detector = harness.load_module("lib.stall_detector")
+        settings.watch()
+        harness.sublime.load_settings(settings.SETTINGS_PATH).set("stall_budget_ms", 16)
+        self.stats.reset()
+        self.addCleanup(self.stall_detector.stop)
+
+    def test_slow_callback_is_logged_with_sampled_stack(self):
+        class Listener:
+            @self.stall_detector.instrument
+            def on_text_command(self, view, command_name, args):
+                busy_helper(0.05 if command_name == "slow" else 0)
+
+        listener = Listener()
+        view = harness.sublime.View(harness.sublime.Window(), "")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            listener.on_text_command(view, "fast", None)
+            listener.on_text_command(view, "slow", None)
+
+        histogram = self.stats.get_histograms()["ui.on_text_command"]
+        self.assertEqual(histogram.count, 2)
+        self.assertGreaterEqual(histogram.max, 50)
+        self.assertEqual(self.stats.get_counters(), {"stalls.on_text_command": 1})
+        self.assertIn("command slow", output.getvalue())
+        self.assertIn("busy_helper", output.getvalue())
@@ -0,0 +1,266 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from benchmarks import harness, listeners, replay
+from tools import stub_tabnine
+
+
+class TestProcessSurvivesReload(unittest.TestCase):
+    def reload_package(self):
+        for name in list(sys.modules):
+            if name.startswith("TabNine.") and name != "TabNine.lib.process_handle":
+                del sys.modules[name]
+        return harness.load_module("lib.tab_nine_process")
+
+    def start_binary(self):
+        process = harness.load_module("lib.tab_nine_process")
+        process.tabnine_proc.run_tabnine = lambda: subprocess.Popen(
+            [sys.executable, stub_tabnine.__file__],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.assertIsNotNone(process.tabnine_proc.request({"Features": {}}))
+        return process, process.tabnine_proc.tabnine_proc
+
+    def test_reloaded_module_adopts_running_binary(self):
+        process, binary = self.start_binary()
+
+        reloaded = self.reload_package()
+
+        self.assertIsNot(reloaded, process)
+        self.assertIs(reloaded.tabnine_proc.tabnine_proc, binary)
+        self.assertIs(reloaded.tabnine_proc.lock, process.tabnine_proc.lock)
+        self.assertIsNotNone(reloaded.tabnine_proc.request({"Features": {}}))
+
+        reloaded.release_tabnine_proc()
+        harness.sublime.run_pending()
+        self.assertIsNone(reloaded.tabnine_proc.tabnine_proc)
+        binary.communicate()
+
+    def test_mode_switch_keeps_the_binary(self):
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        tabnine_settings.set("native_auto_complete", True)
+        self.addCleanup(tabnine_settings.erase, "native_auto_complete")
+        process, binary = self.start_binary()
+
+        # The reloaded settings module reads native_auto_complete as false.
+        reloaded = self.reload_package()
+
+        self.assertFalse(reloaded.is_native_auto_complete())
+        self.assertIs(reloaded.tabnine_proc.tabnine_proc, binary)
+        reloaded.tabnine_proc.stop()
+        binary.communicate()
+
+    def test_binary_with_other_launch_settings_is_restarted(self):
+        process, binary = self.start_binary()
+        # As if extra_args was changed since the binary started.
+        process.tabnine_proc.launch_settings = (None, None, ["--other"])
+
+        reloaded = self.reload_package()
+
+        self.assertIsNone(reloaded.tabnine_proc.tabnine_proc)
+        binary.communicate()
+        self.assertIsNotNone(binary.returncode)
+
+
+class TestRequestTimeout(unittest.TestCase):
+    def setUp(self):
+        settings = harness.load_module("lib.settings")
+        self.process = harness.load_module("lib.tab_nine_process")
+        settings.watch()
+        tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        tabnine_settings.set("request_timeout_ms", 200)
+        self.addCleanup(tabnine_settings.erase, "request_timeout_ms")
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.marker = os.path.join(directory, "fault")
+
+    def start(self, *fault):
+        tabnine = self.process.TabNineProcess()
+        tabnine.run_tabnine = lambda: subprocess.Popen(
+            [sys.executable, stub_tabnine.__file__, "--fault-once", self.marker]
+            + list(fault),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self.addCleanup(tabnine.stop)
+        return tabnine
+
+    def test_hung_binary_is_restarted(self):
+        tabnine = self.start("--fault", "hang", "--fault-after", "1")
+        self.assertIsNotNone(tabnine.request({"Features": {}}))
+        self.assertIsNone(tabnine.request({"Features": {}}))
+        self.assertEqual(tabnine.num_restarts, 1)
+        self.assertIsNotNone(tabnine.request({"Features": {}}))
+
+    def test_hung_binary_is_dropped_after_max_restarts(self):
+        tabnine = self.start("--fault", "hang", "--fault-after", "1")
+        self.assertIsNotNone(tabnine.request({"Features": {}}))
+        hung = tabnine.tabnine_proc
+        tabnine.num_restarts = self.process.MAX_RESTARTS
+        self.assertIsNone(tabnine.request({"Features": {}}))
+        self.assertIsNone(tabnine.tabnine_proc)
+        self.assertIsNotNone(hung.wait(5))
+        self.assertIsNone(tabnine.request({"Features": {}}))
+
+    def test_first_request_waits_for_startup(self):
+        tabnine = self.start("--fault", "slow-start", "--fault-after", "5")
+        self.assertIsNotNone(tabnine.request({"Features": {}}))
+        self.assertEqual(tabnine.num_restarts, 0)
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "needs prlimit")
+class TestProcessLimits(unittest.TestCase):
+    def test_limits_are_applied_after_start(self):
+        import resource
+
+        settings = harness.load_module("lib.settings")
+        governor = harness.load_module("lib.process_governor")
+        settings.watch()
+        tabnine_settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        limits = {
+            "process_nice": 3,
+            "process_cpu_affinity": [0],
+            "process_memory_limit_mb": 512,
+        }
+        for key, value in limits.items():
+            tabnine_settings.set(key, value)
+            self.addCleanup(tabnine_settings.erase, key)
+        proc = subprocess.Popen(
+            [sys.executable, "-c", "input()"], stdin=subprocess.PIPE
+        )
+        self.addCleanup(proc.communicate, b"\n")
+
+        governor.apply_limits(proc.pid)
+        priority = os.getpriority(os.PRIO_PROCESS, os.getpid())
+        self.assertEqual(os.getpriority(os.PRIO_PROCESS, proc.pid), priority + 3)
+        self.assertEqual(os.sched_getaffinity(proc.pid), {0})
+        limit = 512 * 1024 * 1024
+        self.assertEqual(resource.prlimit(proc.pid, resource.RLIMIT_AS), (limit, limit))
+
+
+class FakeProc:
+    pid = 1
+
+    def poll(self):
+        return None
+
+
+class FakeTabNineProcess:
+    def __init__(self):
+        self.tabnine_proc = FakeProc()
+        self.restarts = 0
+
+    def idle_seconds(self):
+        return 3600
+
+    def restart_tabnine_proc(self):
+        self.restarts += 1
+
+
+class TestProcessMonitor(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.addCleanup(listeners.reset_shim)
+        settings = harness.load_module("lib.settings")
+        settings.watch()
+        self.settings = harness.sublime.load_settings(settings.SETTINGS_PATH)
+        self.governor = harness.load_module("lib.process_governor")
+        self.process = FakeTabNineProcess()
+        self.monitor = self.governor.ProcessMonitor(self.process)
+
+    def test_restart_keeps_one_polling_chain(self):
+        queue = harness.sublime._async_queue
+        self.monitor.start()
+        self.monitor.stop()
+        self.monitor.start()
+        self.assertEqual(len(queue), 2)
+        for check in list(queue):
+            queue.remove(check)
+            check()
+        self.assertEqual(len(queue), 1)
+        self.monitor.stop()
+        queue.pop()()
+        self.assertEqual(queue, [])
+
+    def test_restarts_a_busy_idle_process(self):
+        usage = iter([(0, 10.0), (0, 19.0)])
+        self.addCleanup(setattr, self.governor, "read_usage", self.governor.read_usage)
+        self.governor.read_usage = lambda pid: next(usage)
+        self.settings.set("process_max_cpu_percent", 50)
+        self.assertTrue(self.governor.is_monitored())
+
+        self.monitor.sample()
+        self.assertEqual(self.process.restarts, 0)
+        self.monitor.sample()
+        self.assertEqual(self.monitor.cpu_percent, 90.0)
+        self.assertEqual(self.process.restarts, 1)
+
+
+class TestRecorder(unittest.TestCase):
+    def setUp(self):
+        self.settings = harness.load_module("lib.settings")
+        self.recorder = harness.load_module("lib.recorder")
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "requests.jsonl")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_records_redacted_entries_and_rotates(self):
+        recorder = self.recorder.Recorder(self.path, 2000, 2, redact_context=True)
+        request = {
+            "Autocomplete": {"before": "def f(x):\n    ret", "filename": "/a/b.py"}
+        }
+        response = stub_tabnine.respond(request)
+        for i in range(10):
+            recorder.record(request, response, started=i, elapsed=0.001)
+        recorder.close()
+
+        self.assertEqual(
+            sorted(os.listdir(self.directory)),
+            ["requests.jsonl", "requests.jsonl.1", "requests.jsonl.2"],
+        )
+        with open(self.path + ".1") as recording:
+            entry = json.loads(recording.readline())
+        autocomplete = entry["request"]["Autocomplete"]
+        self.assertEqual(autocomplete["before"], "xxx xxxxx\n    xxx")
+        self.assertEqual(autocomplete["filename"], "redacted.py")
+        self.assertEqual(entry["ms"], 1.0)
+        self.assertNotIn("ret", json.dumps(entry["response"]))
+
+    def test_replays_only_requests_without_side_effects(self):
+        recorder = self.recorder.Recorder(self.path, 10000, 1, redact_context=True)
+        autocomplete = {"Autocomplete": {"before": "ret", "filename": "/a/b.py"}}
+        requests = [autocomplete, {"Uninstalling": {}}, {"Prefetch": {}}]
+        requests.append({"SetState": {"state_type": {}}})
+        for request in requests:
+            recorder.record(request, {}, started=0, elapsed=0.001)
+        recorder.close()
+
+        sent = []
+
+        class Process:
+            def request(self, request):
+                sent.append(next(iter(request)))
+                return {}
+
+        entries = replay.read_recordings([self.path])
+        results = replay.replay(entries, Process(), fast=True)
+        skipped, redacted = results[4:6]
+        self.assertEqual(sent, ["Autocomplete", "Prefetch"])
+        self.assertEqual(skipped, {"Uninstalling": 1, "SetState": 1})
+        self.assertEqual(redacted, 1)
+
+        del sent[:]
+        kinds = replay.REPLAYED + ("SetState",)
+        entries = replay.read_recordings([self.path])
+        replay.replay(entries, Process(), fast=True, kinds=kinds)
+        self.assertEqual(sent, ["Autocomplete", "Prefetch", "SetState"])
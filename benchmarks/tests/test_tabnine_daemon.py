@@ -0,0 +1,113 @@
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+from benchmarks import harness
+from tools import stub_tabnine, tabnine_daemon
+
+STUB = [sys.executable, stub_tabnine.__file__]
+
+
+@unittest.skipUnless(hasattr(tabnine_daemon.socketserver, "UnixStreamServer"), "")
+class TestTabNineDaemon(unittest.TestCase):
+    def setUp(self):
+        self.process = harness.load_module("lib.tab_nine_process")
+        self.settings = harness.load_module("lib.settings")
+        self.directory = tempfile.mkdtemp()
+        self.socket_path = os.path.join(self.directory, "tabnine.sock")
+        self.daemon = None
+
+    def tearDown(self):
+        if self.daemon is not None:
+            self.daemon.shutdown()
+            self.daemon.server_close()
+        harness.sublime.load_settings(self.settings.SETTINGS_PATH).erase(
+            "daemon_socket_path"
+        )
+        os.rmdir(self.directory)
+
+    def start_daemon(self, command=STUB, timeout=tabnine_daemon.DEFAULT_TIMEOUT):
+        self.daemon = tabnine_daemon.Daemon(
+            self.socket_path, tabnine_daemon.Backend(command, timeout)
+        )
+        threading.Thread(target=self.daemon.serve_forever, daemon=True).start()
+
+    def autocomplete_line(self, before):
+        request = '{"version": "2.0.2", "request": {"Autocomplete": {"before": "%s"}}}'
+        return (request % before).encode("utf-8") + b"\n"
+
+    def test_clients_share_one_binary(self):
+        self.start_daemon()
+        connections = [self.process.DaemonConnection(self.socket_path) for _ in "abc"]
+        for prefix, connection in zip("abc", connections):
+            response = connection.exchange(self.autocomplete_line(prefix))
+            self.assertIn('"old_prefix": "{}"'.format(prefix), response.decode())
+        for connection in connections:
+            connection.close()
+        self.assertEqual(self.daemon.backend.num_restarts, 0)
+
+    def test_reconnects_after_daemon_restart(self):
+        self.start_daemon()
+        connection = self.process.DaemonConnection(self.socket_path)
+        connection.exchange(self.autocomplete_line("x"))
+        self.daemon.shutdown()
+        self.daemon.server_close()
+        self.start_daemon()
+        response = connection.exchange(self.autocomplete_line("y"))
+        self.assertIn('"old_prefix": "y"', response.decode())
+        connection.close()
+
+    def test_falls_back_to_private_process(self):
+        self.settings.watch()
+        harness.sublime.load_settings(self.settings.SETTINGS_PATH).set(
+            "daemon_socket_path", self.socket_path
+        )
+        subprocess = self.process.subprocess
+        proc = self.process.TabNineProcess()
+        proc.run_tabnine = lambda: subprocess.Popen(
+            STUB, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        self.assertIsNotNone(proc.request({"Features": {}}))
+        self.assertIsNotNone(proc.tabnine_proc)
+
+        proc.stop()
+
+    def test_private_process_stops_when_daemon_answers(self):
+        self.settings.watch()
+        harness.sublime.load_settings(self.settings.SETTINGS_PATH).set(
+            "daemon_socket_path", self.socket_path
+        )
+        subprocess = self.process.subprocess
+        proc = self.process.TabNineProcess()
+        proc.run_tabnine = lambda: subprocess.Popen(
+            STUB, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+        )
+        self.assertIsNotNone(proc.request({"Features": {}}))
+        private = proc.tabnine_proc
+
+        self.start_daemon()
+        proc.daemon.retry_at = 0
+        self.assertIsNotNone(proc.request({"Features": {}}))
+        self.assertIsNotNone(self.daemon.backend.proc)
+        self.assertIsNone(proc.tabnine_proc)
+        private.communicate()
+        self.assertIsNotNone(private.returncode)
+        proc.daemon.close()
+
+    def test_hung_binary_times_out(self):
+        marker = os.path.join(self.directory, "hung")
+        hanging = STUB + ["--fault", "hang", "--fault-once", marker]
+        self.start_daemon(hanging, timeout=0.5)
+        connection = self.process.DaemonConnection(self.socket_path)
+        with self.assertRaises(OSError):
+            connection.exchange(self.autocomplete_line("x"), timeout=0.1)
+        self.assertIsNone(connection.sock)
+
+        # The daemon gives up on the hung child and answers from a new one.
+        connection.retry_at = 0
+        response = connection.exchange(self.autocomplete_line("y"), timeout=5)
+        self.assertIn('"old_prefix": "y"', response.decode())
+        connection.close()
+        os.remove(marker)
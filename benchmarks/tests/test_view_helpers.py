@@ -0,0 +1,52 @@
+import unittest
+
+from benchmarks import harness, listeners
+
+
+class TestPositionFacts(unittest.TestCase):
+    def setUp(self):
+        listeners.reset_shim()
+        self.addCleanup(listeners.reset_shim)
+        self.view_helpers = harness.load_module("lib.view_helpers")
+        self.view_helpers.forget_position_facts()
+        window = harness.sublime.active_window()
+        self.view = window.new_file("value = 1\nname", "/tmp/a.py")
+
+    def facts(self, location=None):
+        if location is None:
+            location = self.view.size()
+        return self.view_helpers.get_position_facts(self.view, location)
+
+    def test_reused_for_the_same_change_and_cursor(self):
+        self.assertIs(self.facts(), self.facts())
+
+    def test_edit_invalidates(self):
+        facts = self.facts()
+        self.view.insert(harness.sublime.Edit(), self.view.size(), "s")
+        self.assertIsNot(self.facts(self.view.size() - 1), facts)
+        self.assertEqual(self.facts().last_two_chars, "es")
+
+    def test_cursor_move_invalidates(self):
+        facts = self.facts()
+        moved = self.facts(3)
+        self.assertIsNot(moved, facts)
+        self.assertEqual(moved.location, 3)
+
+    def test_forget_invalidates_after_disabling_a_view(self):
+        facts = self.facts()
+        self.assertFalse(facts.is_disabled)
+        # Disabling Tabnine for a view leaves the buffer and the cursor alone.
+        self.view.settings().set("tabnine-disabled", True)
+        self.assertIs(self.facts(), facts)
+        self.view_helpers.forget_position_facts()
+        self.assertTrue(self.facts().is_disabled)
+
+    def test_activation_invalidates(self):
+        process = harness.load_module("lib.tab_nine_process")
+        self.addCleanup(vars(process.tabnine_proc).pop, "request", None)
+        editor, _, _ = listeners.start("v2", "python")
+        view = editor.view
+        facts = self.view_helpers.get_position_facts(view, view.size())
+        self.assertIs(self.view_helpers.get_position_facts(view, view.size()), facts)
+        editor.listeners[0].on_activated(view)
+        self.assertIsNot(self.view_helpers.get_position_facts(view, view.size()), facts)
@@ -0,0 +1,56 @@
+"""Count UI callbacks, editor commands and view API calls per keystroke for v2.
+
+    python -m benchmarks.v2_callbacks [--rev REV]
+
+`--rev` measures the listener as of a git revision, e.g. to compare against the
+previous flow.
+"""
+import argparse
+
+from . import harness
+
+SCRIPT = (
+    "import os\n"
+    "def read_config(path):\n"
+    "    with open(path) as config_file:\n"
+    "        return config_file.read().strip()\n"
+)
+
+
+def run(root=harness.REPO_ROOT, name="TabNine"):
+    tabnine = harness.FakeTabNine().install(root, name)
+    v2 = harness.load_module("completions.completions_v2", root, name)
+    listener = v2.TabNineListener()
+    editor = harness.Editor([listener])
+    editor.type(SCRIPT)
+
+    keystrokes = len(SCRIPT)
+    rows = [("callback " + k, v) for k, v in sorted(editor.callbacks.items())]
+    rows += [("command " + k, v) for k, v in sorted(editor.commands.items())]
+    rows += [("api " + k, v) for k, v in sorted(editor.api_calls.items())]
+    rows += [("request " + k, v) for k, v in sorted(tabnine.requests.items())]
+    rows.append(("popups shown", editor.popups_shown))
+    return keystrokes, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rev", help="git revision to measure instead of the tree")
+    options = parser.parse_args()
+
+    root, name = harness.REPO_ROOT, "TabNine"
+    if options.rev:
+        root, name = harness.export_tree(options.rev), "TabNine_rev"
+    try:
+        keystrokes, rows = run(root, name)
+    finally:
+        harness.cleanup_tree(root)
+
+    print("{} keystrokes".format(keystrokes))
+    print("{:<40} {:>8} {:>10}".format("", "total", "per key"))
+    for label, value in rows:
+        print("{:<40} {:>8} {:>10.2f}".format(label, value, value / keystrokes))
+
+
+if __name__ == "__main__":
+    main()
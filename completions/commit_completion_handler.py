@@ -1,6 +1,19 @@
 import sublime
 from ..lib import logger
-from ..lib.requests import set_completion_state
+from ..lib.requests import precompute, set_completion_state
+from ..lib.settings import get_settings
+
+
+class CompletionState:
+    """The completions offered at `location` while `prefix` was typed."""
+
+    __slots__ = ("view_id", "location", "prefix", "completions")
+
+    def __init__(self, view_id, location, prefix, completions):
+        self.view_id = view_id
+        self.location = location
+        self.prefix = prefix
+        self.completions = completions
 
 
 def handle_completion(view, completions, location, prefix):
@@ -60,4 +73,7 @@ def handle_completion(view, completions, location, prefix):
             substitution,
             selected_completion,
             completions,
+            view.scope_name(location),
         )
+        if get_settings().speculative_completions:
+            precompute(view, "speculative")
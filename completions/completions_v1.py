@@ -3,14 +3,27 @@ import sublime_plugin
 import html
 import os
 import stat
-import webbrowser
 import time
-import subprocess
-from package_control import package_manager
 from threading import Timer
+from ..lib import (
+    completion_rules,
+    gating,
+    large_file,
+    memory,
+    metrics,
+    profiler,
+    settings,
+    stall_detector,
+)
+from ..lib.debounce import debouncer
+from ..lib.identifier_index import index as identifier_index
+from ..lib.idle_precompute import scheduler as idle_scheduler
 from ..lib.requests import uninstalling, open_config, prefetch, autocomplete
+from ..lib.result_count import counts as result_counts
+from ..lib.stall_detector import instrument
+from ..lib.tab_nine_process import release_tabnine_proc
+from ..lib.view_helpers import ViewContext, get_language, open_url
 
-SETTINGS_PATH = "TabNine.sublime-settings"
 MAX_RESTARTS = 10
 AUTOCOMPLETE_CHAR_LIMIT = 100000
 PREFERENCES_PATH = "Preferences.sublime-settings"
@@ -18,14 +31,14 @@ GLOBAL_HIGHLIGHT_COUNTER = 0
 
 
 def plugin_loaded():
+    settings.watch()
+    metrics.watch()
     sublime.load_settings(PREFERENCES_PATH).set("auto_complete", False)
     sublime.save_settings(PREFERENCES_PATH)
 
 
 GLOBAL_IGNORE_EVENTS = False
 
-PACK_MANAGER = package_manager.PackageManager()
-
 
 class TabNineCommand(sublime_plugin.TextCommand):
     def run(*args, **kwargs):  # pylint: disable=W0613,E0211
@@ -120,11 +133,7 @@ class TabNineSubstituteCommand(sublime_plugin.TextCommand):
 
 class TabNineListener(sublime_plugin.EventListener):
     def __init__(self):
-        self.before = ""
-        self.after = ""
-        self.region_includes_beginning = False
-        self.region_includes_end = False
-        self.before_begin_location = 0
+        self.context = None
         self.autocompleting = False
         self.choices = []
         self.substitute_interval = 0, 0
@@ -140,6 +149,11 @@ class TabNineListener(sublime_plugin.EventListener):
         self.old_prefix = None
         self.expected_prefix = ""
         self.user_message = []
+        self.popup_content = None
+        # (language, scope, index) of the last inserted completion, recorded
+        # as accepted once the user moves on instead of tabbing to another.
+        self.accepted = None
+        memory.track(self)
 
         def update_settings():
             sublime.load_settings(PREFERENCES_PATH).set("auto_complete", False)
@@ -147,29 +161,54 @@ class TabNineListener(sublime_plugin.EventListener):
 
         sublime.set_timeout(update_settings, 250)
 
-    def get_before(self, view, char_limit):
-        loc = view.sel()[0].begin()
-        begin = max(0, loc - char_limit)
-        return view.substr(sublime.Region(begin, loc)), begin == 0, loc
-
-    def get_after(self, view, char_limit):
-        loc = view.sel()[0].end()
-        end = min(view.size(), loc + char_limit)
-        return view.substr(sublime.Region(loc, end)), end == view.size()
-
+    @instrument
     def on_modified(self, view):
         self.seen_changes = True
+        identifier_index.update(view)
         self.on_any_event(view)
 
+    @instrument
     def on_selection_modified(self, view):
+        identifier_index.track_cursor(view)
         self.on_any_event(view)
 
+    @instrument
     def on_activated(self, view):
+        large_file.check_view(view)
+        identifier_index.add_view(view)
         self.on_any_event(view)
 
+    def on_deactivated(self, view):
+        self.release(view)
+
+    def on_close(self, view):
+        identifier_index.remove_view(view)
+        large_file.forget(view)
+        self.release(view)
+
+    def release(self, view):
+        """Drop what we hold for `view` once it is no longer active."""
+        if self.context is not None and self.context.view_id == view.id():
+            self.context = None
+            self.choices = []
+            self.user_message = []
+            self.popup_content = None
+
+    def memory_by_view(self):
+        if self.context is None:
+            return {}
+        return {
+            self.context.view_id: [
+                self.context,
+                self.choices,
+                self.user_message,
+                self.popup_content,
+            ]
+        }
+
     def on_activated_async(self, view):
         file_name = view.file_name()
-        if file_name is not None:
+        if file_name is not None and not large_file.is_large_file(view):
             prefetch(file_name)
 
     def on_any_event(self, view):
@@ -178,26 +217,19 @@ class TabNineListener(sublime_plugin.EventListener):
         view = view.window().active_view()
         if view.is_scratch() or GLOBAL_IGNORE_EVENTS:
             return
-        (
-            new_before,
-            self.region_includes_beginning,
-            self.before_begin_location,
-        ) = self.get_before(view, AUTOCOMPLETE_CHAR_LIMIT)
-        new_after, self.region_includes_end = self.get_after(
-            view, AUTOCOMPLETE_CHAR_LIMIT
+        idle_scheduler.touch(view, self.max_num_results(view))
+        context = ViewContext(
+            view, large_file.char_limit(view, AUTOCOMPLETE_CHAR_LIMIT)
         )
-        if new_before == self.before and new_after == self.after:
+        if self.context is not None and context.key() == self.context.key():
             return
         self.autocompleting = self.should_autocomplete(
-            view,
-            old_before=self.before,
-            old_after=self.after,
-            new_before=new_before,
-            new_after=new_after,
+            view, old=self.context, new=context
         )
-        self.before = new_before
-        self.after = new_after
+        self.context = context
         self.actions_since_completion += 1
+        if self.actions_since_completion >= 2:
+            self.record_accepted()
         if self.autocompleting:
             pass  # on_selection_modified_async will show the popup
         else:
@@ -210,9 +242,13 @@ class TabNineListener(sublime_plugin.EventListener):
             if self.actions_since_completion >= 2:
                 self.choices = []
 
-    def should_autocomplete(
-        self, view, *, old_before, old_after, new_before, new_after
-    ):
+    def should_autocomplete(self, view, *, old, new):
+        # Only the characters next to the cursor are compared, so the
+        # contexts' fingerprints are enough.
+        old_before = old.before_tail if old is not None else ""
+        old_after = old.after_head if old is not None else ""
+        new_before = new.before_tail
+        new_after = new.after_head
         return (
             self.actions_since_completion >= 1
             and len(view.sel()) <= 100
@@ -257,14 +293,17 @@ class TabNineListener(sublime_plugin.EventListener):
                 return True
             offset += step
 
-    def get_settings(self):
-        return sublime.load_settings(SETTINGS_PATH)
-
-    def get_preferences(self):
-        return sublime.load_settings(PREFERENCES_PATH)
+    def record_accepted(self):
+        if self.accepted is not None:
+            language, scope, index = self.accepted
+            self.accepted = None
+            gating.record_accepted(language, scope)
+            result_counts.record_accepted(language, index)
 
-    def max_num_results(self):
-        return self.get_settings().get("max_num_results")
+    def max_num_results(self, view):
+        return result_counts.get(
+            get_language(view.file_name()), settings.get_settings().max_num_results
+        )
 
     def on_selection_modified_async(self, view):
         if view.window() is None:
@@ -274,14 +313,34 @@ class TabNineListener(sublime_plugin.EventListener):
         if not self.autocompleting:
             self.clear_delay_timer()
             return
+        context = self.context
+        text = context.read(view) if context is not None else None
+        if text is None:
+            # The view changed since; its own event follows.
+            self.clear_delay_timer()
+            return
+        if completion_rules.is_cancelled(view, context.location):
+            self.clear_delay_timer()
+            return
+        if debouncer.hold(
+            view,
+            context.location,
+            lambda: sublime.set_timeout_async(
+                lambda: self.on_selection_modified_async(view), 0
+            ),
+        ):
+            return
+        if gating.check(view, context.location, can_delay=False) is None:
+            self.clear_delay_timer()
+            return
         self.just_pressed_tab = False
-        max_num_results = self.max_num_results()
+        max_num_results = self.max_num_results(view)
         response = autocomplete(
-            self.before,
-            self.after,
+            text[0],
+            text[1],
             view.file_name(),
-            self.region_includes_beginning,
-            self.region_includes_end,
+            context.region_includes_beginning,
+            context.region_includes_end,
             max_num_results,
         )
         if response is None or not self.autocompleting:
@@ -295,8 +354,8 @@ class TabNineListener(sublime_plugin.EventListener):
         if max_num_results is not None:
             max_choices = min(max_choices, max_num_results)
         self.choices = self.choices[:max_choices]
-        substitute_begin = self.before_begin_location - len(self.expected_prefix)
-        self.substitute_interval = (substitute_begin, self.before_begin_location)
+        substitute_begin = context.location - len(self.expected_prefix)
+        self.substitute_interval = (substitute_begin, context.location)
         self.user_message = response["user_message"]
         self.tab_only = False
         to_show = self.make_popup_content(None)
@@ -310,7 +369,7 @@ class TabNineListener(sublime_plugin.EventListener):
             else:
                 self.clear_delay_timer()
 
-                auto_complete_delay = self.get_auto_complete_delay()
+                auto_complete_delay = settings.get_settings().auto_complete_delay_sec()
 
                 if auto_complete_delay >= 1:
                     self.delay_competion_dialog(
@@ -338,50 +397,16 @@ class TabNineListener(sublime_plugin.EventListener):
         if self.timer is not None:
             self.timer.cancel()
 
-    def get_auto_complete_delay(self):
-        auto_complete_delay_millis = self.get_preferences().get("auto_complete_delay")
-        auto_complete_delay_sec = 0
-        if auto_complete_delay_millis is not None:
-            auto_complete_delay_sec = (auto_complete_delay_millis / 1000) % 60
-        return auto_complete_delay_sec
-
     def make_popup_content(self, index):
-        to_show = [choice["new_prefix"] for choice in self.choices]
-        max_len = max([len(x) for x in to_show] or [0])
-        show_detail = self.get_settings().get("detail")
-        for i in range(len(to_show)):
-            padding = max_len - len(to_show[i]) + 2
-            if index is None:
-                if i == 0:
-                    annotation = "&nbsp;" * 4 + "Tab"
-                elif i == 1:
-                    annotation = "Tab+Tab"
-                elif i < 9:
-                    annotation = "&nbsp;" * 2 + "Tab+" + str(i + 1)
-                else:
-                    annotation = ""
-            else:
-                if i == index:
-                    annotation = "&nbsp;" * 3
-                elif i == (index + 1) % len(self.choices):
-                    annotation = "Tab"
-                elif self.tab_only:
-                    annotation = "&nbsp;" * 3
-                else:
-                    annotation = "&nbsp;" * 2 + str(i + 1)
-                annotation = "&nbsp;" * 4 + annotation
-            annotation = "<i>" + annotation + "</i>"
-            choice = self.choices[i]
-            if show_detail and "detail" in choice and isinstance(choice["detail"], str):
-                annotation += escape("  " + choice["detail"].replace("\n", " "))
-            with_padding = escape(to_show[i] + " " * padding)
-            to_show[i] = with_padding + annotation
-        for line in self.user_message:
-            to_show.append(
-                """<span style="font-size: 10;">""" + escape(line) + "</span>"
+        if (
+            self.popup_content is None
+            or self.popup_content.choices is not self.choices
+            or self.popup_content.user_message is not self.user_message
+        ):
+            self.popup_content = PopupContent(
+                self.choices, self.user_message, settings.get_settings().detail
             )
-        to_show = "<br>".join(to_show)
-        return to_show
+        return self.popup_content.render(index, self.tab_only)
 
     def insert_completion(self, view, choice_index, popup):  # pylint: disable=W0613
         self.tab_index = (choice_index + 1) % len(self.choices)
@@ -395,9 +420,15 @@ class TabNineListener(sublime_plugin.EventListener):
         substitution = new_prefix + new_suffix
         self.substitute_interval = a, (a + len(substitution))
         self.actions_since_completion = 0
+        self.accepted = (
+            get_language(view.file_name()),
+            view.scope_name(a),
+            choice_index,
+        )
         if len(self.choices) == 1:
             self.choices = []
-        if self.get_settings().get("documentation"):
+        current_settings = settings.get_settings()
+        if current_settings.documentation:
             documentation = get_additional_detail(choice)
         else:
             documentation = None
@@ -409,7 +440,7 @@ class TabNineListener(sublime_plugin.EventListener):
             "prefix": prefix,
             "old_prefix": self.old_prefix,
             "expected_prefix": self.expected_prefix,
-            "highlight": self.get_settings().get("highlight"),
+            "highlight": current_settings.highlight,
         }
         self.expected_prefix = new_prefix
         self.old_prefix = prefix
@@ -428,6 +459,7 @@ class TabNineListener(sublime_plugin.EventListener):
             self.popup_is_ours = True
         return "tab_nine_substitute", new_args
 
+    @instrument
     def on_text_command(self, view, command_name, args):
         if command_name == "tab_nine" and "num" in args:
             num = args["num"]
@@ -467,6 +499,65 @@ class TabNineListener(sublime_plugin.EventListener):
             return (self.choices != []) == operand
 
 
+class PopupContent:
+    """HTML rows of the completion popup for one list of choices.
+
+    Choices and details are escaped once; rendering for another selected index
+    only rebuilds the rows whose annotation changed.
+    """
+
+    def __init__(self, choices, user_message, show_detail):
+        self.choices = choices
+        self.user_message = user_message
+        new_prefixes = [choice["new_prefix"] for choice in choices]
+        max_len = max([len(x) for x in new_prefixes] or [0])
+        self._bodies = [escape(x + " " * (max_len - len(x) + 2)) for x in new_prefixes]
+        self._details = [
+            (
+                escape("  " + choice["detail"].replace("\n", " "))
+                if show_detail and isinstance(choice.get("detail"), str)
+                else ""
+            )
+            for choice in choices
+        ]
+        self._footer = [
+            """<span style="font-size: 10;">""" + escape(line) + "</span>"
+            for line in user_message
+        ]
+        self._annotations = [None] * len(choices)
+        self._rows = [None] * len(choices)
+
+    def render(self, index, tab_only):
+        for i in range(len(self._rows)):
+            annotation = self.annotation(i, index, tab_only)
+            if annotation != self._annotations[i]:
+                self._annotations[i] = annotation
+                self._rows[i] = self._bodies[i] + annotation + self._details[i]
+        return "<br>".join(self._rows + self._footer)
+
+    def annotation(self, i, index, tab_only):
+        if index is None:
+            if i == 0:
+                annotation = "&nbsp;" * 4 + "Tab"
+            elif i == 1:
+                annotation = "Tab+Tab"
+            elif i < 9:
+                annotation = "&nbsp;" * 2 + "Tab+" + str(i + 1)
+            else:
+                annotation = ""
+        else:
+            if i == index:
+                annotation = "&nbsp;" * 3
+            elif i == (index + 1) % len(self.choices):
+                annotation = "Tab"
+            elif tab_only:
+                annotation = "&nbsp;" * 3
+            else:
+                annotation = "&nbsp;" * 2 + str(i + 1)
+            annotation = "&nbsp;" * 4 + annotation
+        return "<i>" + annotation + "</i>"
+
+
 def escape(s):
     s = html.escape(s, quote=False)
     s = s.replace(" ", "&nbsp;")
@@ -522,7 +613,7 @@ def my_show_popup(view, content, location, markdown=None):
             location=location,
             max_width=1500,
             max_height=1200,
-            on_navigate=webbrowser.open,
+            on_navigate=open_url,
         )
     else:
         content = escape(content)
@@ -532,7 +623,7 @@ def my_show_popup(view, content, location, markdown=None):
             location=location,
             max_width=1500,
             max_height=1200,
-            on_navigate=webbrowser.open,
+            on_navigate=open_url,
         )
     GLOBAL_IGNORE_EVENTS = False
 
@@ -545,6 +636,13 @@ def add_execute_permission(path):
 
 
 def plugin_unloaded():
+    settings.unwatch()
+    metrics.unwatch()
+    stall_detector.stop()
+    profiler.stop()
+    gating.flush()
+    release_tabnine_proc()
+
     from package_control import events
 
     if events.remove("Tabnine"):
@@ -1,8 +1,5 @@
 import sublime
 import sublime_plugin
-import html
-import webbrowser
-import time
 from shutil import copyfile
 import os
 
@@ -14,21 +11,35 @@ from ..lib.requests import (
     set_state,
     set_completion_state,
 )
-from ..lib import logger
-from ..lib.settings import is_tabnine_disabled
+from ..lib import (
+    completion_rules,
+    gating,
+    large_file,
+    logger,
+    memory,
+    metrics,
+    profiler,
+    settings,
+    stall_detector,
+)
+from ..lib.debounce import debouncer
+from ..lib.identifier_index import index as identifier_index
+from ..lib.idle_precompute import scheduler as idle_scheduler
+from ..lib.stall_detector import instrument
+from ..lib.tab_nine_process import release_tabnine_proc
 from ..lib.view_helpers import (
-    get_before,
-    get_after,
+    ViewContext,
+    forget_position_facts,
+    get_position_facts,
     should_stop_completion_after_end_line,
     is_query_after_new_line,
     should_return_empty_list,
-    active_view,
     escape_tab_stop_sign,
+    open_url,
 )
 
 from .commit_completion_handler import handle_completion
 
-SETTINGS_PATH = "TabNine.sublime-settings"
 AUTOCOMPLETE_CHAR_LIMIT = 100000
 PREFERENCES_PATH = "Preferences.sublime-settings"
 COMPLEATIONS_REQUEST_TRESHOLD = 1
@@ -61,124 +72,159 @@ class TabNinePostSubstitutionCommand(sublime_plugin.TextCommand):
 
 class TabNineListener(sublime_plugin.EventListener):
     def __init__(self):
-        self.before = ""
-        self.after = ""
-        self.region_includes_beginning = False
-        self.region_includes_end = False
         self._last_query_location = 0
         self._user_message = []
-        self._last_location = None
         self._results = []
         self._completion_prefix = ""
         self._old_prefix = None
         self._stop_completion = True
         self._replace_completion_with_next_completion = False
         self._completions = []
+        self._pending_request = None
+        self._ready_request = None
+        self._gated_request = None
+        memory.track(self)
 
+    @instrument
     def on_modified(self, view):
         logger.debug("in on_modified")
-        self.on_any_event(view)
+        identifier_index.update(view)
 
         view_sel = view.sel()
         if not view_sel or len(view_sel) == 0:
             return
 
-        def _run_complete():
-            logger.debug("running in on_modified")
-            active_view().run_command("hide_auto_complete")
-            active_view().run_command(
-                "auto_complete",
-                {
-                    "api_completions_only": False,
-                    "disable_auto_insert": True,
-                    "next_completion_if_showing": False,
-                    "auto_complete_commit_on_tab": True,
-                },
-            )
-
         if self.should_run_completion_on_modified(view):
-            sublime.set_timeout_async(_run_complete, 0)
+            self.request_completions(view, view_sel[0].end())
 
         self._stop_completion = None
 
     def should_run_completion_on_modified(self, view):
         current_location = view.sel()[0].end()
-        is_disabled = is_tabnine_disabled(view)
-        stop_completion_after_end_line = should_stop_completion_after_end_line(
-            view, current_location
-        )
-        in_query_after_new_line = is_query_after_new_line(view, current_location)
-
-        is_selector_matched = view.match_selector(current_location, "source | text")
-
-        current_active_view = active_view()
-        is_wrong_view = current_active_view is None or (
-            current_active_view.id() != view.id()
-        )
+        facts = get_position_facts(view, current_location)
 
-        if is_wrong_view:
+        if not facts.is_active_view:
             return False
-        if not is_selector_matched:
+        if not facts.in_completion_scope:
             return False
         if self._stop_completion:
             return False
-        if is_disabled:
+        if facts.is_disabled:
             return False
-        if stop_completion_after_end_line:
+        if should_stop_completion_after_end_line(view, current_location):
             return False
-        if in_query_after_new_line:
+        if is_query_after_new_line(view, current_location):
             return False
         return (
             current_location - self._last_query_location
             >= COMPLEATIONS_REQUEST_TRESHOLD
         )
 
+    def request_key(self, view, location):
+        return (view.id(), view.change_count(), location)
+
+    def request_completions(self, view, location):
+        """Fetch completions for `location` off the UI thread.
+
+        Once the response arrives, a single `auto_complete` run shows it; the
+        resulting `on_query_completions` is answered from the stored results.
+        """
+        key = self.request_key(view, location)
+        if key in (self._pending_request, self._ready_request, self._gated_request):
+            return
+        if completion_rules.is_cancelled(view, location):
+            self._gated_request = key
+            return
+        if debouncer.hold(
+            view, location, lambda: self.request_completions(view, location)
+        ):
+            return
+        delay = gating.check(view, location)
+        if delay is None:
+            self._gated_request = key
+            return
+        self._pending_request = key
+        context = ViewContext(
+            view, large_file.char_limit(view, AUTOCOMPLETE_CHAR_LIMIT)
+        )
+        sublime.set_timeout_async(
+            lambda: self._fetch_completions(view, key, context, delay > 0), delay
+        )
+
+    def _fetch_completions(self, view, key, context, delayed=False):
+        if key != self._pending_request:
+            return
+        text = context.read(view)
+        if text is None:
+            # Edited since; the edit requests completions of its own.
+            self._pending_request = None
+            return
+        if delayed:
+            gating.record_delayed_request(view, key[2])
+
+        response = autocomplete(
+            text[0],
+            text[1],
+            view.file_name(),
+            context.region_includes_beginning,
+            context.region_includes_end,
+        )
+        if key != self._pending_request:
+            return
+        self._pending_request = None
+
+        if response is None:
+            self._results = []
+            self._user_message = []
+            self._old_prefix = None
+            return
+
+        logger.debug("--- response ---")
+        logger.jsonstr(response)
+        logger.debug("--- end response ---")
+
+        self._results = response["results"]
+        self._user_message = response["user_message"]
+        self._old_prefix = response["old_prefix"]
+        self._ready_request = key
+
+        if len(self._results) < 1:
+            return
+
+        if self._user_message and view.window():
+            view.window().status_message(" ".join(self._user_message))
+
+        sublime.set_timeout(lambda: self._show_completions(view, key), 0)
+
+    def _show_completions(self, view, key):
+        if key != self._ready_request:
+            return
+        if self.request_key(view, view.sel()[0].end()) != key:
+            return
+        view.run_command(
+            "auto_complete",
+            {
+                "api_completions_only": True,
+                "disable_auto_insert": True,
+                "next_completion_if_showing": False,
+                "auto_complete_commit_on_tab": True,
+            },
+        )
+
+    @instrument
     def on_selection_modified(self, view):
-        self.on_any_event(view)
+        identifier_index.track_cursor(view)
+        idle_scheduler.touch(view)
 
+    @instrument
     def on_activated(self, view):
-        self.on_any_event(view)
+        forget_position_facts()
+        large_file.check_view(view)
+        identifier_index.add_view(view)
         view.set_status("tabnine-status", ATTRIBUTION_ELEMENT + " tabnine")
 
+    @instrument
     def on_query_completions(self, view, prefix, locations):
-        def _run_complete():
-
-            response = autocomplete(
-                self.before,
-                self.after,
-                view.file_name(),
-                self.region_includes_beginning,
-                self.region_includes_end,
-            )
-            if response is None:
-                self._results = []
-                self._user_message = []
-                return
-
-            logger.debug("--- response ---")
-            logger.jsonstr(response)
-            logger.debug("--- end response ---")
-
-            self._results = response["results"]
-            self._user_message = response["user_message"]
-            self._old_prefix = response["old_prefix"]
-
-            if len(self._results) < 1:
-                return
-
-            if self._results and self._user_message and view.window():
-                view.window().status_message(" ".join(self._user_message))
-
-            view.run_command(
-                "auto_complete",
-                {
-                    "api_completions_only": True,
-                    "disable_auto_insert": True,
-                    "next_completion_if_showing": False,
-                    "auto_complete_commit_on_tab": True,
-                },
-            )
-
         EMPTY_COMPLETION_LIST = (
             [],
             sublime.INHIBIT_WORD_COMPLETIONS | sublime.INHIBIT_EXPLICIT_COMPLETIONS,
@@ -187,43 +233,26 @@ class TabNineListener(sublime_plugin.EventListener):
         if should_return_empty_list(view, locations, prefix):
             return EMPTY_COMPLETION_LIST
 
-        if is_tabnine_disabled(view):
+        if get_position_facts(view, locations[0]).is_disabled:
             return EMPTY_COMPLETION_LIST if prefix.strip() == "" else None
 
         if self._replace_completion_with_next_completion:
             self._replace_completion_with_next_completion = False
             return self.get_completions_with_flags()
 
-        if self._last_query_location == locations[0] and self._last_location is None:
-            if len(self._completions) == 0 and prefix == "":
-                self._last_location = locations[0]
-                active_view().run_command("hide_auto_complete")
-                sublime.set_timeout_async(_run_complete, 0)
-                return EMPTY_COMPLETION_LIST
-
-            if self.has_competions():
-                return (self._completions, sublime.INHIBIT_WORD_COMPLETIONS)
-            else:
-                return EMPTY_COMPLETION_LIST
+        if self.request_key(view, locations[0]) != self._ready_request:
+            self.request_completions(view, locations[0])
+            return EMPTY_COMPLETION_LIST
 
         self._last_query_location = locations[0]
         self._completion_prefix = prefix
-        self._old_prefix = None
-        if self._last_location != locations[0]:
-            self._last_location = locations[0]
-            active_view().run_command("hide_auto_complete")
-            sublime.set_timeout_async(_run_complete, 0)
+        self.handle_tabnine_commands(view, locations, prefix)
 
-            return EMPTY_COMPLETION_LIST
-        if self._last_location == locations[0]:
-            self._last_location = None
-            self.handle_tabnine_commands(view, locations, prefix)
-
-            self._completions = self.get_completion()
+        self._completions = self.get_completion()
 
-            logger.debug("completions: {}".format(self._completions))
+        logger.debug("completions: {}".format(self._completions))
 
-            return self.get_completions_with_flags()
+        return self.get_completions_with_flags()
 
     def get_completion(self):
         return [
@@ -261,29 +290,40 @@ class TabNineListener(sublime_plugin.EventListener):
                     location=locations[0],
                     max_width=1500,
                     max_height=1200,
-                    on_navigate=webbrowser.open,
+                    on_navigate=open_url,
                 )
 
     def on_activated_async(self, view):
         file_name = view.file_name()
-        if file_name is not None:
+        if file_name is not None and not large_file.is_large_file(view):
             prefetch(file_name)
 
-    def on_any_event(self, view):
-        if view.window() is None:
-            return
-        view = view.window().active_view()
-        if view.is_scratch():
-            return
-        (
-            new_before,
-            self.region_includes_beginning,
-        ) = get_before(view, AUTOCOMPLETE_CHAR_LIMIT)
-        new_after, self.region_includes_end = get_after(view, AUTOCOMPLETE_CHAR_LIMIT)
-        if new_before == self.before and new_after == self.after:
-            return
-        self.before = new_before
-        self.after = new_after
+    def on_deactivated(self, view):
+        self.release(view)
+
+    def on_close(self, view):
+        identifier_index.remove_view(view)
+        large_file.forget(view)
+        self.release(view)
+
+    def release(self, view):
+        """Drop the results held for `view` once it is no longer active."""
+        if self.held_view_id() == view.id():
+            self._pending_request = None
+            self._ready_request = None
+            self._results = []
+            self._completions = []
+            self._user_message = []
+
+    def held_view_id(self):
+        key = self._ready_request or self._pending_request
+        return key[0] if key is not None else None
+
+    def memory_by_view(self):
+        view_id = self.held_view_id()
+        if view_id is None:
+            return {}
+        return {view_id: [self._results, self._completions, self._user_message]}
 
     def all_same_prefix(self, view, positions):
         return self.all_same(view, positions, -1, -1)
@@ -314,15 +354,10 @@ class TabNineListener(sublime_plugin.EventListener):
                 return True
             offset += step
 
-    def get_settings(self):
-        return sublime.load_settings(SETTINGS_PATH)
-
-    def get_preferences(self):
-        return sublime.load_settings(PREFERENCES_PATH)
-
     def max_num_results(self):
-        return self.get_settings().get("max_num_results")
+        return settings.get_settings().max_num_results
 
+    @instrument
     def on_post_text_command(self, view, command_name, args):
         logger.debug(
             "on_post_text_command, command: {}, args: {} ".format(command_name, args)
@@ -343,6 +378,7 @@ class TabNineListener(sublime_plugin.EventListener):
                 view, self._results, self._last_query_location, self._completion_prefix
             )
 
+    @instrument
     def on_text_command(self, view, command_name, args):
 
         logger.debug("text command, command: {}, args: {}".format(command_name, args))
@@ -371,6 +407,8 @@ class TabNineListener(sublime_plugin.EventListener):
 
 
 def plugin_loaded():
+    settings.watch()
+    metrics.watch()
     _setup_config()
     _init_rules()
 
@@ -424,6 +462,13 @@ def _init_rules():
 
 
 def plugin_unloaded():
+    settings.unwatch()
+    metrics.unwatch()
+    stall_detector.stop()
+    profiler.stop()
+    gating.flush()
+    release_tabnine_proc()
+
     from package_control import events
 
     if events.remove("Tabnine"):
@@ -1,13 +1,27 @@
-from .commit_completion_handler import handle_completion
+from .commit_completion_handler import CompletionState, handle_completion
 import sublime
 import sublime_plugin
-import copy
 
-from ..lib import logger
+from ..lib import (
+    completion_rules,
+    gating,
+    large_file,
+    logger,
+    memory,
+    metrics,
+    profiler,
+    settings,
+    stall_detector,
+)
+from ..lib.debounce import debouncer
+from ..lib.identifier_index import index as identifier_index
+from ..lib.idle_precompute import scheduler as idle_scheduler
 from ..lib.requests import (
     uninstalling,
     autocomplete,
 )
+from ..lib.stall_detector import instrument
+from ..lib.tab_nine_process import release_tabnine_proc
 from ..lib.view_helpers import (
     get_before,
     get_after,
@@ -17,6 +31,12 @@ from ..lib.view_helpers import (
 AUTOCOMPLETE_CHAR_LIMIT = 100000
 ATTRIBUTION_ELEMENT = "⌬"
 PREFERENCES_PATH = "Preferences.sublime-settings"
+COMPLETION_COMMANDS = (
+    "commit_completion",
+    "insert_best_completion",
+    "replace_completion_with_next_completion",
+)
+AUTO_COMPLETE_ARGS = {"disable_auto_insert": True, "next_completion_if_showing": False}
 
 
 class TabNinePostSubstitutionCommand(sublime_plugin.TextCommand):
@@ -27,15 +47,26 @@ class TabNinePostSubstitutionCommand(sublime_plugin.TextCommand):
 
 class TabNineListener(sublime_plugin.EventListener):
     def __init__(self):
-        self._state = {"location": 0, "prefix": "", "completions": []}
+        self._state = None
         self._last_state = None
+        memory.track(self)
 
+    @instrument
     def on_query_completions(self, view, prefix, locations):
-        self._state["location"] = locations[0]
-        self._state["prefix"] = prefix
-
-        before, region_includes_beginning = get_before(view, AUTOCOMPLETE_CHAR_LIMIT)
-        after, region_includes_end = get_after(view, AUTOCOMPLETE_CHAR_LIMIT)
+        if completion_rules.is_cancelled(view, locations[0]):
+            return None
+        if debouncer.hold(
+            view,
+            locations[0],
+            lambda: view.run_command("auto_complete", AUTO_COMPLETE_ARGS),
+        ):
+            # Asked again once the typing pauses.
+            return None
+        if gating.check(view, locations[0], can_delay=False) is None:
+            return None
+        limit = large_file.char_limit(view, AUTOCOMPLETE_CHAR_LIMIT)
+        before, region_includes_beginning = get_before(view, limit)
+        after, region_includes_end = get_after(view, limit)
         response = autocomplete(
             before,
             after,
@@ -44,7 +75,11 @@ class TabNineListener(sublime_plugin.EventListener):
             region_includes_end,
         )
 
-        self._state["completions"] = response["results"]
+        # A new record each time, so on_text_command can keep the last one
+        # without copying it.
+        self._state = CompletionState(
+            view.id(), locations[0], prefix, response["results"]
+        )
         completions = [
             sublime.CompletionItem(
                 r.get("new_prefix"),
@@ -59,7 +94,7 @@ class TabNineListener(sublime_plugin.EventListener):
                     r.get("detail", ""),
                 ),
             )
-            for r in self._state["completions"]
+            for r in self._state.completions
         ]
 
         return sublime.CompletionList(
@@ -67,26 +102,69 @@ class TabNineListener(sublime_plugin.EventListener):
             flags=sublime.DYNAMIC_COMPLETIONS | sublime.INHIBIT_REORDER,
         )
 
+    @instrument
     def on_text_command(self, view, command_name, args):
-        self._last_state = copy.copy(self._state)
+        if command_name in COMPLETION_COMMANDS:
+            self._last_state = self._state
 
+    @instrument
     def on_post_text_command(self, view, command_name, args):
-        if command_name in [
-            "commit_completion",
-            "insert_best_completion",
-            "replace_completion_with_next_completion",
-        ]:
-            handle_completion(view, **self._last_state)
-
+        state = self._last_state
+        if command_name in COMPLETION_COMMANDS and state is not None:
+            handle_completion(view, state.completions, state.location, state.prefix)
+
+    def on_deactivated(self, view):
+        self.release(view)
+
+    def on_close(self, view):
+        identifier_index.remove_view(view)
+        large_file.forget(view)
+        self.release(view)
+
+    def release(self, view):
+        """Drop the completions held for `view` once it is no longer active."""
+        if self._state is not None and self._state.view_id == view.id():
+            self._state = None
+        if self._last_state is not None and self._last_state.view_id == view.id():
+            self._last_state = None
+
+    def memory_by_view(self):
+        held = {}
+        for state in (self._state, self._last_state):
+            if state is not None:
+                held.setdefault(state.view_id, []).append(state)
+        return held
+
+    @instrument
+    def on_modified(self, view):
+        identifier_index.update(view)
+
+    @instrument
+    def on_selection_modified(self, view):
+        identifier_index.track_cursor(view)
+        idle_scheduler.touch(view)
+
+    @instrument
     def on_activated(self, view):
+        large_file.check_view(view)
+        identifier_index.add_view(view)
         view.set_status("tabnine-status", ATTRIBUTION_ELEMENT + " tabnine")
 
 
 def plugin_loaded():
+    settings.watch()
+    metrics.watch()
     sublime.load_settings(PREFERENCES_PATH).set("auto_complete", True)
 
 
 def plugin_unloaded():
+    settings.unwatch()
+    metrics.unwatch()
+    stall_detector.stop()
+    profiler.stop()
+    gating.flush()
+    release_tabnine_proc()
+
     from package_control import events
 
     if events.remove("Tabnine"):
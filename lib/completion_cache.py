@@ -0,0 +1,153 @@
+import re
+import threading
+
+from . import logger, stats
+from .settings import get_settings
+
+CAPACITY = 4
+# Characters before and after the cursor an entry keeps to recognize its
+# context, as in view_helpers.ViewContext.
+FINGERPRINT_CHARS = 101
+# Entries of a source to judge its hit rate on before disabling it.
+MIN_SAMPLES = 20
+
+_IDENTIFIER = re.compile(r"\w*$")
+
+
+class Entry:
+    __slots__ = (
+        "source",
+        "file_name",
+        "before_length",
+        "before_tail",
+        "after_head",
+        "max_num_results",
+        "response",
+        "hits",
+    )
+
+    def __init__(self, source, before, after, file_name, max_num_results, response):
+        self.source = source
+        self.file_name = file_name
+        self.before_length = len(before)
+        self.before_tail = before[-FINGERPRINT_CHARS:]
+        self.after_head = after[:FINGERPRINT_CHARS]
+        self.max_num_results = max_num_results
+        self.response = response
+        self.hits = 0
+
+    def typed_since(self, before, after, file_name, max_num_results):
+        """Identifier characters typed after this entry's context, or None."""
+        if file_name != self.file_name or max_num_results != self.max_num_results:
+            return None
+        if after[:FINGERPRINT_CHARS] != self.after_head:
+            return None
+        typed_length = len(before) - self.before_length
+        if typed_length < 0 or typed_length > FINGERPRINT_CHARS:
+            return None
+        typed = before[len(before) - typed_length :]
+        if (
+            before[: len(before) - typed_length][-FINGERPRINT_CHARS:]
+            != self.before_tail
+        ):
+            return None
+        if not _IDENTIFIER.match(typed):
+            return None
+        return typed
+
+    def answer(self, typed):
+        """The response for the context with `typed` appended, if any is left."""
+        if not typed:
+            return self.response
+        old_prefix = self.response.get("old_prefix", "") + typed
+        results = [
+            result
+            for result in self.response.get("results", [])
+            if result["new_prefix"].startswith(old_prefix)
+            and (result["new_prefix"] != old_prefix or result.get("new_suffix"))
+        ]
+        if not results:
+            return None
+        response = dict(self.response)
+        response["old_prefix"] = old_prefix
+        response["results"] = results
+        return response
+
+
+class CompletionCache:
+    """Autocomplete responses requested ahead of the user.
+
+    Sources (like "speculative" after a commit) store responses for a
+    context; `lookup` answers a later request for the same context, or for
+    the same context with an identifier typed on, without asking TabNine.
+    A source whose entries are rarely used gets disabled.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = []
+        self.samples = {}
+        self.used = {}
+        self.disabled = set()
+
+    def is_enabled(self, source):
+        return source not in self.disabled
+
+    def store(self, source, before, after, file_name, max_num_results, response):
+        entry = Entry(source, before, after, file_name, max_num_results, response)
+        with self.lock:
+            for old in [e for e in self.entries if e.file_name == file_name]:
+                self._retire(old)
+            while len(self.entries) >= CAPACITY:
+                self._retire(self.entries[0])
+            self.entries.append(entry)
+        stats.increment("cache.{}.stored".format(source))
+
+    def lookup(self, before, after, file_name, max_num_results):
+        if not self.entries:
+            return None
+        with self.lock:
+            for entry in reversed(self.entries):
+                typed = entry.typed_since(before, after, file_name, max_num_results)
+                if typed is None:
+                    continue
+                response = entry.answer(typed)
+                if response is not None:
+                    entry.hits += 1
+                    stats.increment("cache.{}.hits".format(entry.source))
+                    return response
+        return None
+
+    def clear(self):
+        with self.lock:
+            for entry in list(self.entries):
+                self._retire(entry)
+
+    def _retire(self, entry):
+        self.entries.remove(entry)
+        source = entry.source
+        if not entry.hits:
+            stats.increment("cache.{}.wasted".format(source))
+        self.samples[source] = self.samples.get(source, 0) + 1
+        self.used[source] = self.used.get(source, 0) + (1 if entry.hits else 0)
+        self._check_hit_rate(source)
+
+    def _check_hit_rate(self, source):
+        samples = self.samples[source]
+        if samples < MIN_SAMPLES or source in self.disabled:
+            return
+        hit_rate = self.used[source] / float(samples)
+        if hit_rate < get_settings().precompute_min_hit_rate:
+            self.disabled.add(source)
+            logger.info(
+                "disabled {} completions, {:.0%} of them were used".format(
+                    source, hit_rate
+                )
+            )
+
+    def hit_rate(self, source):
+        samples = self.samples.get(source, 0)
+        return self.used.get(source, 0) / float(samples) if samples else None
+
+
+cache = CompletionCache()
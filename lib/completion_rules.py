@@ -0,0 +1,106 @@
+import glob
+import os
+import re
+
+import sublime
+
+from . import logger, stats
+from .settings import get_settings
+from .view_helpers import get_position_facts
+
+RULES_DIRECTORY = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.realpath(__file__))), "rules"
+)
+RULES_FILE = "Completion Rules.tmPreferences"
+# The XML escapes of a plist string. xml.sax.saxutils would add about 35 ms to
+# the plugin import; "&amp;" goes last so it does not unescape anything twice.
+_ENTITIES = (
+    ("&lt;", "<"),
+    ("&gt;", ">"),
+    ("&quot;", '"'),
+    ("&apos;", "'"),
+    ("&amp;", "&"),
+)
+
+_rules = None
+_rules_paths = None
+_by_scope = {}
+
+
+def plist_string(text, key):
+    match = re.search(r"<key>{}</key>\s*<string>(.*?)</string>".format(key), text, re.S)
+    if match is None:
+        return None
+    value = match.group(1)
+    for entity, char in _ENTITIES:
+        value = value.replace(entity, char)
+    return value
+
+
+def load_rules(directories):
+    """The cancelCompletion patterns of each `*/Completion Rules.tmPreferences`.
+
+    Returns a list of (scope selector, compiled patterns).
+    """
+    patterns = {}
+    for directory in directories:
+        for path in sorted(glob.glob(os.path.join(directory, "*", RULES_FILE))):
+            try:
+                with open(path, encoding="utf-8") as rules_file:
+                    text = rules_file.read()
+            except (IOError, OSError) as e:
+                logger.info("could not read {}: {}".format(path, e))
+                continue
+            scope = plist_string(text, "scope")
+            cancel = plist_string(text, "cancelCompletion")
+            if not scope or not cancel:
+                continue
+            try:
+                patterns.setdefault(scope, []).append(re.compile(cancel))
+            except re.error as e:
+                logger.info("invalid cancelCompletion in {}: {}".format(path, e))
+    return sorted(patterns.items())
+
+
+def get_rules():
+    global _rules, _rules_paths
+    paths = [RULES_DIRECTORY] + list(get_settings().completion_rules_paths or [])
+    if _rules is None or paths != _rules_paths:
+        _rules = load_rules([os.path.expanduser(path) for path in paths])
+        _rules_paths = paths
+        _by_scope.clear()
+    return _rules
+
+
+def patterns_for(scope):
+    """The patterns of all rules whose selector matches `scope`."""
+    rules = get_rules()
+    patterns = _by_scope.get(scope)
+    if patterns is None:
+        patterns = _by_scope[scope] = [
+            pattern
+            for selector, selected in rules
+            if sublime.score_selector(scope, selector) > 0
+            for pattern in selected
+        ]
+    return patterns
+
+
+def is_cancelled(view, location):
+    """Whether a rule cancels completions for the line up to `location`."""
+    facts = get_position_facts(view, location)
+    patterns = patterns_for(facts.scope)
+    if not patterns:
+        return False
+    # Only the end of a long line is searched. The character before that is
+    # read too and skipped with `pos`, so "^" does not match mid-line.
+    begin = facts.line.begin()
+    limit = get_settings().large_file_char_limit
+    if limit is not None:
+        begin = max(begin, location - limit)
+    start = 1 if begin > facts.line.begin() else 0
+    line = view.substr(sublime.Region(begin - start, location))
+    if any(pattern.search(line, start) for pattern in patterns):
+        stats.increment("rules.suppressed")
+        return True
+    return False
@@ -0,0 +1,111 @@
+import time
+
+import sublime
+
+from . import stats
+from .large_file import is_large_file
+from .settings import get_settings
+
+# Weight of the newest sample in the running averages.
+SMOOTHING = 0.2
+# Gaps longer than this are pauses, not the rhythm of typing.
+BURST_GAP_MS = 1000
+# A gap this many times the usual one counts as a pause.
+PAUSE_FACTOR = 2
+
+
+class Debouncer:
+    """Holds completion requests back while the user types in a burst.
+
+    Listeners call `hold` before sending a request. It learns the gap
+    between keystrokes and the latency of Autocomplete requests; when an
+    answer would likely arrive after the next key anyway, the request waits
+    for a pause instead and is dropped if another key comes first. Requests
+    after a pause or a non-identifier character go out right away.
+    """
+
+    def __init__(self):
+        self.interval_ms = None
+        self.latency_ms = None
+        self.last_request = 0
+        self.held = None
+        self.released = None
+
+    def observe_latency(self, latency_ms):
+        self.latency_ms = average(self.latency_ms, latency_ms)
+
+    def delay(self, view, location):
+        """Milliseconds to hold a request at `location`; 0 sends it now."""
+        now = time.time()
+        gap_ms = (now - self.last_request) * 1000
+        self.last_request = now
+        if gap_ms < BURST_GAP_MS:
+            self.interval_ms = average(self.interval_ms, gap_ms)
+        current_settings = get_settings()
+        large_file_ms = current_settings.large_file_debounce_ms
+        if large_file_ms and is_large_file(view):
+            return 0 if gap_ms > large_file_ms else large_file_ms
+        max_ms = current_settings.debounce_max_ms
+        if not max_ms or self.interval_ms is None or self.latency_ms is None:
+            return 0
+        if gap_ms > PAUSE_FACTOR * self.interval_ms:
+            return 0
+        if self.latency_ms < self.interval_ms:
+            # The answer comes back before the next key.
+            return 0
+        char = view.substr(location - 1) if location > 0 else ""
+        if not (char.isalnum() or char == "_"):
+            return 0
+        return int(min(PAUSE_FACTOR * self.interval_ms, max_ms))
+
+    def hold(self, view, location, send):
+        """Whether to hold back the request at `location`.
+
+        A held request calls `send` on the UI thread once typing pauses,
+        unless the view changed meanwhile. `hold` lets the sent request
+        through.
+        """
+        key = (view.id(), view.change_count(), location)
+        if key == self.released:
+            self.released = None
+            return False
+        if key == self.held:
+            return True
+        delay = self.delay(view, location)
+        if not delay:
+            stats.increment("debounce.immediate")
+            return False
+        stats.increment("debounce.held")
+        self.held = key
+
+        def fire():
+            selection = view.sel()
+            cursor = selection[0].b if len(selection) else None
+            current = (view.id(), view.change_count(), cursor)
+            if self.held != key or not view.is_valid() or current != key:
+                stats.increment("debounce.saved")
+                return
+            self.held = None
+            self.released = key
+            send()
+
+        sublime.set_timeout(fire, delay)
+        return True
+
+
+def average(current, sample):
+    if current is None:
+        return float(sample)
+    return current + SMOOTHING * (sample - current)
+
+
+def report():
+    counters = stats.get_counters()
+    saved = counters.get("debounce.saved", 0)
+    requests = counters.get("debounce.immediate", 0) + counters.get("debounce.held", 0)
+    return "Debounce: {} of {} requests saved ({:.1%})\n".format(
+        saved, requests, saved / float(requests or 1)
+    )
+
+
+debouncer = Debouncer()
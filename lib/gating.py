@@ -0,0 +1,206 @@
+import json
+import os
+import threading
+
+import sublime
+
+from . import logger, stats
+from .settings import get_settings
+from .view_helpers import get_language, get_position_facts
+
+# Scope selectors that get their own acceptance rate; other positions are
+# keyed by the base scope of the view.
+GATED_SELECTORS = ("comment", "string")
+# Requests a key needs before its acceptance rate is trusted.
+MIN_REQUESTS = 50
+# Let every this many suppressed requests through, so a rate can recover.
+EXPLORE_EVERY = 10
+# Halve the counts of a key past this many requests to follow recent use.
+MAX_REQUESTS = 1000
+SAVE_DELAY_MS = 30000
+
+
+def get_store_path():
+    return os.path.join(sublime.cache_path(), "TabNine", "acceptance.json")
+
+
+def scope_key(language, scope):
+    for selector in GATED_SELECTORS:
+        if sublime.score_selector(scope, selector) > 0:
+            return "{} {}".format(language, selector)
+    base = scope.split(" ", 1)[0] if scope else "unknown"
+    return "{} {}".format(language, base)
+
+
+class AcceptanceStore:
+    """Completion requests, acceptances and suppressions per scope key.
+
+    Kept in a small JSON file so the rates survive restarts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.counts = None
+        self.save_pending = False
+
+    def load(self):
+        try:
+            with open(self.path) as store:
+                counts = json.load(store).get("keys", {})
+        except (IOError, OSError, ValueError):
+            counts = {}
+        self.counts = {
+            key: list(value) for key, value in counts.items() if len(value) == 3
+        }
+
+    def get(self, key):
+        if self.counts is None:
+            self.load()
+        counts = self.counts.get(key)
+        if counts is None:
+            counts = self.counts[key] = [0, 0, 0]
+        return counts
+
+    def add(self, key, requests=0, accepted=0, suppressed=0):
+        with self.lock:
+            counts = self.get(key)
+            counts[0] += requests
+            counts[1] += accepted
+            counts[2] += suppressed
+            if counts[0] > MAX_REQUESTS:
+                counts[0] //= 2
+                counts[1] //= 2
+        self.schedule_save()
+
+    def acceptance_rate(self, key):
+        with self.lock:
+            requests, accepted, _ = self.get(key)
+        if requests < MIN_REQUESTS:
+            return None
+        return accepted / float(requests)
+
+    def schedule_save(self):
+        if not self.save_pending:
+            self.save_pending = True
+            sublime.set_timeout(self.save, SAVE_DELAY_MS)
+
+    def save(self):
+        self.save_pending = False
+        if self.counts is None:
+            return
+        with self.lock:
+            data = json.dumps({"keys": self.counts}, sort_keys=True)
+        try:
+            directory = os.path.dirname(self.path)
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(self.path, "w") as store:
+                store.write(data)
+        except (IOError, OSError) as e:
+            logger.info("could not save acceptance rates: {}".format(e))
+
+    def items(self):
+        with self.lock:
+            if self.counts is None:
+                self.load()
+            return sorted((key, list(value)) for key, value in self.counts.items())
+
+
+_store = None
+_suppressed_since_request = {}
+
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = AcceptanceStore(get_store_path())
+    return _store
+
+
+def get_key(view, location):
+    scope = get_position_facts(view, location).scope
+    return scope_key(get_language(view.file_name()), scope)
+
+
+def check(view, location, can_delay=True):
+    """Decide on a completion request at `location`.
+
+    Returns None to skip it, else the milliseconds to wait before sending
+    it. A delayed request that does get sent is reported with
+    record_delayed_request. Callers that cannot delay a request pass
+    `can_delay=False` to have it skipped instead.
+    """
+    current_settings = get_settings()
+    threshold = current_settings.gate_min_acceptance_rate
+    if threshold is None:
+        return 0
+    key = get_key(view, location)
+    store = get_store()
+    rate = store.acceptance_rate(key)
+    if rate is not None and rate < threshold:
+        skipped = _suppressed_since_request.get(key, 0) + 1
+        if skipped < EXPLORE_EVERY:
+            _suppressed_since_request[key] = skipped
+            delay = current_settings.gate_delay_ms
+            if delay and can_delay:
+                stats.increment("gate.delayed")
+                return delay
+            stats.increment("gate.suppressed")
+            store.add(key, suppressed=1)
+            return None
+        _suppressed_since_request[key] = 0
+    store.add(key, requests=1)
+    return 0
+
+
+def record_delayed_request(view, location):
+    stats.increment("gate.delayed_sent")
+    get_store().add(get_key(view, location), requests=1)
+
+
+def record_accepted(language, scope):
+    if get_settings().gate_min_acceptance_rate is not None:
+        get_store().add(scope_key(language, scope), accepted=1)
+
+
+def flush():
+    """Save the acceptance rates now. Call from plugin_unloaded."""
+    if _store is not None:
+        _store.save()
+
+
+def report():
+    threshold = get_settings().gate_min_acceptance_rate
+    lines = [
+        "{:<40} {:>9} {:>9} {:>7} {:>11}".format(
+            "", "requests", "accepted", "rate", "suppressed"
+        )
+    ]
+    total_requests = total_suppressed = 0
+    for key, (requests, accepted, suppressed) in get_store().items():
+        rate = accepted / float(requests) if requests else 0.0
+        below = threshold is not None and requests >= MIN_REQUESTS
+        below = below and rate < threshold
+        lines.append(
+            "{:<40} {:>9} {:>9} {:>6.1%}{} {:>11}".format(
+                key, requests, accepted, rate, "*" if below else " ", suppressed
+            )
+        )
+        total_requests += requests
+        total_suppressed += suppressed
+    lines.append("")
+    if threshold is None:
+        lines.append("Gating is off; set gate_min_acceptance_rate to turn it on.")
+    else:
+        lines.append("* below gate_min_acceptance_rate ({:.1%})".format(threshold))
+    counters = stats.get_counters()
+    saved_share = total_suppressed / float(total_requests + total_suppressed or 1)
+    lines.append(
+        "Requests saved: {} suppressed ({:.1%} of all), {} delayed this session".format(
+            total_suppressed,
+            saved_share,
+            counters.get("gate.delayed", 0) - counters.get("gate.delayed_sent", 0),
+        )
+    )
+    return "\n".join(lines) + "\n"
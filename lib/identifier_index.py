@@ -0,0 +1,210 @@
+import bisect
+import collections
+import re
+import threading
+
+import sublime
+
+from .completion_origin import CompletionOrigin
+from .large_file import is_large_file
+from .settings import get_settings
+
+IDENTIFIER = re.compile(r"[^\W\d]\w{2,}")
+PREFIX = re.compile(r"\w*$")
+# Views larger than this are not indexed.
+MAX_INDEXED_SIZE = 2 * 1024 * 1024
+REINDEX_DELAY_MS = 1000
+# Words looked at under a prefix before picking the most frequent ones.
+SCAN_LIMIT = 200
+# Words added or removed at once above which the sorted list gets rebuilt
+# instead of updated word by word.
+REBUILD_THRESHOLD = 64
+
+
+class WordList:
+    """Words with their number of occurrences, kept sorted for prefix lookups.
+
+    Costs little more than the words themselves, unlike a prefix tree with a
+    dict per character.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.words = []
+
+    def add(self, words, sign):
+        """Add the counts of a Counter of words, or subtract them if `sign` is -1."""
+        added = []
+        removed = []
+        for word, count in words.items():
+            old = self.counts.get(word, 0)
+            total = old + sign * count
+            if total > 0:
+                self.counts[word] = total
+                if not old:
+                    added.append(word)
+            elif old:
+                del self.counts[word]
+                removed.append(word)
+        if len(added) + len(removed) > REBUILD_THRESHOLD:
+            self.words = sorted(self.counts)
+            return
+        for word in removed:
+            del self.words[bisect.bisect_left(self.words, word)]
+        for word in added:
+            bisect.insort(self.words, word)
+
+    def complete(self, prefix, limit):
+        """Up to `limit` of the most frequent words starting with `prefix`."""
+        start = bisect.bisect_left(self.words, prefix)
+        found = []
+        for word in self.words[start : start + SCAN_LIMIT]:
+            if not word.startswith(prefix):
+                break
+            found.append((-self.counts[word], word))
+        return [word for _, word in sorted(found)[:limit]]
+
+
+class ViewWords:
+    __slots__ = ("words", "row", "row_words", "line_count")
+
+    def __init__(self, words, line_count):
+        self.words = words
+        self.row = None
+        self.row_words = collections.Counter()
+        self.line_count = line_count
+
+
+class IdentifierIndex:
+    """Identifiers of the open views, for completions without TabNine.
+
+    A view is indexed in full off the UI thread when activated. After that,
+    each edit only re-reads the line under the cursor and applies the
+    difference. Edits that add or remove lines cause another full index.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.word_list = WordList()
+        self.views = {}
+        self.pending = set()
+
+    def is_enabled(self):
+        return get_settings().fallback_latency_ms is not None
+
+    def is_indexed(self, view):
+        return view.size() <= MAX_INDEXED_SIZE and not is_large_file(view)
+
+    def add_view(self, view):
+        if not self.is_indexed(view):
+            self.remove_view(view)
+        elif self.is_enabled() and view.id() not in self.views:
+            self.schedule_index(view)
+
+    def remove_view(self, view):
+        with self.lock:
+            state = self.views.pop(view.id(), None)
+            if state is not None:
+                self._apply(state.words, -1)
+
+    def schedule_index(self, view):
+        if view.id() in self.pending:
+            return
+        self.pending.add(view.id())
+
+        def run():
+            self.pending.discard(view.id())
+            if view.is_valid():
+                self.index_view(view)
+
+        sublime.set_timeout_async(run, REINDEX_DELAY_MS)
+
+    def index_view(self, view):
+        if not self.is_indexed(view):
+            self.remove_view(view)
+            return
+        text = view.substr(sublime.Region(0, view.size()))
+        words = collections.Counter(IDENTIFIER.findall(text))
+        line_count = text.count("\n")
+        with self.lock:
+            old = self.views.get(view.id())
+            if old is not None:
+                self._apply(old.words, -1)
+            self.views[view.id()] = ViewWords(collections.Counter(), line_count)
+            self._apply(words, 1, self.views[view.id()].words)
+        self.track_cursor(view)
+
+    def track_cursor(self, view):
+        """Remember the words of the cursor's line before it gets edited."""
+        state = self.views.get(view.id())
+        if state is None or not view.sel():
+            return
+        point = view.sel()[0].b
+        row = view.rowcol(point)[0]
+        if row != state.row:
+            state.row = row
+            state.row_words = self._line_words(view, point)
+
+    def update(self, view):
+        """Apply an edit of the cursor's line. Call from on_modified."""
+        if not self.is_enabled():
+            return
+        state = self.views.get(view.id())
+        if state is None:
+            if self.is_indexed(view):
+                self.schedule_index(view)
+            return
+        if len(view.sel()) != 1:
+            self.schedule_index(view)
+            return
+        point = view.sel()[0].b
+        row = view.rowcol(point)[0]
+        line_count = view.rowcol(view.size())[0]
+        if row != state.row or line_count != state.line_count:
+            self.schedule_index(view)
+            return
+        words = self._line_words(view, point)
+        with self.lock:
+            self._apply(state.row_words - words, -1, state.words)
+            self._apply(words - state.row_words, 1, state.words)
+        state.row_words = words
+
+    def complete(self, prefix, limit):
+        with self.lock:
+            return self.word_list.complete(prefix, limit + 1)
+
+    def _line_words(self, view, point):
+        return collections.Counter(IDENTIFIER.findall(view.substr(view.line(point))))
+
+    def _apply(self, words, sign, view_words=None):
+        self.word_list.add(words, sign)
+        for word, count in words.items():
+            if view_words is not None:
+                view_words[word] += sign * count
+                if view_words[word] <= 0:
+                    del view_words[word]
+
+
+def fallback_response(index, before, max_num_results):
+    """An Autocomplete response from the identifiers of the open views."""
+    prefix = PREFIX.search(before).group()
+    words = index.complete(prefix, max_num_results or 5) if prefix else []
+    results = [
+        {
+            "new_prefix": word,
+            "old_suffix": "",
+            "new_suffix": "",
+            "detail": "",
+            "origin": CompletionOrigin.VANILLA,
+        }
+        for word in words
+        if word != prefix
+    ]
+    return {
+        "old_prefix": prefix,
+        "results": results[: max_num_results or 5],
+        "user_message": [],
+    }
+
+
+index = IdentifierIndex()
@@ -0,0 +1,82 @@
+import collections
+import time
+
+import sublime
+
+from . import stats
+from .requests import precompute
+from .settings import get_settings
+from .view_helpers import get_position_facts
+
+HOUR = 3600
+
+
+class IdleScheduler:
+    """Requests completions at the cursor once the user pauses.
+
+    Listeners call `touch` on every edit or cursor move. After
+    idle_precompute_ms without one, completions for the cursor are requested
+    into the completion cache, at most idle_precompute_per_hour times an hour.
+    """
+
+    def __init__(self):
+        self.view = None
+        self.max_num_results = 5
+        self.last_activity = 0
+        self.waiting = False
+        self.last_key = None
+        self.sent = collections.deque()
+
+    def touch(self, view, max_num_results=5):
+        quiet_ms = get_settings().idle_precompute_ms
+        if not quiet_ms:
+            return
+        self.view = view
+        self.max_num_results = max_num_results
+        self.last_activity = time.time()
+        if not self.waiting:
+            # One timeout per quiet period, not one per keystroke.
+            self.waiting = True
+            sublime.set_timeout(self.check, quiet_ms)
+
+    def check(self):
+        quiet_ms = get_settings().idle_precompute_ms
+        if not quiet_ms:
+            self.waiting = False
+            return
+        remaining = self.last_activity + quiet_ms / 1000.0 - time.time()
+        if remaining > 0:
+            sublime.set_timeout(self.check, int(remaining * 1000) + 1)
+            return
+        self.waiting = False
+        view, self.view = self.view, None
+        if view is not None and self.should_precompute(view):
+            self.precompute(view)
+
+    def should_precompute(self, view):
+        if not view.is_valid() or view.is_scratch():
+            return False
+        selection = view.sel()
+        if len(selection) != 1 or not selection[0].empty():
+            return False
+        facts = get_position_facts(view, selection[0].b)
+        if not facts.is_active_view or facts.is_disabled:
+            return False
+        return (view.id(), view.change_count(), selection[0].b) != self.last_key
+
+    def within_budget(self):
+        now = time.time()
+        while self.sent and self.sent[0] < now - HOUR:
+            self.sent.popleft()
+        return len(self.sent) < get_settings().idle_precompute_per_hour
+
+    def precompute(self, view):
+        if not self.within_budget():
+            stats.increment("cache.idle.over_budget")
+            return
+        self.last_key = (view.id(), view.change_count(), view.sel()[0].b)
+        self.sent.append(time.time())
+        precompute(view, "idle", self.max_num_results)
+
+
+scheduler = IdleScheduler()
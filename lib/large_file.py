@@ -0,0 +1,44 @@
+from .settings import get_settings
+
+STATUS_KEY = "tabnine-large-file"
+
+_long_lines = {}
+
+
+def check_view(view):
+    """Decide whether `view` has long lines and show the mode in the status bar.
+
+    Only a few lines are measured: the first one, the one in the middle and
+    the cursor's. Call from on_activated.
+    """
+    line_length = get_settings().large_file_line_length
+    long_lines = False
+    if line_length:
+        points = {0, view.size() // 2}
+        if len(view.sel()):
+            points.add(view.sel()[0].b)
+        long_lines = any(view.line(point).size() > line_length for point in points)
+    _long_lines[view.id()] = long_lines
+    if is_large_file(view):
+        view.set_status(STATUS_KEY, "⌬ tabnine: large file")
+    else:
+        view.erase_status(STATUS_KEY)
+
+
+def forget(view):
+    _long_lines.pop(view.id(), None)
+
+
+def is_large_file(view):
+    """Whether `view` is huge or minified, so completions should cost less."""
+    size = get_settings().large_file_size
+    if size and view.size() >= size:
+        return True
+    return _long_lines.get(view.id(), False)
+
+
+def char_limit(view, default):
+    """Characters of context to send around the cursor of `view`."""
+    if is_large_file(view):
+        return min(default, get_settings().large_file_char_limit)
+    return default
@@ -0,0 +1,56 @@
+import sys
+import weakref
+
+import sublime
+
+# Listeners reporting what they hold per view through memory_by_view().
+_owners = weakref.WeakSet()
+
+
+def track(owner):
+    _owners.add(owner)
+
+
+def deep_size(value, seen=None):
+    """Approximate bytes held by `value` and everything it references."""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in value)
+    elif not isinstance(value, (str, bytes, int, float)):
+        for name in getattr(type(value), "__slots__", ()):
+            size += deep_size(getattr(value, name, None), seen)
+        if hasattr(value, "__dict__"):
+            size += deep_size(vars(value), seen)
+    return size
+
+
+def get_footprints():
+    """Bytes held by the listeners, per view id."""
+    footprints = {}
+    for owner in list(_owners):
+        for view_id, held in owner.memory_by_view().items():
+            footprints[view_id] = footprints.get(view_id, 0) + deep_size(held)
+    return footprints
+
+
+def report():
+    names = {
+        view.id(): view.file_name() or view.name() or "untitled"
+        for window in sublime.windows()
+        for view in window.views()
+    }
+    lines = ["{:>8} {:>10}  {}".format("view", "bytes", "file")]
+    footprints = get_footprints()
+    for view_id, size in sorted(footprints.items()):
+        lines.append(
+            "{:>8} {:>10}  {}".format(view_id, size, names.get(view_id, "(closed)"))
+        )
+    lines.append("{:>8} {:>10}".format("total", sum(footprints.values())))
+    return "\n".join(lines) + "\n"
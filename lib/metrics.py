@@ -0,0 +1,138 @@
+import json
+import os
+import re
+import time
+
+import sublime
+
+from . import logger, stats
+from .completion_cache import cache
+from .recorder import rotate
+from .settings import SETTINGS_PATH, get_settings
+
+ON_CHANGE_TAG = "tabnine-metrics"
+_NAME_CHARACTERS = re.compile(r"[^a-zA-Z0-9_]")
+
+_scheduled = False
+_generation = 0
+
+
+def snapshot():
+    """Counters, histograms and cache hit rates as plain data."""
+    histograms = {}
+    for name, histogram in sorted(stats.get_histograms().items()):
+        histograms[name] = {
+            "count": histogram.count,
+            "sum_ms": round(histogram.total, 3),
+            "max_ms": round(histogram.max, 3),
+            "buckets": list(histogram.counts),
+        }
+    hit_rates = {}
+    for source in sorted(cache.samples):
+        hit_rates[source] = cache.hit_rate(source)
+    return {
+        "time": round(time.time(), 3),
+        "counters": stats.get_counters(),
+        "histograms": histograms,
+        "bucket_bounds_ms": list(stats.BUCKETS_MS),
+        "cache_hit_rates": hit_rates,
+    }
+
+
+def metric_name(name):
+    return "tabnine_" + _NAME_CHARACTERS.sub("_", name)
+
+
+def prometheus_text(data):
+    """`data` from snapshot() in the Prometheus text exposition format."""
+    lines = []
+    for name, value in sorted(data["counters"].items()):
+        metric = metric_name(name) + "_total"
+        lines.append("# TYPE {} counter".format(metric))
+        lines.append("{} {}".format(metric, value))
+    bounds = data["bucket_bounds_ms"]
+    for name, histogram in data["histograms"].items():
+        metric = metric_name(name) + "_ms"
+        lines.append("# TYPE {} histogram".format(metric))
+        cumulative = 0
+        for bound, count in zip(bounds + ["+Inf"], histogram["buckets"]):
+            cumulative += count
+            lines.append('{}_bucket{{le="{}"}} {}'.format(metric, bound, cumulative))
+        lines.append("{}_sum {}".format(metric, histogram["sum_ms"]))
+        lines.append("{}_count {}".format(metric, histogram["count"]))
+    if data["cache_hit_rates"]:
+        lines.append("# TYPE tabnine_cache_hit_rate gauge")
+        for source, rate in sorted(data["cache_hit_rates"].items()):
+            lines.append(
+                'tabnine_cache_hit_rate{{source="{}"}} {}'.format(source, rate)
+            )
+    return "\n".join(lines) + "\n"
+
+
+def export():
+    """Write the current metrics to metrics_path."""
+    current_settings = get_settings()
+    path = os.path.expanduser(current_settings.metrics_path)
+    data = snapshot()
+    try:
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        if current_settings.metrics_format == "prometheus":
+            # Replaced whole, so a collector never reads a partial file.
+            with open(path + ".tmp", "w") as metrics_file:
+                metrics_file.write(prometheus_text(data))
+            os.replace(path + ".tmp", path)
+            return
+        with open(path, "a") as metrics_file:
+            metrics_file.write(json.dumps(data, separators=(",", ":")) + "\n")
+            size = metrics_file.tell()
+        if size >= current_settings.metrics_max_bytes:
+            rotate(path, current_settings.metrics_backups)
+    except (IOError, OSError) as e:
+        logger.info("could not write metrics: {}".format(e))
+
+
+def schedule():
+    """Export metrics every metrics_interval_s while metrics_path is set."""
+    global _scheduled
+    current_settings = get_settings()
+    if _scheduled or not current_settings.metrics_path:
+        return
+    _scheduled = True
+    generation = _generation
+    sublime.set_timeout_async(
+        lambda: _tick(generation), int(current_settings.metrics_interval_s * 1000)
+    )
+
+
+def _tick(generation):
+    global _scheduled
+    if generation != _generation:
+        return
+    _scheduled = False
+    if get_settings().metrics_path:
+        export()
+        schedule()
+
+
+def watch():
+    """Start exporting, now or once metrics_path is set. Call from plugin_loaded."""
+    generation = _generation
+
+    def on_change():
+        if generation == _generation:
+            schedule()
+
+    # Deferred, so the settings snapshot is refreshed first.
+    sublime.load_settings(SETTINGS_PATH).add_on_change(
+        ON_CHANGE_TAG, lambda: sublime.set_timeout(on_change, 0)
+    )
+    schedule()
+
+
+def unwatch():
+    global _scheduled, _generation
+    sublime.load_settings(SETTINGS_PATH).clear_on_change(ON_CHANGE_TAG)
+    _generation += 1
+    _scheduled = False
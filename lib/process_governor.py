@@ -0,0 +1,162 @@
+import os
+import sublime
+
+from . import logger
+from .settings import get_settings
+
+MONITOR_INTERVAL_MS = 10000
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def get_threads(pid):
+    """Return the thread ids of `pid`, or just `pid` where /proc is missing."""
+    try:
+        return [int(tid) for tid in os.listdir("/proc/{}/task".format(pid))]
+    except (IOError, OSError, ValueError):
+        return [pid]
+
+
+def apply_limits(pid):
+    """Apply the configured limits to the started binary `pid`.
+
+    Done from the plugin instead of a Popen preexec_fn, which is not safe
+    with the plugin host's threads. Priority and affinity are set per thread
+    on Linux, so they go to every thread started so far; later ones inherit
+    them.
+    """
+    settings = get_settings()
+    nice = settings.process_nice
+    cpus = settings.process_cpu_affinity
+    memory_limit_mb = settings.process_memory_limit_mb
+    if sublime.platform() == "windows" or not (nice or cpus or memory_limit_mb):
+        return
+    try:
+        if memory_limit_mb:
+            import resource
+
+            if hasattr(resource, "prlimit"):
+                limit = memory_limit_mb * 1024 * 1024
+                resource.prlimit(pid, resource.RLIMIT_AS, (limit, limit))
+            else:
+                logger.info("process_memory_limit_mb is not supported here")
+        for tid in get_threads(pid):
+            if nice:
+                priority = os.getpriority(os.PRIO_PROCESS, tid)
+                os.setpriority(os.PRIO_PROCESS, tid, priority + nice)
+            if cpus and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(tid, cpus)
+    except (IOError, OSError, ValueError) as e:
+        logger.info("could not limit the TabNine process: {}".format(e))
+
+
+def read_usage(pid):
+    """Return (rss_bytes, cpu_seconds) of `pid` from /proc, or None."""
+    try:
+        with open("/proc/{}/statm".format(pid)) as statm:
+            rss_pages = int(statm.read().split()[1])
+        with open("/proc/{}/stat".format(pid)) as stat:
+            # Fields after the parenthesized command name; utime and stime
+            # are the 14th and 15th fields of the whole line.
+            fields = stat.read().rsplit(")", 1)[1].split()
+        cpu_ticks = int(fields[11]) + int(fields[12])
+    except (IOError, OSError, IndexError, ValueError):
+        return None
+    return rss_pages * _PAGE_SIZE, cpu_ticks / _CLOCK_TICKS
+
+
+def read_peak_rss(pid):
+    """Return the peak RSS in bytes of `pid` from /proc, or None."""
+    try:
+        with open("/proc/{}/status".format(pid)) as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+def is_monitored():
+    settings = get_settings()
+    return bool(settings.process_max_rss_mb or settings.process_max_cpu_percent)
+
+
+class ProcessMonitor:
+    """Samples the child's RSS and CPU and restarts it when either is too high.
+
+    A restart only happens once no request was made for `process_idle_seconds`
+    so that it never lands in the middle of typing.
+    """
+
+    def __init__(self, tabnine_process):
+        self.tabnine_process = tabnine_process
+        self.running = False
+        # Tells a pending check of a stopped polling chain to end it.
+        self.generation = 0
+        self.last_cpu = None
+        self.rss = 0
+        self.cpu_percent = 0
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.generation += 1
+            self.schedule(self.generation)
+
+    def stop(self):
+        self.running = False
+
+    def schedule(self, generation):
+        sublime.set_timeout_async(lambda: self.check(generation), MONITOR_INTERVAL_MS)
+
+    def check(self, generation):
+        if not self.running or generation != self.generation:
+            return
+        try:
+            self.sample()
+        finally:
+            self.schedule(generation)
+
+    def sample(self):
+        settings = get_settings()
+        proc = self.tabnine_process.tabnine_proc
+        if proc is None or proc.poll() is not None:
+            self.last_cpu = None
+            return
+        usage = read_usage(proc.pid)
+        if usage is None:
+            return
+        self.rss, cpu = usage
+        last_cpu = self.last_cpu
+        if last_cpu is not None:
+            self.cpu_percent = 100.0 * (cpu - last_cpu) / (MONITOR_INTERVAL_MS / 1000.0)
+        self.last_cpu = cpu
+        logger.debug(
+            "tabnine process {}: rss {:.1f} MB, cpu {:.1f}%".format(
+                proc.pid, self.rss / 1024.0 / 1024.0, self.cpu_percent
+            )
+        )
+
+        max_rss_mb = settings.process_max_rss_mb
+        max_cpu_percent = settings.process_max_cpu_percent
+        if max_rss_mb and self.rss > max_rss_mb * 1024 * 1024:
+            reason = "using {:.0f} MB (limit {} MB)".format(
+                self.rss / 1024.0 / 1024.0, max_rss_mb
+            )
+        elif (
+            max_cpu_percent
+            and last_cpu is not None
+            and self.cpu_percent > max_cpu_percent
+        ):
+            reason = "at {:.0f}% CPU (limit {}%)".format(
+                self.cpu_percent, max_cpu_percent
+            )
+        else:
+            return
+        # Busy while idle means it is not working on our requests.
+        if self.tabnine_process.idle_seconds() < settings.process_idle_seconds:
+            return
+        logger.info("Restarting Tabnine process {} {}".format(proc.pid, reason))
+        self.last_cpu = None
+        self.tabnine_process.restart_tabnine_proc()
@@ -0,0 +1,7 @@
+# The TabNine child process outlives plugin reloads through this module.
+# TabNine.py never evicts it from sys.modules, so the next copy of
+# tab_nine_process finds the previous TabNineProcess here and adopts its
+# child instead of starting a new one. Keep this module free of logic: after
+# a package update the old copy of it stays loaded.
+
+state = {"process": None, "generation": 0}
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+
+import sublime
+
+from . import logger
+from .settings import get_settings
+
+TOP_ALLOCATIONS = 30
+TRACEBACK_FRAMES = 5
+
+# The running Session, or None. Hot paths only check this.
+session = None
+
+
+class Session:
+    """cProfile and tracemalloc capture of the plugin for a time window.
+
+    Each thread gets its own profiler since cProfile only follows the thread
+    that enabled it; the profiles are merged into one pstats file at the end.
+    """
+
+    def __init__(self):
+        import cProfile
+
+        try:
+            import tracemalloc
+        except ImportError:  # Python 3.3
+            tracemalloc = None
+
+        self.profile_class = cProfile.Profile
+        self.tracemalloc = tracemalloc
+        self.started_tracing = False
+        self.profiles = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.started = time.time()
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+            self.started_tracing = True
+
+    def runcall(self, func, *args):
+        if getattr(self.local, "active", False):
+            # Already inside a profiled call on this thread.
+            return func(*args)
+        ident = threading.get_ident()
+        with self.lock:
+            profile = self.profiles.get(ident)
+            if profile is None:
+                profile = self.profiles[ident] = self.profile_class()
+        self.local.active = True
+        try:
+            return profile.runcall(func, *args)
+        finally:
+            self.local.active = False
+
+    def write(self, directory):
+        """Write the pstats file and allocation report, returning their paths."""
+        import pstats
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        base = os.path.join(
+            directory,
+            "tabnine-profile-" + time.strftime("%Y%m%d-%H%M%S", time.localtime()),
+        )
+        paths = []
+        with self.lock:
+            profiles = list(self.profiles.values())
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(base + ".pstats")
+            paths.append(base + ".pstats")
+        if self.tracemalloc is not None and self.tracemalloc.is_tracing():
+            snapshot = self.tracemalloc.take_snapshot()
+            with open(base + "-allocations.txt", "w") as report:
+                report.write(self.allocation_report(snapshot))
+            paths.append(base + "-allocations.txt")
+        return paths
+
+    def allocation_report(self, snapshot):
+        lines = [
+            "Top {} allocations after {:.0f} s of profiling".format(
+                TOP_ALLOCATIONS, time.time() - self.started
+            ),
+            "",
+        ]
+        for index, statistic in enumerate(
+            snapshot.statistics("traceback")[:TOP_ALLOCATIONS]
+        ):
+            lines.append(
+                "#{}: {:.1f} KiB in {} blocks".format(
+                    index + 1, statistic.size / 1024.0, statistic.count
+                )
+            )
+            lines.extend("    " + line for line in statistic.traceback.format())
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self.started_tracing:
+            self.tracemalloc.stop()
+
+
+def get_profile_directory():
+    """The directory of log_file_path if it is set, else our cache directory."""
+    log_file_path = get_settings().log_file_path
+    if log_file_path:
+        return os.path.dirname(os.path.abspath(os.path.expanduser(log_file_path)))
+    return os.path.join(sublime.cache_path(), "TabNine")
+
+
+def start(seconds):
+    """Profile the listeners and TabNine requests for the next `seconds`."""
+    global session
+    if session is not None:
+        sublime.status_message("Tabnine is already profiling")
+        return
+    current = session = Session()
+    sublime.status_message("Tabnine: profiling for {} seconds".format(seconds))
+
+    def finish():
+        if session is current:
+            stop()
+
+    sublime.set_timeout(finish, int(seconds * 1000))
+
+
+def stop():
+    """End profiling and write the reports. Returns their paths."""
+    global session
+    current, session = session, None
+    if current is None:
+        return []
+    try:
+        paths = current.write(get_profile_directory())
+    except (IOError, OSError) as e:
+        logger.info("could not write profile: {}".format(e))
+        paths = []
+    finally:
+        current.close()
+    for path in paths:
+        logger.info("profile written to {}".format(path))
+    sublime.status_message(
+        "Tabnine profile written to {}".format(os.path.dirname(paths[0]))
+        if paths
+        else "Tabnine profiling finished without samples"
+    )
+    return paths
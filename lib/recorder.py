@@ -0,0 +1,123 @@
+import json
+import os
+import re
+
+from .settings import get_settings
+
+_NON_SPACE = re.compile(r"\S")
+_REDACTED_KEYS = (
+    "before",
+    "after",
+    "new_prefix",
+    "old_prefix",
+    "old_suffix",
+    "new_suffix",
+    "documentation",
+)
+
+_recorder = None
+
+
+def redact(value):
+    """Mask text in requests and responses, keeping lengths and line breaks."""
+    if isinstance(value, dict):
+        redacted = {}
+        for key, item in value.items():
+            if key in _REDACTED_KEYS and isinstance(item, str):
+                redacted[key] = _NON_SPACE.sub("x", item)
+            elif key == "filename" and isinstance(item, str):
+                redacted[key] = "redacted" + os.path.splitext(item)[1]
+            else:
+                redacted[key] = redact(item)
+        return redacted
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def rotate(path, backups):
+    """Move `path` to `path`.1, keeping up to `backups` older files."""
+    for index in range(backups - 1, 0, -1):
+        source = "{}.{}".format(path, index)
+        if os.path.exists(source):
+            os.replace(source, "{}.{}".format(path, index + 1))
+    if backups > 0:
+        os.replace(path, path + ".1")
+    else:
+        os.remove(path)
+
+
+class Recorder:
+    """Appends request/response pairs to a rotating JSONL file.
+
+    Each line is {"t": monotonic send time, "ms": latency, "request": ...,
+    "response": ...}; benchmarks/replay.py plays such files back.
+    """
+
+    def __init__(self, path, max_bytes, backups, redact_context):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.redact_context = redact_context
+        self.file = None
+
+    def matches(self, settings):
+        return (
+            self.path == os.path.expanduser(settings.record_requests_path)
+            and self.max_bytes == settings.record_max_bytes
+            and self.backups == settings.record_backups
+            and self.redact_context == settings.record_redact_context
+        )
+
+    def record(self, request, response, started, elapsed):
+        entry = {
+            "t": round(started, 4),
+            "ms": round(elapsed * 1000, 3),
+            "request": request,
+            "response": response,
+        }
+        if self.redact_context:
+            entry = redact(entry)
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        try:
+            if self.file is None:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                self.file = open(self.path, "a")
+            self.file.write(line)
+            self.file.flush()
+            if self.file.tell() >= self.max_bytes:
+                self.rotate()
+        except (IOError, OSError) as e:
+            print("Tabnine could not record request:", e)
+
+    def rotate(self):
+        self.close()
+        rotate(self.path, self.backups)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def get_recorder():
+    """Return the recorder for the current settings, or None when disabled."""
+    global _recorder
+    settings = get_settings()
+    if not settings.record_requests_path:
+        if _recorder is not None:
+            _recorder.close()
+            _recorder = None
+        return None
+    if _recorder is None or not _recorder.matches(settings):
+        if _recorder is not None:
+            _recorder.close()
+        _recorder = Recorder(
+            settings.record_requests_path,
+            settings.record_max_bytes,
+            settings.record_backups,
+            settings.record_redact_context,
+        )
+    return _recorder
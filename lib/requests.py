@@ -1,6 +1,22 @@
+import sublime
+
+from . import gating, stats
+from .completion_rules import is_cancelled
 from .tab_nine_process import tabnine_proc
+from .completion_cache import cache
 from .completion_origin import CompletionOrigin
+from .debounce import debouncer
+from .identifier_index import fallback_response, index
+from .large_file import char_limit
+from .result_count import counts as result_counts
+from .settings import get_settings
+from .view_helpers import ViewContext, get_language
 import os
+import queue
+import threading
+import time
+
+AUTOCOMPLETE_CHAR_LIMIT = 100000
 
 
 def get_capabilities():
@@ -31,6 +47,11 @@ def autocomplete(
     region_includes_end,
     max_num_results=5,
 ):
+    language = get_language(file_name)
+    max_num_results = result_counts.get(language, max_num_results)
+    cached = cache.lookup(before, after, file_name, max_num_results)
+    if cached is not None:
+        return cached
     request = {
         "Autocomplete": {
             "before": before,
@@ -41,7 +62,136 @@ def autocomplete(
             "max_num_results": max_num_results,
         }
     }
-    return tabnine_proc.request(request)
+    budget_ms = get_settings().fallback_latency_ms
+    if budget_ms is None:
+        return timed_request(request, language)
+    # Answer from the identifiers of the open views when TabNine does not
+    # answer within the budget or has no answer at all.
+    outcome, response = request_within(request, language, budget_ms / 1000.0)
+    if response is None:
+        stats.increment("fallback." + outcome)
+        return fallback_response(index, before, max_num_results)
+    return response
+
+
+class Worker:
+    """Runs functions one after another on a single background thread."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.thread = None
+
+    def submit(self, job):
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run)
+                self.thread.daemon = True
+                self.thread.start()
+        self.jobs.put(job)
+
+    def _run(self):
+        while True:
+            self.jobs.get()()
+
+
+worker = Worker()
+
+
+def request_within(request, language, timeout):
+    """Send an Autocomplete request and wait at most `timeout` seconds for it.
+
+    Returns (outcome, response): "busy" if earlier requests kept TabNine
+    busy all along, "slow" if TabNine did not answer in time, "failed" if it
+    had no answer. A late answer is stored into the completion cache; a
+    request given up on before it was sent is dropped.
+    """
+    guard = threading.Lock()
+    answered = threading.Event()
+    state = {"outcome": "busy", "response": None, "waiting": True}
+
+    def run():
+        with guard:
+            if not state["waiting"]:
+                return
+        if not tabnine_proc.lock.acquire(timeout=timeout):
+            answered.set()
+            return
+        with guard:
+            state["outcome"] = "slow"
+        try:
+            response = timed_request(request, language)
+        finally:
+            tabnine_proc.lock.release()
+        with guard:
+            if state["waiting"]:
+                state["outcome"] = "failed"
+                state["response"] = response
+                answered.set()
+                return
+        if response is not None and cache.is_enabled("late"):
+            args = request["Autocomplete"]
+            cache.store(
+                "late",
+                args["before"],
+                args["after"],
+                args["filename"],
+                args["max_num_results"],
+                response,
+            )
+
+    worker.submit(run)
+    answered.wait(timeout)
+    with guard:
+        state["waiting"] = False
+        return state["outcome"], state["response"]
+
+
+def timed_request(request, language):
+    started = time.monotonic()
+    response = tabnine_proc.request(request)
+    latency_ms = (time.monotonic() - started) * 1000
+    debouncer.observe_latency(latency_ms)
+    result_counts.observe_latency(language, latency_ms)
+    return response
+
+
+def precompute(view, source, max_num_results=5):
+    """Request completions for the cursor of `view` into the completion cache.
+
+    The request is sent off the UI thread, and only if no other request is
+    in flight and the view has not changed by then.
+    """
+    if not cache.is_enabled(source) or is_cancelled(view, view.sel()[0].b):
+        return
+    context = ViewContext(view, char_limit(view, AUTOCOMPLETE_CHAR_LIMIT))
+    file_name = view.file_name()
+    max_num_results = result_counts.get(get_language(file_name), max_num_results)
+
+    def run():
+        text = context.read(view)
+        if text is None or not tabnine_proc.lock.acquire(False):
+            stats.increment("cache.{}.skipped".format(source))
+            return
+        try:
+            response = tabnine_proc.request(
+                {
+                    "Autocomplete": {
+                        "before": text[0],
+                        "after": text[1],
+                        "filename": file_name,
+                        "region_includes_beginning": context.region_includes_beginning,
+                        "region_includes_end": context.region_includes_end,
+                        "max_num_results": max_num_results,
+                    }
+                }
+            )
+        finally:
+            tabnine_proc.lock.release()
+        if response is not None:
+            cache.store(source, text[0], text[1], file_name, max_num_results, response)
+
+    sublime.set_timeout_async(run, 0)
 
 
 def set_completion_state(
@@ -52,6 +202,7 @@ def set_completion_state(
     substitution,
     selected_completion,
     completions,
+    scope=None,
 ):
     line_prefix_length = (current_location - len(substitution)) - current_line.begin()
     length = current_location - before_prefix_location
@@ -90,16 +241,12 @@ def set_completion_state(
             ],
         }
     }
+    language = request["Selection"]["language"]
+    result_counts.record_accepted(language, request["Selection"]["index"])
+    if scope is not None:
+        gating.record_accepted(language, scope)
     set_state(request)
 
 
 def count_by_origin(completions, origin):
     return len([x for x in completions if x["origin"] == origin])
-
-
-def get_language(file_name):
-    if file_name is not None:
-        parts = file_name.split(".")
-        if len(parts) > 1:
-            return parts[-1]
-    return "undefined"
@@ -0,0 +1,97 @@
+import threading
+
+from . import logger, stats
+from .settings import get_settings
+
+MIN_RESULTS = 2
+MAX_RESULTS = 10
+# Requests of a language between two adjustments of its result count.
+ADJUST_EVERY = 20
+# Weight of the newest latency in the running average.
+SMOOTHING = 0.2
+# Share of acceptances of the last offered result that asks for more results.
+DEEP_SHARE = 0.1
+
+
+class Language:
+    __slots__ = ("count", "latency_ms", "requests", "accepted", "accepted_last")
+
+    def __init__(self, count):
+        self.count = count
+        self.latency_ms = None
+        self.requests = 0
+        self.accepted = 0
+        self.accepted_last = 0
+
+
+class ResultCounts:
+    """The max_num_results to request per language.
+
+    The count drops while Autocomplete latency of a language is above
+    result_latency_budget_ms. Below half the budget it rises if the last
+    offered result gets accepted often, and drops if it never does.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.languages = {}
+
+    def get(self, language, default):
+        if default is None or get_settings().result_latency_budget_ms is None:
+            return default
+        with self.lock:
+            state = self.languages.get(language)
+            if state is None:
+                count = min(max(default, MIN_RESULTS), MAX_RESULTS)
+                state = self.languages[language] = Language(count)
+            return state.count
+
+    def observe_latency(self, language, latency_ms):
+        budget_ms = get_settings().result_latency_budget_ms
+        state = self.languages.get(language)
+        if budget_ms is None or state is None:
+            return
+        with self.lock:
+            if state.latency_ms is None:
+                state.latency_ms = latency_ms
+            else:
+                state.latency_ms += SMOOTHING * (latency_ms - state.latency_ms)
+            state.requests += 1
+            if state.requests >= ADJUST_EVERY:
+                self.adjust(language, state, budget_ms)
+
+    def record_accepted(self, language, index):
+        state = self.languages.get(language)
+        if state is None:
+            return
+        with self.lock:
+            state.accepted += 1
+            if index >= state.count - 1:
+                state.accepted_last += 1
+
+    def adjust(self, language, state, budget_ms):
+        count = state.count
+        if state.latency_ms > budget_ms:
+            count -= 1
+        elif state.latency_ms < budget_ms / 2.0 and state.accepted >= ADJUST_EVERY:
+            if state.accepted_last > DEEP_SHARE * state.accepted:
+                count += 1
+            elif not state.accepted_last:
+                count -= 1
+        count = min(max(count, MIN_RESULTS), MAX_RESULTS)
+        if count != state.count:
+            stats.increment(
+                "results.raised" if count > state.count else "results.lowered"
+            )
+            logger.debug(
+                "{} completions for {} at {:.0f} ms".format(
+                    count, language, state.latency_ms
+                )
+            )
+            state.count = count
+            # Acceptances of the old count say little about the new one.
+            state.accepted = state.accepted_last = 0
+        state.requests = 0
+
+
+counts = ResultCounts()
@@ -1,6 +1,12 @@
 import json
 import os
 
+import sublime
+
+SETTINGS_PATH = "TabNine.sublime-settings"
+PREFERENCES_PATH = "Preferences.sublime-settings"
+ON_CHANGE_TAG = "tabnine-settings-snapshot"
+
 _install_directory = os.path.dirname(__file__)
 _settings_dir = os.path.abspath(
     os.path.join(
@@ -11,28 +17,119 @@ _package_dir = os.path.abspath(
     os.path.join(_install_directory, os.pardir, os.pardir, "TabNine", "package.json")
 )
 
-_SETTINGS = None
-_DEVELOPMENT = None
-_IS_NATIVE_AUTO_IMPORT = None
+# Keep in sync with TabNine.sublime-settings.
+TABNINE_DEFAULTS = {
+    "max_num_results": 5,
+    "documentation": True,
+    "detail": True,
+    "highlight": True,
+    "native_auto_complete": False,
+    "development_mode": False,
+    "custom_binary_path": None,
+    "log_file_path": None,
+    "extra_args": None,
+    "daemon_socket_path": None,
+    "process_nice": None,
+    "process_cpu_affinity": None,
+    "process_memory_limit_mb": None,
+    "process_max_rss_mb": None,
+    "process_max_cpu_percent": None,
+    "process_idle_seconds": 30,
+    "record_requests_path": None,
+    "record_max_bytes": 10 * 1024 * 1024,
+    "record_backups": 3,
+    "record_redact_context": True,
+    "request_timeout_ms": 10000,
+    "startup_timeout_ms": 60000,
+    "stall_budget_ms": 16,
+    "speculative_completions": False,
+    "precompute_min_hit_rate": 0.2,
+    "idle_precompute_ms": None,
+    "idle_precompute_per_hour": 120,
+    "gate_min_acceptance_rate": None,
+    "gate_delay_ms": None,
+    "fallback_latency_ms": None,
+    "debounce_max_ms": 150,
+    "large_file_size": 2000000,
+    "large_file_line_length": 5000,
+    "large_file_char_limit": 2000,
+    "large_file_debounce_ms": 300,
+    "completion_rules_paths": [],
+    "metrics_path": None,
+    "metrics_format": "jsonl",
+    "metrics_interval_s": 60,
+    "metrics_max_bytes": 1024 * 1024,
+    "metrics_backups": 3,
+    "result_latency_budget_ms": None,
+}
+PREFERENCES_DEFAULTS = {
+    "auto_complete_delay": None,
+}
+
+_SNAPSHOT = None
 _VERSION = None
 
 
-def get_settings_eager():
-    global _SETTINGS
-    if _SETTINGS is None:
-        _setup()
-    return _SETTINGS
+class SettingsSnapshot:
+    """Immutable view of the TabNine settings and the preferences we read.
 
+    A new snapshot replaces the current one whenever either settings file
+    changes, so hot paths can read plain attributes instead of calling
+    `sublime.load_settings`.
+    """
 
-def _setup():
-    global _SETTINGS
-    if _SETTINGS is None:
-        try:
-            with open(_settings_dir) as json_file:
-                data = remove_trailing_comma(json_file)
-                _SETTINGS = json.loads(data)
-        except:  # noqa E722
-            _SETTINGS = {}
+    __slots__ = tuple(sorted(TABNINE_DEFAULTS)) + tuple(sorted(PREFERENCES_DEFAULTS))
+
+    def __init__(self, tabnine, preferences):
+        for key, default in TABNINE_DEFAULTS.items():
+            object.__setattr__(self, key, tabnine.get(key, default))
+        for key, default in PREFERENCES_DEFAULTS.items():
+            object.__setattr__(self, key, preferences.get(key, default))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("settings snapshots are read-only")
+
+    def auto_complete_delay_sec(self):
+        if self.auto_complete_delay is None:
+            return 0
+        return (self.auto_complete_delay / 1000) % 60
+
+
+def get_settings():
+    global _SNAPSHOT
+    if _SNAPSHOT is None:
+        _SNAPSHOT = SettingsSnapshot(_read_user_settings(), {})
+    return _SNAPSHOT
+
+
+def _read_user_settings():
+    # The settings API is not usable before plugin_loaded, so the first
+    # snapshot (needed to start the binary at import time) parses the file.
+    try:
+        with open(_settings_dir) as json_file:
+            data = remove_trailing_comma(json_file)
+            return json.loads(data)
+    except:  # noqa E722
+        return {}
+
+
+def _refresh():
+    global _SNAPSHOT
+    _SNAPSHOT = SettingsSnapshot(
+        sublime.load_settings(SETTINGS_PATH), sublime.load_settings(PREFERENCES_PATH)
+    )
+
+
+def watch():
+    """Follow settings changes. Call from plugin_loaded."""
+    for path in (SETTINGS_PATH, PREFERENCES_PATH):
+        sublime.load_settings(path).add_on_change(ON_CHANGE_TAG, _refresh)
+    _refresh()
+
+
+def unwatch():
+    for path in (SETTINGS_PATH, PREFERENCES_PATH):
+        sublime.load_settings(path).clear_on_change(ON_CHANGE_TAG)
 
 
 def get_version():
@@ -52,21 +149,11 @@ def remove_trailing_comma(json_file):
 
 
 def is_development():
-    global _DEVELOPMENT
-    if _DEVELOPMENT is None:
-        _setup()
-        _DEVELOPMENT = _SETTINGS.get("development_mode", False)
-
-    return _DEVELOPMENT
+    return get_settings().development_mode
 
 
 def is_native_auto_complete():
-    global _IS_NATIVE_AUTO_IMPORT
-    if _IS_NATIVE_AUTO_IMPORT is None:
-        _setup()
-        _IS_NATIVE_AUTO_IMPORT = _SETTINGS.get("native_auto_complete", False)
-
-    return _IS_NATIVE_AUTO_IMPORT
+    return get_settings().native_auto_complete
 
 
 def is_tabnine_disabled(view):
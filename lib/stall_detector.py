@@ -0,0 +1,140 @@
+import functools
+import sys
+import threading
+import time
+import traceback
+
+from . import logger, profiler, stats
+from .settings import get_settings
+
+# Log at most one stack per callback in this many seconds; every stall is
+# still counted.
+STACK_LOG_INTERVAL = 60
+
+_watchdog = None
+_last_logged = {}
+
+
+class Call:
+    __slots__ = ("thread_id", "budget", "stack")
+
+    def __init__(self, budget):
+        self.thread_id = threading.get_ident()
+        self.budget = budget
+        self.stack = None
+
+
+class Watchdog:
+    """Samples the stack of a callback that is still running after its budget.
+
+    Sampling while the callback runs shows where the UI thread is stuck,
+    which the stack at the end of the callback does not.
+    """
+
+    def __init__(self):
+        self.call = None
+        self.pending = threading.Event()
+        self.stopped = False
+        thread = threading.Thread(target=self._run, name="tabnine-stall-watchdog")
+        thread.daemon = True
+        thread.start()
+
+    def enter(self, budget):
+        previous = self.call
+        self.call = Call(budget)
+        self.pending.set()
+        return previous
+
+    def leave(self, previous):
+        call = self.call
+        self.call = previous
+        return call
+
+    def stop(self):
+        self.stopped = True
+        self.pending.set()
+
+    def _run(self):
+        while True:
+            self.pending.wait()
+            self.pending.clear()
+            if self.stopped:
+                return
+            call = self.call
+            if call is None:
+                continue
+            time.sleep(call.budget)
+            if self.call is call:
+                frame = sys._current_frames().get(call.thread_id)
+                if frame is not None:
+                    call.stack = "".join(traceback.format_stack(frame))
+
+
+def _get_watchdog():
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = Watchdog()
+    return _watchdog
+
+
+def stop():
+    """Stop the watchdog thread. Call from plugin_unloaded."""
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog.stop()
+        _watchdog = None
+
+
+def _describe(view, args):
+    description = "view {} ({})".format(view.id(), view.file_name() or "untitled")
+    if args and isinstance(args[0], str):
+        # on_text_command and on_post_text_command
+        description += " command {}".format(args[0])
+    return description
+
+
+def _report_stall(name, view, args, elapsed_ms, budget_ms, stack):
+    stats.increment("stalls." + name)
+    now = time.time()
+    if now - _last_logged.get(name, 0) < STACK_LOG_INTERVAL:
+        return
+    _last_logged[name] = now
+    logger.info(
+        "{} took {:.1f} ms (budget {} ms) for {}".format(
+            name, elapsed_ms, budget_ms, _describe(view, args)
+        )
+    )
+    if stack:
+        logger.info("UI thread after {} ms:\n{}".format(budget_ms, stack))
+
+
+def instrument(callback):
+    """Time an EventListener callback on the UI thread.
+
+    Durations go to the "ui.<callback>" histogram. A callback running longer
+    than the stall_budget_ms setting is counted and logged with a stack
+    sampled while it was over budget. Also profiles the callback while a
+    lib/profiler session runs.
+    """
+    name = callback.__name__
+    histogram = "ui." + name
+
+    @functools.wraps(callback)
+    def wrapper(self, view, *args):
+        budget_ms = get_settings().stall_budget_ms
+        watchdog = _get_watchdog() if budget_ms else None
+        previous = watchdog.enter(budget_ms / 1000.0) if watchdog else None
+        started = time.perf_counter()
+        try:
+            profiling = profiler.session
+            if profiling is not None:
+                return profiling.runcall(callback, self, view, *args)
+            return callback(self, view, *args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            call = watchdog.leave(previous) if watchdog else None
+            stats.observe(histogram, elapsed_ms)
+            if budget_ms and elapsed_ms > budget_ms:
+                _report_stall(name, view, args, elapsed_ms, budget_ms, call.stack)
+
+    return wrapper
@@ -0,0 +1,100 @@
+import bisect
+import threading
+
+# Upper bounds of the histogram buckets; a last bucket takes everything above.
+BUCKETS_MS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+
+
+class Histogram:
+    """Millisecond durations counted in fixed power-of-two buckets."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.max = max(self.max, value_ms)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of values."""
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= fraction * self.count:
+                return BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max
+        return 0.0
+
+    def copy(self):
+        histogram = Histogram()
+        histogram.counts = list(self.counts)
+        histogram.count = self.count
+        histogram.total = self.total
+        histogram.max = self.max
+        return histogram
+
+
+def increment(name, amount=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def observe(name, value_ms):
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = Histogram()
+        histogram.observe(value_ms)
+
+
+def get_counters():
+    with _lock:
+        return dict(_counters)
+
+
+def get_histograms():
+    with _lock:
+        return {name: histogram.copy() for name, histogram in _histograms.items()}
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def report():
+    """Plain text table of all histograms and counters."""
+    lines = [
+        "{:<40} {:>8} {:>9} {:>9} {:>9} {:>9}".format(
+            "", "count", "mean ms", "p50 ms", "p99 ms", "max ms"
+        )
+    ]
+    for name, histogram in sorted(get_histograms().items()):
+        lines.append(
+            "{:<40} {:>8} {:>9.2f} {:>9g} {:>9g} {:>9.1f}".format(
+                name,
+                histogram.count,
+                histogram.mean(),
+                histogram.percentile(0.5),
+                histogram.percentile(0.99),
+                histogram.max,
+            )
+        )
+    lines.append("")
+    for name, value in sorted(get_counters().items()):
+        lines.append("{:<40} {:>8}".format(name, value))
+    return "\n".join(lines) + "\n"
@@ -1,14 +1,22 @@
 import os
-import platform
+import queue
 import sublime
 import subprocess
-from imp import reload
+import threading
+import time
 from json import loads, dumps
 import stat
-from .settings import get_settings_eager, is_native_auto_complete, get_version
+from . import profiler, stats
+from .settings import get_settings, is_native_auto_complete, get_version
+from .process_governor import ProcessMonitor, apply_limits, is_monitored
+from .process_handle import state as handle
+from .recorder import get_recorder
 
 SETTINGS_PATH = "TabNine.sublime-settings"
 MAX_RESTARTS = 10
+DAEMON_CONNECT_TIMEOUT = 1
+DAEMON_RETRY_INTERVAL = 30
+RELEASE_GRACE_MS = 5000
 
 
 def add_execute_permission(path):
@@ -35,6 +43,8 @@ def parse_semver(s):
 
 
 def get_arch():
+    import platform
+
     try:
         # handle a case of m1 running under roseeta
         if sublime.platform() == "osx":
@@ -47,22 +57,37 @@ def get_arch():
     return sublime.arch()
 
 
+PLATFORM_TARGETS = {
+    ("linux", "x32"): "i686-unknown-linux-musl/TabNine",
+    ("linux", "x64"): "x86_64-unknown-linux-musl/TabNine",
+    ("osx", "x32"): "i686-apple-darwin/TabNine",
+    ("osx", "x64"): "x86_64-apple-darwin/TabNine",
+    ("osx", "arm64"): "aarch64-apple-darwin/TabNine",
+    ("windows", "x32"): "i686-pc-windows-gnu/TabNine.exe",
+    ("windows", "x64"): "x86_64-pc-windows-gnu/TabNine.exe",
+}
+
+
+def get_binary_target():
+    return PLATFORM_TARGETS[sublime.platform(), get_arch()]
+
+
+def get_installed_versions(binary_dir):
+    """Return (version, path) of every installed binary, newest first."""
+    target = get_binary_target()
+    versions = sorted(os.listdir(binary_dir), key=parse_semver, reverse=True)
+    return [
+        (version, os.path.join(binary_dir, version, target))
+        for version in versions
+        if os.path.isfile(os.path.join(binary_dir, version, target))
+    ]
+
+
 def get_tabnine_path(binary_dir):
     def join_path(*args):
         return os.path.join(binary_dir, *args)
 
-    translation = {
-        ("linux", "x32"): "i686-unknown-linux-musl/TabNine",
-        ("linux", "x64"): "x86_64-unknown-linux-musl/TabNine",
-        ("osx", "x32"): "i686-apple-darwin/TabNine",
-        ("osx", "x64"): "x86_64-apple-darwin/TabNine",
-        ("osx", "arm64"): "aarch64-apple-darwin/TabNine",
-        ("windows", "x32"): "i686-pc-windows-gnu/TabNine.exe",
-        ("windows", "x64"): "x86_64-pc-windows-gnu/TabNine.exe",
-    }
-
-    platform_key = sublime.platform(), get_arch()
-    platform = translation[platform_key]
+    platform = get_binary_target()
 
     versions = []
 
@@ -88,80 +113,342 @@ def get_tabnine_path(binary_dir):
             return path
 
 
+class DaemonConnection:
+    """Line protocol connection to a shared TabNine daemon on a Unix socket.
+
+    See tools/tabnine_daemon.py for the daemon side.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.sock = None
+        self.reader = None
+        self.retry_at = 0
+
+    @staticmethod
+    def is_supported():
+        import socket
+
+        return hasattr(socket, "AF_UNIX")
+
+    def is_available(self):
+        return self.sock is not None or time.time() >= self.retry_at
+
+    def connect(self):
+        import socket
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.settimeout(DAEMON_CONNECT_TIMEOUT)
+            sock.connect(os.path.expanduser(self.path))
+        except (IOError, OSError):
+            sock.close()
+            self.retry_at = time.time() + DAEMON_RETRY_INTERVAL
+            raise
+        self.sock = sock
+        self.reader = sock.makefile("rb")
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.reader.close()
+                self.sock.close()
+            except (IOError, OSError):
+                pass
+        self.sock = None
+        self.reader = None
+
+    def exchange(self, line, timeout=None):
+        """Send one request line, reconnecting once if the daemon went away.
+
+        Gives up after `timeout` seconds without a response.
+        """
+        import socket
+
+        for _ in range(2):
+            if self.sock is None:
+                self.connect()
+            try:
+                self.sock.settimeout(timeout)
+                self.sock.sendall(line)
+                result = self.reader.readline()
+                if result.endswith(b"\n"):
+                    return result
+                error = IOError("daemon closed the connection")
+            except socket.timeout as e:
+                # Waiting again would only double the stall.
+                stats.increment("process.timeouts")
+                self.close()
+                error = e
+                break
+            except (IOError, OSError) as e:
+                error = e
+            self.close()
+        self.retry_at = time.time() + DAEMON_RETRY_INTERVAL
+        raise error
+
+
+class LineReader:
+    """Reads the binary's response lines on a background thread.
+
+    Lets a request give up after `request_timeout_ms`, so a hung binary gets
+    restarted instead of blocking the caller forever.
+    """
+
+    def __init__(self, stream):
+        self.lines = queue.Queue()
+        thread = threading.Thread(target=self._read, args=(stream,))
+        thread.daemon = True
+        thread.start()
+
+    def _read(self, stream):
+        try:
+            for line in iter(stream.readline, b""):
+                self.lines.put(line)
+        except (IOError, OSError, ValueError):
+            pass
+        self.lines.put(b"")
+
+    def readline(self, timeout=None):
+        try:
+            line = self.lines.get(timeout=timeout)
+        except queue.Empty:
+            stats.increment("process.timeouts")
+            raise IOError("no response from Tabnine within {} s".format(timeout))
+        if not line:
+            # Keep reporting EOF to any later reader as well.
+            self.lines.put(b"")
+            raise IOError("Tabnine closed its output")
+        return line
+
+
 class TabNineProcess:
     install_directory = os.path.dirname(os.path.realpath(__file__))
 
-    def __init__(self):
+    def __init__(self, binary_path=None):
+        # Overrides custom_binary_path and the installed binaries when set.
+        self.binary_path = binary_path
         self.tabnine_proc = None
+        self.reader = None
+        # Whether the binary has not answered since it was started.
+        self.starting = False
+        # The launch_settings the binary was started with.
+        self.launch_settings = None
         self.num_restarts = 0
+        self.daemon = None
+        self.monitor = ProcessMonitor(self)
+        self.last_request_time = time.time()
+        # Serializes use of the pipes, also with requests still in flight in a
+        # TabNineProcess from before a plugin reload.
+        self.lock = threading.RLock()
+
+    def adopt(self, previous):
+        """Take over the running binary of the instance from before a reload.
+
+        A binary started with another path, log file or extra arguments is
+        stopped instead, so the next request starts one for the current
+        settings. Switching completion modes or updating the package keeps
+        the binary; its --client-metadata then reports the values from its
+        launch until it restarts.
+        """
+        previous.monitor.stop()
+        if previous.daemon is not None:
+            previous.daemon.close()
+        self.lock = previous.lock
+        with self.lock:
+            launched = getattr(previous, "launch_settings", None)
+            if launched is not None and launched != self.get_launch_settings():
+                print("Tabnine: launch settings changed, restarting the binary")
+                previous.stop()
+            self.launch_settings = launched
+            self.tabnine_proc = previous.tabnine_proc
+            self.reader = getattr(previous, "reader", None)
+            if self.reader is None and self.tabnine_proc is not None:
+                self.reader = LineReader(self.tabnine_proc.stdout)
+            self.starting = getattr(previous, "starting", False)
+            self.num_restarts = previous.num_restarts
+            self.last_request_time = previous.last_request_time
+        if self.tabnine_proc is not None and is_monitored():
+            self.monitor.start()
+
+    def stop(self):
+        self.monitor.stop()
+        with self.lock:
+            if self.daemon is not None:
+                self.daemon.close()
+            self.discard_tabnine_proc()
+
+    def discard_tabnine_proc(self):
+        if self.tabnine_proc is not None:
+            try:
+                self.tabnine_proc.terminate()
+            except Exception:  # pylint: disable=W0703
+                pass
+            self.tabnine_proc = None
+            self.reader = None
+
+    def get_launch_settings(self):
+        """The settings a running binary has to be restarted to pick up."""
+        settings = get_settings()
+        return (
+            self.binary_path or settings.custom_binary_path,
+            settings.log_file_path,
+            settings.extra_args,
+        )
 
     def run_tabnine(self, inheritStdio=False, additionalArgs=[]):
         binary_dir = os.path.join(TabNineProcess.install_directory, "..", "binaries")
-        settings = get_settings_eager()
-        tabnine_path = settings.get("custom_binary_path", None)
+        tabnine_path, log_file_path, extra_args = self.get_launch_settings()
         if tabnine_path is None:
             tabnine_path = get_tabnine_path(binary_dir)
         args = [tabnine_path, "--client", "sublime"] + additionalArgs
-        log_file_path = settings.get("log_file_path", None)
         if log_file_path is not None:
             args += ["--log-file-path", log_file_path]
-        extra_args = settings.get("extra_args", None)
         if extra_args is not None:
             args += extra_args
+        args += ["--client-metadata"] + self.client_metadata()
+        args += ["ide-restart-counter=" + str(self.num_restarts)]
+        proc = subprocess.Popen(
+            args,
+            stdin=None if inheritStdio else subprocess.PIPE,
+            stdout=None if inheritStdio else subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            startupinfo=get_startup_info(sublime.platform()),
+        )
+        apply_limits(proc.pid)
+        return proc
+
+    def client_metadata(self):
         plugin_version = get_version()
         if not plugin_version:
             plugin_version = "Unknown"
         sublime_version = sublime.version()
-        args += [
-            "--client-metadata",
+        return [
             "clientVersion=" + sublime_version,
             "pluginVersion=" + plugin_version,
             "nativeAutoComplete=" + str(is_native_auto_complete()),
-            "ide-restart-counter=" + str(self.num_restarts),
         ]
-        return subprocess.Popen(
-            args,
-            stdin=None if inheritStdio else subprocess.PIPE,
-            stdout=None if inheritStdio else subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            startupinfo=get_startup_info(sublime.platform()),
-        )
 
     def restart_tabnine_proc(self):
-        if self.tabnine_proc is not None:
-            try:
-                self.tabnine_proc.terminate()
-            except Exception:  # pylint: disable=W0703
-                pass
-        self.tabnine_proc = self.run_tabnine()
+        with self.lock:
+            self.discard_tabnine_proc()
+            self.launch_settings = self.get_launch_settings()
+            self.tabnine_proc = self.run_tabnine()
+            self.reader = LineReader(self.tabnine_proc.stdout)
+            self.starting = True
+        if is_monitored():
+            self.monitor.start()
+
+    def idle_seconds(self):
+        return time.time() - self.last_request_time
+
+    def get_daemon(self):
+        path = None if self.binary_path else get_settings().daemon_socket_path
+        if self.daemon is not None and self.daemon.path != path:
+            self.daemon.close()
+            self.daemon = None
+        if self.daemon is None and path and DaemonConnection.is_supported():
+            self.daemon = DaemonConnection(path)
+        return self.daemon
 
     def request(self, req):
+        profiling = profiler.session
+        if profiling is not None:
+            return profiling.runcall(self._request, req)
+        return self._request(req)
+
+    def _request(self, req):
+        self.last_request_time = time.time()
+        recorder = get_recorder()
+        started = time.monotonic()
+        line = {"version": "2.0.2", "request": req}
+        line = bytes(dumps(line) + "\n", "UTF-8")
+        with self.lock:
+            result = self.exchange(line)
+            elapsed = time.monotonic() - started
+            if recorder is not None:
+                recorder.record(req, result, started, elapsed)
+        stats.observe("request." + next(iter(req)), elapsed * 1000)
+        return result
+
+    def exchange(self, req):
+        daemon = self.get_daemon()
+        if daemon is not None and daemon.is_available():
+            try:
+                timeout_ms = get_settings().request_timeout_ms
+                response = daemon.exchange(req, timeout_ms and timeout_ms / 1000.0)
+                response = loads(str(response, "UTF-8"))
+            except (IOError, OSError, UnicodeDecodeError, ValueError) as e:
+                print(
+                    "Tabnine daemon unavailable, falling back to a private process:", e
+                )
+            else:
+                if self.tabnine_proc is not None:
+                    # The daemon is back; do not keep a second model in memory.
+                    self.monitor.stop()
+                    self.discard_tabnine_proc()
+                return response
+        return self.request_child(req)
+
+    def request_child(self, req):
         if self.tabnine_proc is None:
+            if self.num_restarts >= MAX_RESTARTS:
+                return None
             self.restart_tabnine_proc()
-        if self.tabnine_proc.poll():
+        if self.tabnine_proc.poll() is not None:
             print("Tabnine subprocess is dead")
             if self.num_restarts < MAX_RESTARTS:
                 print("Restarting it...")
                 self.num_restarts += 1
+                stats.increment("process.restarts")
                 self.restart_tabnine_proc()
             else:
                 return None
-        req = {"version": "2.0.2", "request": req}
-        req = dumps(req)
-        req += "\n"
         try:
-            self.tabnine_proc.stdin.write(bytes(req, "UTF-8"))
+            self.tabnine_proc.stdin.write(req)
             self.tabnine_proc.stdin.flush()
-            result = self.tabnine_proc.stdout.readline()
+            settings = get_settings()
+            if self.starting:
+                timeout_ms = settings.startup_timeout_ms
+            else:
+                timeout_ms = settings.request_timeout_ms
+            result = self.reader.readline(timeout_ms and timeout_ms / 1000.0)
+            self.starting = False
             result = str(result, "UTF-8")
             result = loads(result)
             return result
         except (IOError, OSError, UnicodeDecodeError, ValueError) as e:
             print("Exception while interacting with Tabnine subprocess:", e)
+            # A late answer to this request would be taken for the next one's.
+            self.discard_tabnine_proc()
             if self.num_restarts < MAX_RESTARTS:
                 self.num_restarts += 1
+                stats.increment("process.restarts")
                 self.restart_tabnine_proc()
 
 
+def _adopt_running_process():
+    process = TabNineProcess()
+    if handle["process"] is not None:
+        process.adopt(handle["process"])
+    handle["process"] = process
+    handle["generation"] += 1
+    return process
+
+
+def release_tabnine_proc():
+    """Stop the binary unless a reloaded plugin adopts it within the grace period.
+
+    Call from plugin_unloaded.
+    """
+    generation = handle["generation"]
+
+    def stop_if_orphaned():
+        if handle["generation"] == generation:
+            tabnine_proc.stop()
+
+    sublime.set_timeout(stop_if_orphaned, RELEASE_GRACE_MS)
+
+
 global tabnine_proc
-tabnine_proc = TabNineProcess()
+tabnine_proc = _adopt_running_process()
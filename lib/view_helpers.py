@@ -1,7 +1,14 @@
 import sublime
 import re
 
+from .settings import is_tabnine_disabled
+
 END_LINE_STOP_COMPLETION_CHARACTERS = ",;:"
+COMPLETION_SELECTOR = "source | text"
+# Characters next to the cursor kept by ViewContext.
+FINGERPRINT_CHARS = 101
+
+_position_facts = None
 
 
 def get_before(view, char_limit):
@@ -16,40 +23,171 @@ def get_after(view, char_limit):
     return view.substr(sublime.Region(loc, end)), end == view.size()
 
 
+class ViewContext:
+    """The text around the cursor, recorded as offsets instead of a copy.
+
+    `read` gets the text again while the view is unchanged. The characters
+    right next to the cursor are kept as a fingerprint for comparing
+    contexts across edits.
+    """
+
+    __slots__ = (
+        "view_id",
+        "change_count",
+        "begin",
+        "location",
+        "after_location",
+        "end",
+        "region_includes_end",
+        "before_tail",
+        "after_head",
+    )
+
+    def __init__(self, view, char_limit):
+        selection = view.sel()[0]
+        size = view.size()
+        self.view_id = view.id()
+        self.change_count = view.change_count()
+        self.location = selection.begin()
+        self.after_location = selection.end()
+        self.begin = max(0, self.location - char_limit)
+        self.end = min(size, self.after_location + char_limit)
+        self.region_includes_end = self.end == size
+        self.before_tail = view.substr(
+            sublime.Region(
+                max(self.begin, self.location - FINGERPRINT_CHARS), self.location
+            )
+        )
+        self.after_head = view.substr(
+            sublime.Region(
+                self.after_location,
+                min(self.end, self.after_location + FINGERPRINT_CHARS),
+            )
+        )
+
+    @property
+    def region_includes_beginning(self):
+        return self.begin == 0
+
+    def key(self):
+        return (self.view_id, self.change_count, self.location, self.after_location)
+
+    def read(self, view):
+        """Return (before, after), or None once the view has changed."""
+        if view.id() != self.view_id or view.change_count() != self.change_count:
+            return None
+        return (
+            view.substr(sublime.Region(self.begin, self.location)),
+            view.substr(sublime.Region(self.after_location, self.end)),
+        )
+
+
 def active_view():
     """Return currently active view"""
     return sublime.active_window().active_view()
 
 
+class PositionFacts:
+    """What the completion checks ask the view about one cursor position.
+
+    Fetched in one go and shared by all checks for the same keystroke; see
+    get_position_facts.
+    """
+
+    __slots__ = (
+        "view_id",
+        "change_count",
+        "location",
+        "line",
+        "last_two_chars",
+        "scope",
+        "in_completion_scope",
+        "is_active_view",
+        "is_disabled",
+    )
+
+    def __init__(self, view, location):
+        current = active_view()
+        self.view_id = view.id()
+        self.change_count = view.change_count()
+        self.location = location
+        self.line = view.line(location)
+        self.last_two_chars = view.substr(
+            sublime.Region(max(location - 2, 0), location)
+        )
+        self.scope = view.scope_name(location)
+        self.in_completion_scope = (
+            sublime.score_selector(self.scope, COMPLETION_SELECTOR) > 0
+        )
+        self.is_active_view = current is not None and current.id() == view.id()
+        self.is_disabled = is_tabnine_disabled(view)
+
+
+def get_position_facts(view, location):
+    """The PositionFacts of `location`, reused until the view changes."""
+    global _position_facts
+    facts = _position_facts
+    if (
+        facts is None
+        or facts.location != location
+        or facts.view_id != view.id()
+        or facts.change_count != view.change_count()
+    ):
+        facts = _position_facts = PositionFacts(view, location)
+    return facts
+
+
+def forget_position_facts():
+    """Drop the memoized facts after changes that leave the buffer alone.
+
+    Switching views or disabling Tabnine for a view are such changes.
+    """
+    global _position_facts
+    _position_facts = None
+
+
 def should_stop_completion_after_end_line(view, current_location):
-    last_character = view.substr(max(current_location - 1, 0))
-    end_of_line = view.line(current_location).end()
+    facts = get_position_facts(view, current_location)
+    last_character = facts.last_two_chars[-1:]
     return (
-        end_of_line == current_location
+        facts.line.end() == current_location
+        and last_character != ""
         and last_character in END_LINE_STOP_COMPLETION_CHARACTERS
     )
 
 
 def is_query_after_new_line(view, current_location):
-    last_region = view.substr(
-        sublime.Region(max(current_location - 2, 0), current_location)
-    ).rstrip()
+    last_region = get_position_facts(view, current_location).last_two_chars.rstrip()
     is_query_after_new_line = last_region == "" or last_region == "\n"
     return is_query_after_new_line
 
 
 def should_return_empty_list(view, locations, prefix):
-    last_command_insert_snippet = view.command_history(-1)[0] == "insert_snippet"
-    wrong_view = active_view().id() != view.id()
+    facts = get_position_facts(view, locations[0])
     return (
-        wrong_view
+        not facts.is_active_view
         or should_stop_completion_after_end_line(view, locations[0])
         or prefix.strip() == ""
-        and last_command_insert_snippet
-        or not view.match_selector(locations[0], "source | text")
+        and view.command_history(-1)[0] == "insert_snippet"
+        or not facts.in_completion_scope
         or is_query_after_new_line(view, locations[0])
     )
 
 
+def get_language(file_name):
+    if file_name is not None:
+        parts = file_name.split(".")
+        if len(parts) > 1:
+            return parts[-1]
+    return "undefined"
+
+
+def open_url(url):
+    # webbrowser is slow to import and only needed once a link is clicked.
+    import webbrowser
+
+    webbrowser.open(url)
+
+
 def escape_tab_stop_sign(value):
     return re.sub(r"\$", "\\$", value)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""A stand-in for the TabNine binary speaking its line protocol on stdio.
+
+    python tools/stub_tabnine.py [--delay MS] [--results N]
+        [--fault KIND [--fault-after N] [--fault-once FILE]]
+
+Every request line gets one JSON response line. Autocomplete results are
+synthesized from the identifier before the cursor, everything else gets an
+empty object. Useful for exercising the plugin transports, the shared daemon
+and the benchmarks without a real binary or model.
+
+`--fault` misbehaves on the request after the first `--fault-after` ones:
+crash exits without answering, hang stops answering, partial writes half a
+line and exits, garbage answers with a line that is not JSON. slow-start
+waits `--fault-after` tenths of a second before serving anything. With
+`--fault-once FILE` the fault only happens if FILE does not exist yet, and
+creates it, so a restarted stub behaves.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+FAULTS = ("crash", "hang", "partial", "garbage", "slow-start")
+
+
+def autocomplete(args, num_results=5):
+    before = args.get("before", "")
+    old_prefix = ""
+    while before and (before[-1].isalnum() or before[-1] == "_"):
+        old_prefix = before[-1] + old_prefix
+        before = before[:-1]
+    results = [
+        {
+            "new_prefix": "{}completion_{}".format(old_prefix, i),
+            "old_suffix": "",
+            "new_suffix": "",
+            "detail": "{}%".format(90 - i),
+            "origin": "LOCAL",
+        }
+        for i in range(min(num_results, args.get("max_num_results", 5)))
+    ]
+    return {"old_prefix": old_prefix, "results": results, "user_message": []}
+
+
+def respond(request, num_results=5):
+    """Return the response object for a decoded request body."""
+    kind = next(iter(request), None)
+    if kind == "Autocomplete":
+        return autocomplete(request[kind], num_results)
+    if kind == "Features":
+        return {"enabled_features": []}
+    return {}
+
+
+def claim_fault(fault_once):
+    if fault_once is None:
+        return True
+    try:
+        os.close(os.open(fault_once, os.O_CREAT | os.O_EXCL))
+    except OSError:
+        return False
+    return True
+
+
+def serve(
+    stdin, stdout, delay=0, num_results=5, fault=None, fault_after=0, fault_once=None
+):
+    if fault == "slow-start":
+        if claim_fault(fault_once):
+            time.sleep(fault_after / 10.0)
+        fault = None
+    for count, line in enumerate(iter(stdin.readline, b"")):
+        try:
+            request = json.loads(line.decode("utf-8"))["request"]
+        except (ValueError, KeyError, TypeError):
+            response = None
+        else:
+            response = respond(request, num_results)
+        if delay:
+            time.sleep(delay)
+        output = json.dumps(response).encode("utf-8") + b"\n"
+        if fault and count >= fault_after and claim_fault(fault_once):
+            if fault == "crash":
+                sys.exit(3)
+            if fault == "hang":
+                while True:
+                    time.sleep(60)
+            if fault == "partial":
+                stdout.write(output[: len(output) // 2])
+                stdout.flush()
+                sys.exit(3)
+            if fault == "garbage":
+                output = b"\x00\xffnot json\n"
+            fault = None
+        stdout.write(output)
+        stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--delay", type=float, default=0, help="ms per response")
+    parser.add_argument("--results", type=int, default=5)
+    parser.add_argument("--fault", choices=FAULTS)
+    parser.add_argument("--fault-after", type=int, default=0)
+    parser.add_argument("--fault-once", help="marker file limiting the fault to once")
+    # The plugin passes TabNine's own flags (--client, --client-metadata, ...).
+    options, _ = parser.parse_known_args()
+    serve(
+        sys.stdin.buffer,
+        sys.stdout.buffer,
+        options.delay / 1000,
+        options.results,
+        options.fault,
+        options.fault_after,
+        options.fault_once,
+    )
+
+
+if __name__ == "__main__":
+    main()
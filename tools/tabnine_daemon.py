@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Share one TabNine binary between editor instances over a Unix domain socket.
+
+    python tools/tabnine_daemon.py --socket ~/.tabnine.sock \
+        -- ~/bin/TabNine --client sublime
+
+Point the plugin at it with the `daemon_socket_path` setting. Every client
+speaks the binary's own line protocol: one JSON request line in, one JSON
+response line out. Requests from all clients are forwarded to a single child
+process one at a time; the child is restarted if it dies or does not answer
+within `--timeout` seconds. Clients that cannot reach the daemon fall back to
+starting their own binary.
+"""
+
+import argparse
+import os
+import queue
+import socketserver
+import subprocess
+import sys
+import threading
+
+MAX_RESTARTS = 10
+DEFAULT_TIMEOUT = 10
+
+
+class Backend:
+    """The single TabNine child process shared by all clients."""
+
+    def __init__(self, command, timeout=DEFAULT_TIMEOUT):
+        self.command = command
+        self.timeout = timeout
+        self.proc = None
+        self.lines = None
+        self.num_restarts = 0
+        self.lock = threading.Lock()
+
+    def start(self):
+        self.stop()
+        self.proc = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+        # Read on a thread, so a hung child can be given up on.
+        self.lines = queue.Queue()
+        threading.Thread(
+            target=self._read, args=(self.proc.stdout, self.lines), daemon=True
+        ).start()
+
+    @staticmethod
+    def _read(stream, lines):
+        try:
+            for line in iter(stream.readline, b""):
+                lines.put(line)
+        except (IOError, OSError, ValueError):
+            pass
+        lines.put(b"")
+
+    def stop(self):
+        if self.proc is not None:
+            try:
+                self.proc.kill()
+                self.proc.wait()
+            except OSError:
+                pass
+            self.proc = None
+
+    def exchange(self, line):
+        """Forward one request line and return the binary's response line."""
+        with self.lock:
+            for _ in range(2):
+                if self.proc is None or self.proc.poll() is not None:
+                    if self.proc is not None:
+                        if self.num_restarts >= MAX_RESTARTS:
+                            break
+                        self.num_restarts += 1
+                    self.start()
+                try:
+                    self.proc.stdin.write(line)
+                    self.proc.stdin.flush()
+                    response = self.lines.get(timeout=self.timeout)
+                except queue.Empty:
+                    print("tabnine child did not answer, restarting", file=sys.stderr)
+                    response = b""
+                except (IOError, OSError):
+                    response = b""
+                if response.endswith(b"\n"):
+                    return response
+                self.stop()
+            return b"null\n"
+
+
+class ClientHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.endswith(b"\n"):
+                break
+            response = self.server.backend.exchange(line)
+            try:
+                self.wfile.write(response)
+                self.wfile.flush()
+            except (IOError, OSError):
+                # The client gave up waiting.
+                break
+
+
+class Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, backend, mode=0o600):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        socketserver.UnixStreamServer.__init__(self, socket_path, ClientHandler)
+        os.chmod(socket_path, mode)
+        self.socket_path = socket_path
+        self.backend = backend
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        self.backend.stop()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--socket", required=True, help="Unix domain socket path")
+    parser.add_argument(
+        "--mode", default="600", help="socket permissions, octal (default: 600)"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=DEFAULT_TIMEOUT,
+        help="seconds to wait for a response before restarting the binary",
+    )
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="binary and args")
+    options = parser.parse_args()
+    command = options.command[1:] if options.command[:1] == ["--"] else options.command
+    if not command:
+        parser.error("missing the TabNine binary command")
+
+    daemon = Daemon(
+        os.path.expanduser(options.socket),
+        Backend(command, options.timeout),
+        int(options.mode, 8),
+    )
+    print("tabnine daemon listening on", daemon.socket_path, file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server_close()
+
+
+if __name__ == "__main__":
+    main()